@@ -3,16 +3,62 @@ Azure Video Upload Web Application
 Flask backend with Azure Blob Storage integration
 Uses Managed Identity for secure authentication
 """
+import contextvars
+import hashlib
+import heapq
+import hmac
+import itertools
+import json
+import math
+import mimetypes
 import os
+import random
+import time
 import uuid
-from datetime import datetime
-from flask import Flask, render_template, request, jsonify
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from operator import itemgetter
+from flask import (
+    Flask, Response, after_this_request, g, render_template, request, jsonify, send_from_directory,
+    stream_with_context, url_for
+)
 from flask_cors import CORS
-from azure.storage.blob import BlobServiceClient, ContentSettings
-from azure.identity import DefaultAzureCredential
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+from azure.storage.blob import ContentSettings, StandardBlobTier
+from werkzeug.datastructures import ContentRange
+from werkzeug.exceptions import HTTPException
+from werkzeug.sansio.multipart import Data, File
 from werkzeug.utils import secure_filename
+from werkzeug.wsgi import wrap_file
 import logging
 
+from services.admission import UploadAdmission
+from services.assets import AssetManifest
+from services.blob_batch import METADATA_NAME, batch_result, delete_blobs, set_blob_tiers, set_blobs_metadata
+from services.chunk_cache import ChunkCache
+from services.compression import SUFFIXES, choose_encoding, compress, compress_stream
+from services.content_sniffer import FORMAT_NAMES, SNIFF_SIZE, detect_video_type, matches_extension
+from services.listing_cache import ListingCache
+from services.media_probe import media_from_json, media_from_metadata, media_metadata, probe_media
+from services.metrics import (
+    LIST_SECONDS, REQUEST_SECONDS, REQUESTS_IN_FLIGHT, TRANSFER_BLOCK_SIZE, TRANSFER_CONCURRENCY, UPLOAD_FAILURES,
+    UPLOAD_REJECTIONS, UPLOADS_IN_FLIGHT, add_stage_time, add_throttle_listener, observe_stage, record_transfer,
+    render_latest, request_stages, timed_iter
+)
+from services.profiling import RequestProfiler
+from services.sas import UploadTicketSigner, UserDelegationKeyCache, generate_upload_sas_url, load_signing_key
+from services.sharding import ShardSet, merged_page, parse_shards, prefetched
+from services.streaming_upload import READ_SIZE, BlockBlobWriter, iter_multipart_events
+from services.transfer_policy import TransferPolicy
+from services.upload_progress import VALID_ID, ProgressRegistry
+from services.upload_sessions import (
+    MAX_CHUNKS, block_id_for_chunk, get_session_chunks, is_valid_session_id
+)
+from services.video_index import SORT_COLUMNS, VideoIndex
+
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)
@@ -25,25 +71,205 @@ logger = logging.getLogger(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB max file size
 ALLOWED_EXTENSIONS = {'mp4', 'mov', 'avi', 'mkv', 'webm'}
 
+# Reject uploads whose first bytes are not a supported video container (and type them by content)
+UPLOAD_CONTENT_SNIFFING = os.getenv('UPLOAD_CONTENT_SNIFFING', 'true').lower() == 'true'
+
+# Streaming uploads parse the multipart body incrementally and stage blocks as they arrive
+STREAMING_UPLOADS = os.getenv('STREAMING_UPLOADS', 'true').lower() == 'true'
+UPLOAD_BLOCK_SIZE = int(os.getenv('UPLOAD_BLOCK_SIZE', 4 * 1024 * 1024))  # 4MB blocks (until speed is measured)
+
+# Concurrent transfers: files in flight per worker and parallel block uploads per blob
+UPLOAD_FILE_CONCURRENCY = int(os.getenv('UPLOAD_FILE_CONCURRENCY', 4))
+UPLOAD_BLOB_CONCURRENCY = int(os.getenv('UPLOAD_BLOB_CONCURRENCY', 2))  # starting point when adaptive
+
+# Adaptive transfers: single put or blocks, block size and per-blob concurrency tuned from recent uploads
+UPLOAD_ADAPTIVE_TRANSFERS = os.getenv('UPLOAD_ADAPTIVE_TRANSFERS', 'true').lower() == 'true'
+UPLOAD_MIN_BLOCK_SIZE = int(os.getenv('UPLOAD_MIN_BLOCK_SIZE', 1024 * 1024))  # 1MB
+UPLOAD_MAX_BLOCK_SIZE = int(os.getenv('UPLOAD_MAX_BLOCK_SIZE', 32 * 1024 * 1024))  # 32MB
+UPLOAD_MAX_BLOB_CONCURRENCY = int(os.getenv('UPLOAD_MAX_BLOB_CONCURRENCY', 8))
+
+# Admission control: instance-wide upload limits so health checks and listings always find a free worker
+UPLOAD_ADMISSION_ENABLED = os.getenv('UPLOAD_ADMISSION_ENABLED', 'true').lower() == 'true'
+UPLOAD_WORKER_SLOTS = int(os.getenv('UPLOAD_WORKER_SLOTS', 4))  # gunicorn workers × threads (startup.txt)
+UPLOAD_RESERVED_SLOTS = int(os.getenv('UPLOAD_RESERVED_SLOTS', 1))  # never used by uploads
+UPLOAD_MAX_CONCURRENT = int(os.getenv('UPLOAD_MAX_CONCURRENT', max(1, UPLOAD_WORKER_SLOTS - UPLOAD_RESERVED_SLOTS)))
+UPLOAD_MAX_INFLIGHT_BYTES = int(os.getenv('UPLOAD_MAX_INFLIGHT_BYTES', 1024 * 1024 * 1024))  # 1GB
+UPLOAD_MAX_PER_CLIENT = int(os.getenv('UPLOAD_MAX_PER_CLIENT', 2))
+UPLOAD_RETRY_AFTER = int(os.getenv('UPLOAD_RETRY_AFTER', 5))  # seconds, jittered up to double
+UPLOAD_ADMISSION_PATH = os.getenv('UPLOAD_ADMISSION_PATH', '/tmp/upload-admission.db')
+# App Service Authentication (Easy Auth) sets X-MS-CLIENT-PRINCIPAL-* headers; without it clients can forge them
+EASY_AUTH_ENABLED = os.getenv('EASY_AUTH_ENABLED', 'false').lower() == 'true'
+
+# Storage-side upload progress, shared by all workers and polled by the browser (streamed by the ASGI app)
+UPLOAD_PROGRESS_ENABLED = os.getenv('UPLOAD_PROGRESS_ENABLED', 'true').lower() == 'true'
+UPLOAD_PROGRESS_DIR = os.getenv('UPLOAD_PROGRESS_DIR', '/tmp/upload-progress')
+UPLOAD_PROGRESS_INTERVAL = float(os.getenv('UPLOAD_PROGRESS_INTERVAL', 0.5))  # seconds between updates
+UPLOAD_PROGRESS_STREAM_SECONDS = int(os.getenv('UPLOAD_PROGRESS_STREAM_SECONDS', 60))  # ASGI event streams; clients reconnect
+UPLOAD_PROGRESS_IDLE_SECONDS = 10  # close an event stream this long after its channel's last upload finished
+
+# Resumable upload sessions (chunked uploads beyond MAX_CONTENT_LENGTH)
+UPLOAD_SESSION_CHUNK_SIZE = int(os.getenv('UPLOAD_SESSION_CHUNK_SIZE', 8 * 1024 * 1024))  # 8MB chunks
+UPLOAD_SESSION_MAX_SIZE = int(os.getenv('UPLOAD_SESSION_MAX_SIZE', 10 * 1024 * 1024 * 1024))  # 10GB
+UPLOAD_SESSION_TTL = 7 * 24 * 3600  # Azure discards uncommitted blocks after a week
+
+# Video listing page sizes
+VIDEO_LIST_PAGE_SIZE = int(os.getenv('VIDEO_LIST_PAGE_SIZE', 100))
+VIDEO_LIST_MAX_PAGE_SIZE = 1000
+VIDEO_LIST_STREAM_PAGE_SIZE = 5000  # Maximum page size supported by List Blobs
+VIDEO_INDEX_PARAMS = {'sort', 'order', 'content_type', 'min_size', 'max_size', 'q'}  # need the metadata index
+
+# Listing cache (set VIDEO_LIST_CACHE_DIR to share it across gunicorn workers)
+VIDEO_LIST_CACHE_TTL = int(os.getenv('VIDEO_LIST_CACHE_TTL', 30))  # seconds
+VIDEO_LIST_CACHE_SIZE = int(os.getenv('VIDEO_LIST_CACHE_SIZE', 256))  # pages
+VIDEO_LIST_CACHE_DIR = os.getenv('VIDEO_LIST_CACHE_DIR')
+
+# Local metadata index (SQLite); sorted/filtered listings and search are served from it when set
+VIDEO_INDEX_PATH = os.getenv('VIDEO_INDEX_PATH')
+VIDEO_INDEX_RECONCILE_INTERVAL = int(os.getenv('VIDEO_INDEX_RECONCILE_INTERVAL', 300))  # seconds
+
+# Content-hash deduplication (uses the metadata index as the hash → blob lookup)
+UPLOAD_DEDUP_ENABLED = os.getenv('UPLOAD_DEDUP_ENABLED', 'false').lower() == 'true'
+
+# Playback through /api/videos/<id>/stream (one chunk per range response, cached in memory and on local disk)
+VIDEO_STREAM_CHUNK_SIZE = int(os.getenv('VIDEO_STREAM_CHUNK_SIZE', 2 * 1024 * 1024))  # 2MB
+VIDEO_STREAM_MEMORY_CACHE = int(os.getenv('VIDEO_STREAM_MEMORY_CACHE', 64 * 1024 * 1024))  # per worker
+VIDEO_STREAM_CACHE_DIR = os.getenv('VIDEO_STREAM_CACHE_DIR', '/tmp/video-chunk-cache')
+VIDEO_STREAM_DISK_CACHE = int(os.getenv('VIDEO_STREAM_DISK_CACHE', 2 * 1024 * 1024 * 1024))  # per instance
+
+# Duration, resolution and codecs read from container headers after upload (stored in blob metadata)
+MEDIA_PROBE_ENABLED = os.getenv('MEDIA_PROBE_ENABLED', 'true').lower() == 'true'
+MEDIA_PROBE_WORKERS = int(os.getenv('MEDIA_PROBE_WORKERS', 2))
+
+# Bulk delete / tier / metadata endpoints (off by default: the app has no per-user authorization)
+BULK_OPERATIONS_ENABLED = os.getenv('BULK_OPERATIONS_ENABLED', 'false').lower() == 'true'
+BULK_OPERATION_MAX_VIDEOS = int(os.getenv('BULK_OPERATION_MAX_VIDEOS', 5000))
+BULK_OPERATION_CONCURRENCY = int(os.getenv('BULK_OPERATION_CONCURRENCY', 8))  # batches (or metadata updates) in parallel
+
+# Direct-to-storage uploads with user delegation SAS (requires browser access to the storage account)
+DIRECT_UPLOADS_ENABLED = os.getenv('DIRECT_UPLOADS_ENABLED', 'false').lower() == 'true'
+DIRECT_UPLOAD_SAS_TTL = int(os.getenv('DIRECT_UPLOAD_SAS_TTL', 900))  # 15 minutes
+DIRECT_UPLOAD_MAX_SIZE = 5000 * 1024 * 1024  # Single Put Blob limit
+USER_DELEGATION_KEY_TTL = int(os.getenv('USER_DELEGATION_KEY_TTL', 3600))  # 1 hour
+# Upload tickets (direct uploads and sessions) are signed with this key; set it when running more than one instance
+DIRECT_UPLOAD_SIGNING_KEY = os.getenv('DIRECT_UPLOAD_SIGNING_KEY')
+DIRECT_UPLOAD_KEY_PATH = os.getenv('DIRECT_UPLOAD_KEY_PATH', '/tmp/direct-upload.key')  # shared by the workers otherwise
+DIRECT_UPLOAD_COMPLETE_WINDOW = 3600  # seconds after the SAS expires that the upload can still be completed
+
+# JSON API responses at least this large are gzip/brotli encoded when the client accepts it (0 disables)
+JSON_COMPRESSION_MIN_SIZE = int(os.getenv('JSON_COMPRESSION_MIN_SIZE', 1024))  # bytes
+JSON_COMPRESSION_LEVEL = 5  # favours speed; assets are pre-compressed at the highest level
+ASSET_MAX_AGE = 365 * 24 * 3600  # built assets have content-hashed names, so they never change
+
+# Opt-in request profiling (off by default): folded-stack profiles and slow-request captures in PROFILING_DIR
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+PROFILING_TOKEN = os.getenv('PROFILING_TOKEN')  # an X-Profile-Token header with this value profiles the request
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))  # fraction of requests profiled (0-1)
+PROFILING_SLOW_SECONDS = float(os.getenv('PROFILING_SLOW_SECONDS', 0))  # capture requests slower than this (0 disables)
+PROFILING_INTERVAL = float(os.getenv('PROFILING_INTERVAL', 0.01))  # seconds between stack samples
+PROFILING_DIR = os.getenv('PROFILING_DIR', '/tmp/profiles')
+PROFILING_MAX_FILES = int(os.getenv('PROFILING_MAX_FILES', 200))  # captures kept per instance
+PROFILING_ENDPOINTS = {
+    endpoint.strip() for endpoint in os.getenv('PROFILING_ENDPOINTS', 'upload_video,list_videos').split(',')
+    if endpoint.strip()
+}
+
 # Azure Storage configuration
 AZURE_STORAGE_ACCOUNT_NAME = os.getenv('AZURE_STORAGE_ACCOUNT_NAME')
 CONTAINER_NAME = os.getenv('CONTAINER_NAME', 'videos')
 
-# Initialize Azure Blob Service Client with Managed Identity
-try:
-    if AZURE_STORAGE_ACCOUNT_NAME:
-        # Use DefaultAzureCredential for authentication
-        # In Azure App Service, this will use the managed identity
-        credential = DefaultAzureCredential()
-        account_url = f"https://{AZURE_STORAGE_ACCOUNT_NAME}.blob.core.windows.net"
-        blob_service_client = BlobServiceClient(account_url=account_url, credential=credential)
-        logger.info("✅ Azure Blob Storage client initialized with Managed Identity")
-    else:
-        blob_service_client = None
-        logger.warning("⚠️ Azure Storage account name not configured")
-except Exception as e:
-    blob_service_client = None
-    logger.error(f"❌ Failed to initialize Azure Blob Storage client: {str(e)}")
+# Sharded storage: comma-separated account/container pairs (the existing one first); defaults to the single pair above
+STORAGE_SHARDS = os.getenv('STORAGE_SHARDS', '')
+STORAGE_SHARD_VNODES = int(os.getenv('STORAGE_SHARD_VNODES', 128))  # ring points per shard; must match on every instance
+
+# Background token pre-fetch (and refresh this many seconds before expiry)
+STORAGE_TOKEN_PREFETCH = os.getenv('STORAGE_TOKEN_PREFETCH', 'true').lower() == 'true'
+STORAGE_TOKEN_REFRESH_MARGIN = int(os.getenv('STORAGE_TOKEN_REFRESH_MARGIN', 300))
+
+# Azure clients are created lazily in each worker process (fork-safe) and warmed up in the background.
+# New blobs are spread over the shards by consistent hashing; each container is provisioned once per
+# worker (lazily) and only re-checked when storage reports it missing
+storage_shards = ShardSet(
+    parse_shards(STORAGE_SHARDS, AZURE_STORAGE_ACCOUNT_NAME, CONTAINER_NAME),
+    refresh_margin=STORAGE_TOKEN_REFRESH_MARGIN, vnodes=STORAGE_SHARD_VNODES
+)
+# Clients of the primary (first) shard's account
+storage_clients = storage_shards.primary.clients
+if not storage_clients.configured:
+    logger.warning("⚠️ Azure Storage account name not configured")
+elif storage_shards.sharded:
+    logger.info(f"🧩 Storage sharded across {', '.join(shard.id for shard in storage_shards.shards)}")
+
+
+# Process-wide executors shared by all requests in this worker
+upload_executor = ThreadPoolExecutor(max_workers=UPLOAD_FILE_CONCURRENCY, thread_name_prefix='upload')
+block_executor = ThreadPoolExecutor(
+    max_workers=UPLOAD_FILE_CONCURRENCY * max(UPLOAD_BLOB_CONCURRENCY, UPLOAD_MAX_BLOB_CONCURRENCY),
+    thread_name_prefix='upload-block'
+)
+batch_executor = ThreadPoolExecutor(max_workers=BULK_OPERATION_CONCURRENCY, thread_name_prefix='blob-batch')
+probe_executor = ThreadPoolExecutor(max_workers=MEDIA_PROBE_WORKERS, thread_name_prefix='media-probe')
+# Per-shard listing fetches (and the next page of each shard while a stream is consumed)
+listing_executor = ThreadPoolExecutor(max_workers=2 * len(storage_shards.shards), thread_name_prefix='shard-list')
+
+# Block size and concurrency of this worker's uploads; throttled storage responses halve the concurrency
+transfer_policy = TransferPolicy(
+    UPLOAD_BLOCK_SIZE, UPLOAD_BLOB_CONCURRENCY,
+    min_block_size=UPLOAD_MIN_BLOCK_SIZE, max_block_size=UPLOAD_MAX_BLOCK_SIZE,
+    max_concurrency=max(UPLOAD_BLOB_CONCURRENCY, UPLOAD_MAX_BLOB_CONCURRENCY), adaptive=UPLOAD_ADAPTIVE_TRANSFERS
+)
+add_throttle_listener(transfer_policy.note_throttled)
+
+video_index = VideoIndex(VIDEO_INDEX_PATH) if VIDEO_INDEX_PATH else None
+
+# Transfer pools are sampled along with the request that keeps them busy
+request_profiler = RequestProfiler(
+    PROFILING_DIR, interval=PROFILING_INTERVAL, slow_seconds=PROFILING_SLOW_SECONDS,
+    max_files=PROFILING_MAX_FILES, thread_prefixes=('upload', 'shard-list', 'blob-batch')
+) if PROFILING_ENABLED else None
+
+upload_admission = UploadAdmission(
+    UPLOAD_ADMISSION_PATH, UPLOAD_MAX_CONCURRENT, UPLOAD_MAX_INFLIGHT_BYTES, UPLOAD_MAX_PER_CLIENT,
+    lease_ttl=660  # gunicorn --timeout 600, plus a margin
+) if UPLOAD_ADMISSION_ENABLED else None
+
+upload_progress = ProgressRegistry(
+    UPLOAD_PROGRESS_DIR, interval=UPLOAD_PROGRESS_INTERVAL
+) if UPLOAD_PROGRESS_ENABLED else None
+
+dedup_enabled = UPLOAD_DEDUP_ENABLED and video_index is not None
+if UPLOAD_DEDUP_ENABLED and not dedup_enabled:
+    logger.warning("⚠️ UPLOAD_DEDUP_ENABLED requires VIDEO_INDEX_PATH; deduplication is off")
+
+listing_cache = ListingCache(VIDEO_LIST_CACHE_TTL, VIDEO_LIST_CACHE_SIZE, VIDEO_LIST_CACHE_DIR)
+
+user_delegation_keys = UserDelegationKeyCache(timedelta(seconds=USER_DELEGATION_KEY_TTL))
+upload_tickets = UploadTicketSigner(load_signing_key(DIRECT_UPLOAD_SIGNING_KEY, DIRECT_UPLOAD_KEY_PATH))
+
+# Built by `python -m services.assets`; without a build, templates fall back to /static
+asset_manifest = AssetManifest()
+
+chunk_cache = ChunkCache(
+    VIDEO_STREAM_CHUNK_SIZE, VIDEO_STREAM_MEMORY_CACHE, VIDEO_STREAM_CACHE_DIR or None, VIDEO_STREAM_DISK_CACHE
+)
+
+
+# Process that started the per-worker background services
+worker_services_pid = None
+
+
+def start_worker_services():
+    """Start per-worker background work (token warm-up, index reconciler) once per process"""
+    global worker_services_pid
+    
+    if worker_services_pid == os.getpid():
+        return
+    worker_services_pid = os.getpid()
+    
+    if storage_clients.configured:
+        if STORAGE_TOKEN_PREFETCH:
+            storage_shards.start_warmup()
+        if video_index:
+            video_index.start_reconciler(shard_containers, VIDEO_INDEX_RECONCILE_INTERVAL)
 
 
 def allowed_file(filename):
@@ -69,6 +295,178 @@ def get_content_type(filename):
     return content_types.get(extension, 'application/octet-stream')
 
 
+@app.before_request
+def ensure_worker_services():
+    """Start worker services lazily when not started by the gunicorn post_worker_init hook"""
+    start_worker_services()
+
+
+@app.before_request
+def start_request_metrics():
+    """Track the request in the in-flight gauge and start its latency timer"""
+    g.request_started = time.perf_counter()
+    g.request_in_flight = True
+    REQUESTS_IN_FLIGHT.inc()
+
+
+@app.after_request
+def observe_request_metrics(response):
+    """Record request latency by route and status"""
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    REQUEST_SECONDS.labels(request.method, endpoint, str(response.status_code)).observe(
+        time.perf_counter() - g.request_started
+    )
+    return response
+
+
+@app.teardown_request
+def finish_request_metrics(error=None):
+    """Release the in-flight gauge when the request context is torn down"""
+    # Streamed responses tear down twice; only the first call releases the gauge
+    if g.pop('request_in_flight', False):
+        REQUESTS_IN_FLIGHT.dec()
+
+
+@app.before_request
+def start_request_profile():
+    """Profile the request when asked to (token header or sampling) and watch it for the slow threshold"""
+    if request_profiler is None or request.endpoint not in PROFILING_ENDPOINTS:
+        return
+    
+    reason = None
+    token = request.headers.get('X-Profile-Token')
+    if token and PROFILING_TOKEN and hmac.compare_digest(token, PROFILING_TOKEN):
+        reason = 'requested'
+    elif PROFILING_SAMPLE_RATE and random.random() < PROFILING_SAMPLE_RATE:
+        reason = 'sampled'
+    if reason is None and not PROFILING_SLOW_SECONDS:
+        return
+    
+    g.profile = request_profiler.begin(reason)
+    request_stages.set({})
+
+
+def finish_request_profile(status_code):
+    """Stop watching the request; returns the capture id when it was written"""
+    capture = g.pop('profile', None)
+    if capture is None:
+        return None
+    stages = request_stages.get() or {}
+    request_stages.set(None)
+    capture_id = request_profiler.end(capture, {
+        'method': request.method,
+        'path': request.path,
+        'endpoint': request.endpoint,
+        'status': status_code,
+        'content_length': request.content_length,
+        # Stages of concurrent files overlap, so they can add up to more than the duration
+        'stages': {stage: round(seconds, 4) for stage, seconds in sorted(stages.items())}
+    })
+    if capture_id:
+        logger.info(f"🔬 Captured {request.method} {request.path} ({capture_id})")
+    return capture_id
+
+
+@app.after_request
+def attach_request_profile(response):
+    """Write the request's capture, if any, and tell the caller its id"""
+    capture_id = finish_request_profile(response.status_code)
+    if capture_id:
+        response.headers['X-Profile-Id'] = capture_id
+    return response
+
+
+@app.teardown_request
+def discard_request_profile(error=None):
+    """Finish the capture of a request that failed before its response was built"""
+    if 'profile' in g:
+        finish_request_profile(500)
+
+
+def submit_in_context(executor, fn, *args):
+    """Submit fn with the caller's context, so work on the pool counts towards the request's stages"""
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+
+@app.after_request
+def compress_json_response(response):
+    """Compress JSON responses of at least JSON_COMPRESSION_MIN_SIZE bytes for clients that accept it"""
+    if (
+        not JSON_COMPRESSION_MIN_SIZE
+        or response.mimetype != 'application/json'
+        or response.direct_passthrough
+        or 'Content-Encoding' in response.headers
+        or request.method == 'HEAD'
+        or response.status_code == 204
+    ):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    if response.status_code == 304:
+        # Revalidating a compressed copy: answer with the weak validator it was served with
+        etag, weak = response.get_etag()
+        if etag and not weak and request.if_none_match.is_weak(etag):
+            response.set_etag(etag, weak=True)
+        return response
+    
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+    
+    if response.is_streamed:
+        # Streamed listings are compressed as they are generated
+        response.response = compress_stream(response.response, encoding, JSON_COMPRESSION_LEVEL)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < JSON_COMPRESSION_MIN_SIZE:
+            return response
+        response.set_data(compress(data, encoding, JSON_COMPRESSION_LEVEL))
+    response.headers['Content-Encoding'] = encoding
+    # The encoded bytes differ from the identity body, so a strong ETag no longer holds for them
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+@app.context_processor
+def asset_helpers():
+    def asset_url(path):
+        """URL of a static asset: its built, content-hashed copy when available"""
+        built = asset_manifest.get(path)
+        if built:
+            return url_for('asset', filename=built)
+        return url_for('static', filename=path)
+    
+    return {'asset_url': asset_url}
+
+
+@app.route('/assets/<path:filename>')
+def asset(filename):
+    """Serve a built asset, pre-compressed when the client accepts it, with immutable caching"""
+    if not asset_manifest.is_built(filename):
+        return jsonify({
+            'success': False,
+            'error': 'Not found',
+            'message': 'Unknown asset'
+        }), 404
+    
+    encoding = choose_encoding(request.accept_encodings, asset_manifest.encodings)
+    response = send_from_directory(
+        asset_manifest.dist_dir,
+        filename + SUFFIXES[encoding] if encoding else filename,
+        mimetype=mimetypes.guess_type(filename)[0],
+        max_age=ASSET_MAX_AGE
+    )
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
 @app.route('/')
 def index():
     """Render main page"""
@@ -78,12 +476,17 @@ def index():
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    azure_configured = blob_service_client is not None
+    azure_configured = storage_clients.configured
     auth_method = 'managed-identity' if AZURE_STORAGE_ACCOUNT_NAME else 'not-configured'
     return jsonify({
         'status': 'healthy',
         'azure_storage': 'connected' if azure_configured else 'not_configured',
         'auth_method': auth_method,
+        'listing_cache': listing_cache.stats(),
+        'stream_cache': chunk_cache.stats(),
+        'dedup': video_index.dedup_stats() if dedup_enabled else None,
+        'storage_shards': len(storage_shards.shards),
+        'transfer': transfer_policy.stats(),
         'timestamp': datetime.utcnow().isoformat()
     })
 
@@ -94,116 +497,787 @@ def health_check_root():
     return health_check()
 
 
-@app.route('/api/upload', methods=['POST'])
-def upload_video():
-    """Upload video file to Azure Blob Storage"""
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """Readiness endpoint: passes only once a storage token and pooled connection are warm"""
+    if not STORAGE_TOKEN_PREFETCH:
+        # Without the background warm-up, readiness probes do the warming
+        storage_shards.warm()
+    
+    details = storage_shards.readiness()
+    return jsonify({
+        'status': 'ready' if details['ready'] else 'not_ready',
+        **details,
+        'timestamp': datetime.utcnow().isoformat()
+    }), 200 if details['ready'] else 503
+
+
+@app.route('/ready', methods=['GET'])
+def readiness_check_root():
+    """Root readiness endpoint (alias for /api/ready)"""
+    return readiness_check()
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics, aggregated across gunicorn workers"""
+    body, content_type = render_latest()
+    return Response(body, content_type=content_type)
+
+
+def storage_not_configured():
+    """Response for requests that need Azure Storage when it is not configured"""
+    return jsonify({
+        'success': False,
+        'error': 'Azure Storage not configured',
+        'message': 'Please configure AZURE_STORAGE_CONNECTION_STRING environment variable'
+    }), 500
+
+
+def upload_client_id():
+    """Identify the uploader for fair sharing: the signed-in user (with Easy Auth), else the client address"""
+    principal = request.headers.get('X-MS-CLIENT-PRINCIPAL-ID') if EASY_AUTH_ENABLED else None
+    if principal:
+        return principal
+    # App Service appends the real client address (with its port) as the last X-Forwarded-For entry
+    address = request.headers.get('X-Forwarded-For', '').split(',')[-1].strip() or request.remote_addr or 'unknown'
+    return address.rsplit(':', 1)[0] if address.count(':') == 1 else address
+
+
+def admit_upload():
+    """Take an upload lease before reading the body; returns (lease id, rejection response)"""
+    if upload_admission is None:
+        return None, None
+    
     try:
-        # Check if Azure Storage is configured
-        if not blob_service_client:
-            return jsonify({
-                'success': False,
-                'error': 'Azure Storage not configured',
-                'message': 'Please configure AZURE_STORAGE_CONNECTION_STRING environment variable'
-            }), 500
-        
-        # Check if files are present in request
-        if 'files[]' not in request.files:
-            return jsonify({
-                'success': False,
-                'error': 'No files provided',
-                'message': 'Please select files to upload'
-            }), 400
-        
-        files = request.files.getlist('files[]')
+        admission = upload_admission.acquire(
+            upload_client_id(), request.content_length or app.config['MAX_CONTENT_LENGTH']
+        )
+    except Exception as e:
+        # Admission is a safeguard; never fail an upload because its bookkeeping is unavailable
+        logger.warning(f"⚠️ Upload admission unavailable: {str(e)}")
+        return None, None
+    
+    if admission.lease_id:
+        return admission.lease_id, None
+    
+    UPLOAD_REJECTIONS.labels(admission.reason).inc()
+    retry_after = random.randint(UPLOAD_RETRY_AFTER, UPLOAD_RETRY_AFTER * 2)
+    logger.info(f"🚦 Upload turned away ({admission.reason} limit), retry in {retry_after}s")
+    response = jsonify({
+        'success': False,
+        'error': 'Server busy',
+        'message': f'Too many uploads in progress, please retry in {retry_after} seconds',
+        'reason': admission.reason,
+        'retry_after': retry_after
+    })
+    response.headers['Retry-After'] = str(retry_after)
+    return None, (response, 503)
+
+
+def release_upload(lease_id):
+    if lease_id is None:
+        return
+    try:
+        upload_admission.release(lease_id)
+    except Exception as e:
+        # The lease is reclaimed after lease_ttl
+        logger.warning(f"⚠️ Failed to release upload lease: {str(e)}")
+
+
+def start_upload_progress():
+    """Register this upload request for the progress feed when the browser sent a channel and upload id"""
+    if upload_progress is None:
+        return None
+    
+    progress = upload_progress.start(
+        request.headers.get('X-Progress-Channel'), request.headers.get('X-Upload-Id'), request.content_length
+    )
+    if progress is not None:
+        g.upload_progress = progress
         
-        if not files or files[0].filename == '':
-            return jsonify({
-                'success': False,
-                'error': 'No files selected',
-                'message': 'Please select at least one file to upload'
-            }), 400
+        @after_this_request
+        def finish_upload_progress(response):
+            progress.finish(response.status_code < 400)
+            return response
+    return progress
+
+
+def storage_progress_hook(blob_name):
+    """progress_hook reporting one file's stored bytes to this request's progress entry, or None"""
+    progress = g.get('upload_progress')
+    return progress.hook(blob_name) if progress is not None else None
+
+
+def get_container_client():
+    """Get this worker's container client of the primary shard (no storage round trip)"""
+    return storage_clients.container_client
+
+
+def get_blob_container_client(blob_name, shard_id=None):
+    """Get the container client of the shard holding an existing blob (shard_id from the index, when known)"""
+    if shard_id is None and storage_shards.sharded and video_index is not None:
+        shard_id = video_index.shard_of(blob_name)
+    return storage_shards.locate(blob_name, shard_id).container_client
+
+
+def shard_containers():
+    """(shard id, container client) of every shard, for the index reconciler"""
+    return [(shard.id, shard.container_client) for shard in storage_shards.shards]
+
+
+def is_container_missing(error):
+    """Check whether a storage error means the container no longer exists"""
+    return isinstance(error, ResourceNotFoundError) and getattr(error, 'error_code', None) == 'ContainerNotFound'
+
+
+def mark_container_missing():
+    """Force the next upload to provision the containers again"""
+    storage_shards.mark_unprovisioned()
+    logger.warning("⚠️ Storage container not found, will re-provision")
+
+
+def get_upload_container_client(blob_name):
+    """Get the container client of the shard a new blob goes to, provisioning its container once per worker"""
+    shard = storage_shards.placement(blob_name)
+    
+    if not shard.provisioned:
+        with shard.lock, observe_stage('container'):
+            if not shard.provisioned:
+                try:
+                    shard.container_client.create_container()
+                    logger.info(f"✅ Container '{shard.id}' created")
+                except ResourceExistsError:
+                    pass
+                shard.provisioned = True
+    
+    storage_shards.remember(blob_name, shard)
+    return shard.container_client
+
+
+def generate_blob_name(original_filename):
+    """Generate a unique blob name that keeps the original extension"""
+    return f"{uuid.uuid4()}.{get_file_extension(original_filename)}"
+
+
+def invalid_file_type_error(filename):
+    """Build the per-file error entry for a disallowed file type"""
+    return {
+        'filename': filename,
+        'error': 'Invalid file type',
+        'message': f'Only {", ".join(ALLOWED_EXTENSIONS).upper()} files are allowed'
+    }
+
+
+def invalid_file_content_error(filename, message):
+    """Build the per-file error entry for content that is not the video it claims to be"""
+    return {
+        'filename': filename,
+        'error': 'Invalid file content',
+        'message': message
+    }
+
+
+def sniff_upload(head, filename):
+    """Detect a file's content type from its first bytes; returns (content_type, error entry)"""
+    if not UPLOAD_CONTENT_SNIFFING:
+        return get_content_type(filename), None
+    
+    content_type = detect_video_type(head)
+    extension = get_file_extension(filename)
+    if content_type is None:
+        return None, invalid_file_content_error(filename, 'File content is not a supported video format')
+    
+    if not matches_extension(content_type, extension):
+        return None, invalid_file_content_error(
+            filename, f'File content is {FORMAT_NAMES[content_type]}, which does not match the .{extension} extension'
+        )
+    
+    return content_type, None
+
+
+def uploaded_file_entry(original_filename, blob_name, size, blob_client, content_type=None):
+    """Build the per-file success entry returned by the upload endpoint"""
+    return {
+        'filename': original_filename,
+        'blob_name': blob_name,
+        'size': size,
+        'url': blob_client.url,
+        'stream_url': f"/api/videos/{blob_name}/stream",
+        'content_type': content_type or get_content_type(original_filename),
+        'uploaded_at': datetime.utcnow().isoformat()
+    }
+
+
+def hash_file(file):
+    """Return (sha256 hex, size) of a seekable file and rewind it"""
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: file.read(1024 * 1024), b''):
+        digest.update(chunk)
+        size += len(chunk)
+    file.seek(0)
+    return digest.hexdigest(), size
+
+
+def record_upload(entry, checksum=None):
+    """Add an upload to the metadata index (a failure only costs index freshness)"""
+    if video_index is None:
+        return
+    
+    try:
+        with observe_stage('index'):
+            # The blob was just written or located, so its shard is remembered
+            shard = storage_shards.locate(entry['blob_name'], probe=False)
+            video_index.record(
+                entry.get('id', entry['blob_name']), entry['blob_name'], entry['filename'], entry['size'],
+                entry['content_type'], entry['uploaded_at'], checksum, shard.id
+            )
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to index {entry['blob_name']}: {str(e)}")
+
+
+def find_duplicate(checksum, size):
+    """Return the index entry of an existing blob with the same content, or None"""
+    if not dedup_enabled:
+        return None
+    
+    try:
+        with observe_stage('dedup'):
+            # The index only learns about deleted blobs on the next reconcile
+            for existing in video_index.find_by_checksum(checksum, size):
+                container_client = get_blob_container_client(existing['blob_name'], existing['shard'])
+                if container_client.get_blob_client(existing['blob_name']).exists():
+                    return existing
+    except Exception as e:
+        logger.warning(f"⚠️ Duplicate lookup failed: {str(e)}")
+    return None
+
+
+def record_duplicate(original_filename, existing, checksum, container_client=None):
+    """Record an upload as a new entry pointing at the existing blob with the same content"""
+    container_client = container_client or get_blob_container_client(existing['blob_name'], existing['shard'])
+    blob_client = container_client.get_blob_client(existing['blob_name'])
+    entry = uploaded_file_entry(
+        original_filename, existing['blob_name'], existing['size'], blob_client, existing['content_type']
+    )
+    entry['id'] = generate_blob_name(original_filename)
+    entry['deduplicated'] = True
+    record_upload(entry, checksum)
+    logger.info(f"♻️ Duplicate: {original_filename} → {existing['blob_name']} ({existing['size']} bytes saved)")
+    return entry
+
+
+def upload_response(uploaded_files, errors):
+    """Build the upload endpoint response from per-file results"""
+    response = {
+        'success': len(uploaded_files) > 0,
+        'files': uploaded_files,
+        'total': len(uploaded_files)
+    }
+    
+    if errors:
+        response['errors'] = errors
+        response['error_count'] = len(errors)
+    
+    duplicates = [entry for entry in uploaded_files if entry.get('deduplicated')]
+    if duplicates:
+        response['duplicates'] = len(duplicates)
+        response['bytes_saved'] = sum(entry['size'] for entry in duplicates)
+    
+    if uploaded_files:
+        listing_cache.invalidate()
+        schedule_media_probes(uploaded_files)
+    
+    status_code = 200 if uploaded_files else 400
+    return jsonify(response), status_code
+
+
+def probe_blob_media(blob_name):
+    """Read a video's container headers and store its duration, resolution and codecs (runs on the probe executor)"""
+    try:
+        blob_client = get_blob_container_client(blob_name).get_blob_client(blob_name)
+        with observe_stage('probe'):
+            properties = blob_client.get_blob_properties()
+            
+            def read(offset, length):
+                return blob_client.download_blob(
+                    offset=offset, length=length, etag=properties.etag, match_condition=MatchConditions.IfNotModified
+                ).readall()
+            
+            content_type = properties.content_settings.content_type if properties.content_settings else None
+            media = probe_media(read, properties.size, content_type or get_content_type(blob_name))
         
-        uploaded_files = []
-        errors = []
+        if not media:
+            logger.info(f"🎞️ No media details found in {blob_name}")
+            return None
         
-        for file in files:
+        # Set Blob Metadata replaces the whole set, so keep the existing entries
+        blob_client.set_blob_metadata(
+            {**(properties.metadata or {}), **media_metadata(media)},
+            etag=properties.etag, match_condition=MatchConditions.IfNotModified
+        )
+        if video_index is not None:
+            video_index.set_media(blob_name, media)
+        listing_cache.invalidate()
+        logger.info(f"🎞️ Probed {blob_name}: {media}")
+        return media
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to probe {blob_name}: {str(e)}")
+        return None
+
+
+def schedule_media_probes(entries):
+    """Probe newly stored videos in the background (duplicates share an already probed blob)"""
+    if not MEDIA_PROBE_ENABLED:
+        return
+    for entry in entries:
+        if not entry.get('deduplicated'):
+            probe_executor.submit(probe_blob_media, entry['blob_name'])
+
+
+def upload_failed_error(filename, error):
+    """Build the per-file error entry for a failed upload"""
+    logger.error(f"❌ Error uploading {filename}: {str(error)}")
+    UPLOAD_FAILURES.labels(type(error).__name__).inc()
+    if is_container_missing(error):
+        mark_container_missing()
+    return {
+        'filename': filename,
+        'error': 'Upload failed',
+        'message': str(error)
+    }
+
+
+def collect_upload_results(results):
+    """Resolve per-file results (in request order) into the upload response"""
+    uploaded_files = []
+    errors = []
+    
+    for filename, outcome in results:
+        if isinstance(outcome, Future):
             try:
-                # Validate file
-                if not file or file.filename == '':
+                outcome = outcome.result()
+            except Exception as e:
+                errors.append(upload_failed_error(filename, e))
+                continue
+        
+        if 'error' in outcome:
+            errors.append(outcome)
+        else:
+            uploaded_files.append(outcome)
+    
+    return upload_response(uploaded_files, errors)
+
+
+def finish_transfer(plan, size, seconds):
+    """Count an uploaded file and feed its throughput back to the transfer policy"""
+    record_transfer(size, seconds)
+    transfer_policy.record(plan, size, seconds)
+    stats = transfer_policy.stats()
+    TRANSFER_BLOCK_SIZE.set(stats['block_size'])
+    TRANSFER_CONCURRENCY.set(stats['max_concurrency'])
+
+
+def transfer_file(file, blob_client, plan, content_settings, metadata, progress_hook=None):
+    """Send a seekable file to storage as one Put Blob or as staged blocks, as planned"""
+    if plan.single_put:
+        started = time.perf_counter()
+        blob_client.upload_blob(
+            file,
+            overwrite=True,
+            content_settings=content_settings,
+            metadata=metadata,
+            progress_hook=progress_hook
+        )
+        # One request on one connection: the same speed sample a staged block gives
+        transfer_policy.observe_block(file.tell(), time.perf_counter() - started)
+        return
+    
+    writer = BlockBlobWriter(
+        blob_client,
+        plan.block_size,
+        content_settings=content_settings,
+        metadata=metadata,
+        executor=block_executor,
+        max_concurrency=plan.max_concurrency,
+        progress_hook=progress_hook,
+        block_hook=transfer_policy.observe_block
+    )
+    try:
+        for chunk in iter(lambda: file.read(plan.block_size), b''):
+            writer.write(chunk)
+        writer.close()
+    except BaseException:
+        writer.abort()
+        raise
+
+
+def upload_buffered_file(file, original_filename, content_type, blob_client, progress_hook=None):
+    """Upload one spooled file (runs on the upload executor)"""
+    content_settings = ContentSettings(content_type=content_type)
+    with observe_stage('hash'):
+        checksum, size = hash_file(file)
+    metadata = {'original_filename': original_filename, 'sha256': checksum}
+    
+    # The file is hashed before transfer, so a duplicate is never sent to storage
+    existing = find_duplicate(checksum, size)
+    if existing:
+        if progress_hook:
+            progress_hook(size, size)
+        return record_duplicate(original_filename, existing, checksum)
+    
+    plan = transfer_policy.plan(size)
+    started = time.perf_counter()
+    try:
+        with observe_stage('transfer'):
+            transfer_file(file, blob_client, plan, content_settings, metadata, progress_hook)
+    except ResourceNotFoundError as e:
+        if not is_container_missing(e):
+            raise
+        # The container was deleted since it was provisioned: recreate it and retry once
+        mark_container_missing()
+        get_upload_container_client(blob_client.blob_name)
+        file.seek(0)
+        transfer_file(file, blob_client, plan, content_settings, metadata, progress_hook)
+    
+    finish_transfer(plan, size, time.perf_counter() - started)
+    logger.info(f"✅ Uploaded: {original_filename} → {blob_client.blob_name}")
+    entry = uploaded_file_entry(original_filename, blob_client.blob_name, size, blob_client, content_type)
+    record_upload(entry, checksum)
+    return entry
+
+
+def upload_buffered_files():
+    """Upload files parsed by Werkzeug (spooled to temp files first)"""
+    # Check if files are present in request
+    if 'files[]' not in request.files:
+        return jsonify({
+            'success': False,
+            'error': 'No files provided',
+            'message': 'Please select files to upload'
+        }), 400
+    
+    files = request.files.getlist('files[]')
+    
+    if not files or files[0].filename == '':
+        return jsonify({
+            'success': False,
+            'error': 'No files selected',
+            'message': 'Please select at least one file to upload'
+        }), 400
+    
+    results = []
+    
+    for file in files:
+        try:
+            # Validate file
+            if not file or file.filename == '':
+                continue
+            
+            if not allowed_file(file.filename):
+                results.append((file.filename, invalid_file_type_error(file.filename)))
+                continue
+            
+            # Check the real format before anything is sent to storage
+            content_type, error = sniff_upload(file.read(SNIFF_SIZE), file.filename)
+            file.seek(0)
+            if error:
+                results.append((file.filename, error))
+                continue
+            
+            # Generate unique blob name
+            original_filename = secure_filename(file.filename)
+            unique_filename = generate_blob_name(original_filename)
+            
+            # Get blob client
+            container_client = get_upload_container_client(unique_filename)
+            blob_client = container_client.get_blob_client(unique_filename)
+            
+            # Transfers run concurrently; results are collected in request order
+            future = submit_in_context(
+                upload_executor, upload_buffered_file, file, original_filename, content_type, blob_client,
+                storage_progress_hook(unique_filename)
+            )
+            results.append((file.filename, future))
+            
+        except Exception as e:
+            results.append((file.filename, upload_failed_error(file.filename, e)))
+    
+    return collect_upload_results(results)
+
+
+def commit_streamed_file(writer, plan, original_filename, started):
+    """Wait for a streamed file's blocks and commit them (runs on the upload executor)"""
+    with observe_stage('transfer'):
+        writer.flush()
+    
+    existing = find_duplicate(writer.checksum, writer.size)
+    if existing:
+        # Leave the staged blocks uncommitted; Azure garbage collects them
+        return record_duplicate(original_filename, existing, writer.checksum)
+    
+    with observe_stage('commit'):
+        writer.close()
+    finish_transfer(plan, writer.size, time.perf_counter() - started)
+    logger.info(f"✅ Uploaded: {original_filename} → {writer.blob_client.blob_name}")
+    entry = uploaded_file_entry(
+        original_filename, writer.blob_client.blob_name, writer.size, writer.blob_client,
+        writer.content_settings.content_type
+    )
+    record_upload(entry, writer.checksum)
+    return entry
+
+
+def upload_streamed_files():
+    """Upload files while the multipart body streams in, one staged block at a time"""
+    boundary = request.mimetype_params.get('boundary')
+    if not boundary:
+        return jsonify({
+            'success': False,
+            'error': 'Invalid request',
+            'message': 'Multipart boundary is missing'
+        }), 400
+    
+    results = []
+    pending = deque()
+    file_parts = 0
+    selected_parts = 0
+    
+    # State for the file part currently being received
+    writer = None
+    head = None
+    filename = None
+    original_filename = None
+    
+    try:
+        # Time spent receiving and parsing the body, excluding the work done per event
+        for event in timed_iter(iter_multipart_events(request.stream, boundary.encode()), 'parse'):
+            if isinstance(event, File):
+                writer = None
+            
+                if event.name != 'files[]':
                     continue
-                
-                if not allowed_file(file.filename):
-                    errors.append({
-                        'filename': file.filename,
-                        'error': 'Invalid file type',
-                        'message': f'Only {", ".join(ALLOWED_EXTENSIONS).upper()} files are allowed'
-                    })
+                file_parts += 1
+            
+                if not event.filename:
                     continue
-                
-                # Generate unique blob name
-                original_filename = secure_filename(file.filename)
-                file_extension = get_file_extension(original_filename)
-                unique_filename = f"{uuid.uuid4()}.{file_extension}"
-                
-                # Get blob client
-                container_client = blob_service_client.get_container_client(CONTAINER_NAME)
-                
-                # Create container if it doesn't exist
+                selected_parts += 1
+                filename = event.filename
+            
+                if not allowed_file(filename):
+                    results.append((filename, invalid_file_type_error(filename)))
+                    continue
+            
+                original_filename = secure_filename(filename)
+                unique_filename = generate_blob_name(original_filename)
+                head = bytearray()
+                started = time.perf_counter()
+            
+                # Bound the number of files of this request still transferring
+                while len(pending) >= UPLOAD_FILE_CONCURRENCY:
+                    wait([pending.popleft()])
+            
                 try:
-                    container_client.create_container()
-                    logger.info(f"✅ Container '{CONTAINER_NAME}' created")
+                    # The size is unknown until the part ends, so streamed files are always staged in blocks
+                    plan = transfer_policy.plan()
+                    container_client = get_upload_container_client(unique_filename)
+                    writer = BlockBlobWriter(
+                        container_client.get_blob_client(unique_filename),
+                        plan.block_size,
+                        metadata={'original_filename': original_filename},
+                        executor=block_executor,
+                        max_concurrency=plan.max_concurrency,
+                        progress_hook=storage_progress_hook(unique_filename),
+                        block_hook=transfer_policy.observe_block
+                    )
                 except Exception as e:
-                    if "ContainerAlreadyExists" not in str(e):
-                        logger.warning(f"Container creation: {str(e)}")
-                
-                blob_client = container_client.get_blob_client(unique_filename)
-                
-                # Upload file with content type
-                content_settings = ContentSettings(content_type=get_content_type(original_filename))
-                blob_client.upload_blob(
-                    file,
-                    overwrite=True,
-                    content_settings=content_settings
-                )
-                
-                # Get blob URL
-                blob_url = blob_client.url
+                    results.append((filename, upload_failed_error(filename, e)))
+        
+            elif isinstance(event, Data) and writer is not None:
+                try:
+                    data = event.data
+                    if head is not None:
+                        # Hold the first bytes back until the real format is known
+                        head += data
+                        if len(head) < SNIFF_SIZE and event.more_data:
+                            continue
+                    
+                        content_type, error = sniff_upload(bytes(head), filename)
+                        if error:
+                            results.append((filename, error))
+                            writer.abort()
+                            writer = None
+                            continue
+                    
+                        writer.content_settings = ContentSettings(content_type=content_type)
+                        data = bytes(head)
+                        head = None
                 
-                uploaded_files.append({
-                    'filename': original_filename,
-                    'blob_name': unique_filename,
-                    'size': file.content_length or 0,
-                    'url': blob_url,
-                    'content_type': get_content_type(original_filename),
-                    'uploaded_at': datetime.utcnow().isoformat()
-                })
+                    writer.write(data)
                 
-                logger.info(f"✅ Uploaded: {original_filename} → {unique_filename}")
+                    if not event.more_data:
+                        # Commit in the background while the next part is received
+                        future = submit_in_context(
+                            upload_executor, commit_streamed_file, writer, plan, original_filename, started
+                        )
+                        pending.append(future)
+                        results.append((filename, future))
+                        writer = None
+                    
+                except Exception as e:
+                    # Skip the rest of this part; staged blocks are never committed
+                    results.append((filename, upload_failed_error(filename, e)))
+                    writer.abort()
+                    writer = None
+    except Exception:
+        # The body could not be read to the end: drop the current file, and let the commits already submitted
+        # finish (or never start) before the error response releases the upload lease
+        if writer is not None:
+            writer.abort()
+        for future in pending:
+            future.cancel()
+        wait(pending)
+        raise
+    
+    if file_parts == 0:
+        return jsonify({
+            'success': False,
+            'error': 'No files provided',
+            'message': 'Please select files to upload'
+        }), 400
+    
+    if selected_parts == 0:
+        return jsonify({
+            'success': False,
+            'error': 'No files selected',
+            'message': 'Please select at least one file to upload'
+        }), 400
+    
+    return collect_upload_results(results)
+
+
+@app.route('/api/upload', methods=['POST'])
+def upload_video():
+    """Upload video file to Azure Blob Storage"""
+    try:
+        # Check if Azure Storage is configured
+        if not storage_clients.configured:
+            return storage_not_configured()
+        
+        # Turn excess uploads away before they tie up this worker reading the body
+        lease_id, rejection = admit_upload()
+        if rejection:
+            return rejection
+        
+        try:
+            start_upload_progress()
+            with UPLOADS_IN_FLIGHT.track_inprogress():
+                if STREAMING_UPLOADS and request.mimetype == 'multipart/form-data':
+                    return upload_streamed_files()
                 
-            except Exception as e:
-                logger.error(f"❌ Error uploading {file.filename}: {str(e)}")
-                errors.append({
-                    'filename': file.filename,
-                    'error': 'Upload failed',
-                    'message': str(e)
-                })
+                return upload_buffered_files()
+        finally:
+            release_upload(lease_id)
         
-        # Prepare response
-        response = {
-            'success': len(uploaded_files) > 0,
-            'files': uploaded_files,
-            'total': len(uploaded_files)
-        }
+    except HTTPException:
+        # Let Flask error handlers (e.g. 413) build the response
+        raise
+    except Exception as e:
+        logger.error(f"❌ Upload error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Server error',
+            'message': str(e)
+        }), 500
+
+
+@app.route('/api/upload/progress', methods=['GET'])
+def upload_progress_feed():
+    """Storage-side progress of one browser's uploads, polled while they run"""
+    if upload_progress is None:
+        return jsonify({
+            'success': False,
+            'error': 'Upload progress disabled',
+            'message': 'Only browser-side progress is available'
+        }), 503
+    
+    channel = request.args.get('channel', '')
+    if not VALID_ID.match(channel):
+        return jsonify({
+            'success': False,
+            'error': 'Invalid request',
+            'message': 'channel must be 8-64 letters, digits, - or _'
+        }), 400
+    
+    # A snapshot rather than a stream: a held connection would tie up a sync worker per open tab
+    response = jsonify({
+        'success': True,
+        'uploads': upload_progress.read(channel)
+    })
+    response.cache_control.no_cache = True
+    return response
+
+
+def invalid_session():
+    """Response for unknown or malformed upload session ids, or a missing ticket"""
+    return jsonify({
+        'success': False,
+        'error': 'Invalid session',
+        'message': 'Upload session not found'
+    }), 404
+
+
+def session_claims(session_id):
+    """Claims of the request's X-Upload-Ticket when it was issued for this session, else None"""
+    if not is_valid_session_id(session_id, ALLOWED_EXTENSIONS):
+        return None
+    claims = upload_tickets.verify(request.headers.get('X-Upload-Ticket'), purpose='session')
+    return claims if claims and claims.get('blob_name') == session_id else None
+
+
+@app.route('/api/upload/sessions', methods=['POST'])
+def create_upload_session():
+    """Start a resumable upload session for a single large file"""
+    try:
+        if not storage_clients.configured:
+            return storage_not_configured()
+        
+        data = request.get_json(silent=True) or {}
+        filename = data.get('filename', '')
+        size = data.get('size')
+        
+        if not filename or not allowed_file(filename):
+            return jsonify(invalid_file_type_error(filename)), 400
+        
+        if size is not None and (not isinstance(size, int) or size < 0 or size > UPLOAD_SESSION_MAX_SIZE):
+            return jsonify({
+                'success': False,
+                'error': 'File too large',
+                'message': f'Maximum session upload size is {UPLOAD_SESSION_MAX_SIZE} bytes'
+            }), 413
+        
+        original_filename = secure_filename(filename)
+        session_id = generate_blob_name(original_filename)
         
-        if errors:
-            response['errors'] = errors
-            response['error_count'] = len(errors)
+        # Make sure the session's container exists before chunks start arriving
+        get_upload_container_client(session_id)
         
-        status_code = 200 if uploaded_files else 400
-        return jsonify(response), status_code
+        logger.info(f"✅ Upload session started: {original_filename} → {session_id}")
+        return jsonify({
+            'success': True,
+            'session_id': session_id,
+            'ticket': upload_tickets.issue(
+                session_id, original_filename, time.time() + UPLOAD_SESSION_TTL, purpose='session'
+            ),
+            'filename': original_filename,
+            'chunk_size': UPLOAD_SESSION_CHUNK_SIZE,
+            'max_chunks': MAX_CHUNKS,
+            'max_size': UPLOAD_SESSION_MAX_SIZE
+        }), 201
         
     except Exception as e:
-        logger.error(f"❌ Upload error: {str(e)}")
+        logger.error(f"❌ Upload session error: {str(e)}")
         return jsonify({
             'success': False,
             'error': 'Server error',
@@ -211,53 +1285,956 @@ def upload_video():
         }), 500
 
 
-@app.route('/api/videos', methods=['GET'])
-def list_videos():
-    """List all uploaded videos from Azure Blob Storage"""
+@app.route('/api/upload/sessions/<session_id>/chunks/<int:index>', methods=['PUT'])
+def upload_session_chunk(session_id, index):
+    """Stage one numbered chunk of a session as an Azure block"""
     try:
-        # Check if Azure Storage is configured
-        if not blob_service_client:
+        if not storage_clients.configured:
+            return storage_not_configured()
+        
+        if session_claims(session_id) is None:
+            return invalid_session()
+        
+        if index >= MAX_CHUNKS:
             return jsonify({
                 'success': False,
-                'error': 'Azure Storage not configured',
-                'message': 'Please configure AZURE_STORAGE_CONNECTION_STRING environment variable'
-            }), 500
+                'error': 'Invalid chunk',
+                'message': f'Chunk index must be below {MAX_CHUNKS}'
+            }), 400
+        
+        length = request.content_length
+        if not length:
+            return jsonify({
+                'success': False,
+                'error': 'Length required',
+                'message': 'Chunks must be sent with a Content-Length header'
+            }), 411
         
-        container_client = blob_service_client.get_container_client(CONTAINER_NAME)
+        lease_id, rejection = admit_upload()
+        if rejection:
+            return rejection
         
-        # Check if container exists
         try:
-            container_client.get_container_properties()
-        except Exception:
-            return jsonify({
-                'success': True,
-                'videos': [],
-                'total': 0,
-                'message': 'No videos uploaded yet'
-            })
-        
-        # List blobs
-        blobs = container_client.list_blobs()
-        videos = []
-        
-        for blob in blobs:
-            videos.append({
-                'id': blob.name,
-                'filename': blob.name,
-                'size': blob.size,
-                'url': f"{container_client.url}/{blob.name}",
-                'content_type': blob.content_settings.content_type if blob.content_settings else 'video/mp4',
-                'uploaded_at': blob.last_modified.isoformat() if blob.last_modified else None
-            })
+            data = request.stream
+            if index == 0:
+                # The first chunk carries the file header: check the real format before staging it
+                head = request.stream.read(min(SNIFF_SIZE, length))
+                _, error = sniff_upload(head, session_id)
+                if error:
+                    return jsonify({'success': False, **error}), 400
+                data = itertools.chain([head], iter(lambda: request.stream.read(READ_SIZE), b''))
+            
+            container_client = get_upload_container_client(session_id)
+            blob_client = container_client.get_blob_client(session_id)
+            started = time.perf_counter()
+            with UPLOADS_IN_FLIGHT.track_inprogress(), observe_stage('transfer'):
+                blob_client.stage_block(block_id_for_chunk(index), data, length=length)
+            record_transfer(length, time.perf_counter() - started)
+        finally:
+            release_upload(lease_id)
         
         return jsonify({
             'success': True,
-            'videos': videos,
-            'total': len(videos)
+            'session_id': session_id,
+            'chunk': index,
+            'size': length
         })
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"❌ Error listing videos: {str(e)}")
+        logger.error(f"❌ Error staging chunk {index} of {session_id}: {str(e)}")
+        if is_container_missing(e):
+            mark_container_missing()
+        return jsonify({
+            'success': False,
+            'error': 'Upload failed',
+            'message': str(e)
+        }), 500
+
+
+def session_container_client(session_id):
+    """Get the container client a session stages its blocks in (staged blocks cannot be located by probing)"""
+    shard = storage_shards.placement(session_id)
+    storage_shards.remember(session_id, shard)
+    return shard.container_client
+
+
+@app.route('/api/upload/sessions/<session_id>', methods=['GET'])
+def get_upload_session(session_id):
+    """Report which chunks of a session are already stored"""
+    try:
+        if not storage_clients.configured:
+            return storage_not_configured()
+        
+        if session_claims(session_id) is None:
+            return invalid_session()
+        
+        container_client = session_container_client(session_id)
+        committed, staged = get_session_chunks(container_client.get_blob_client(session_id))
+        chunks = committed or staged
+        
+        return jsonify({
+            'success': True,
+            'session_id': session_id,
+            'finalized': bool(committed),
+            'chunks': sorted(chunks),
+            'received_bytes': sum(chunks.values())
+        })
+        
+    except Exception as e:
+        logger.error(f"❌ Error reading session {session_id}: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Server error',
+            'message': str(e)
+        }), 500
+
+
+@app.route('/api/upload/sessions/<session_id>/finalize', methods=['POST'])
+def finalize_upload_session(session_id):
+    """Commit the staged chunks of a session, in order, as the final blob"""
+    try:
+        if not storage_clients.configured:
+            return storage_not_configured()
+        
+        claims = session_claims(session_id)
+        if claims is None:
+            return invalid_session()
+        
+        data = request.get_json(silent=True) or {}
+        total_chunks = data.get('total_chunks')
+        original_filename = claims.get('filename') or session_id
+        
+        if not isinstance(total_chunks, int) or not 0 < total_chunks <= MAX_CHUNKS:
+            return jsonify({
+                'success': False,
+                'error': 'Invalid request',
+                'message': f'total_chunks must be between 1 and {MAX_CHUNKS}'
+            }), 400
+        
+        container_client = session_container_client(session_id)
+        blob_client = container_client.get_blob_client(session_id)
+        committed, staged = get_session_chunks(blob_client)
+        
+        if committed:
+            # A retried finalize (the client lost the response) gets the committed result again
+            if sorted(committed) != list(range(total_chunks)):
+                return jsonify({
+                    'success': False,
+                    'error': 'Already finalized',
+                    'message': f'The session was finalized with {len(committed)} chunk(s)'
+                }), 409
+            properties = blob_client.get_blob_properties()
+            entry = uploaded_file_entry(
+                properties.metadata.get('original_filename', original_filename), session_id,
+                sum(committed.values()), blob_client, properties.content_settings.content_type
+            )
+            return upload_response([entry], [])
+        
+        missing = [index for index in range(total_chunks) if index not in staged]
+        if missing:
+            return jsonify({
+                'success': False,
+                'error': 'Missing chunks',
+                'message': f'{len(missing)} chunk(s) have not been uploaded',
+                'missing': missing[:100]
+            }), 409
+        
+        size = sum(staged[index] for index in range(total_chunks))
+        if size > UPLOAD_SESSION_MAX_SIZE:
+            return jsonify({
+                'success': False,
+                'error': 'File too large',
+                'message': f'Maximum session upload size is {UPLOAD_SESSION_MAX_SIZE} bytes'
+            }), 413
+        
+        try:
+            with observe_stage('commit'):
+                # Never replace an existing blob: only the session's own staged blocks become the video
+                blob_client.commit_block_list(
+                    [block_id_for_chunk(index) for index in range(total_chunks)],
+                    content_settings=ContentSettings(content_type=get_content_type(session_id)),
+                    metadata={'original_filename': original_filename},
+                    match_condition=MatchConditions.IfMissing
+                )
+        except (ResourceExistsError, ResourceModifiedError):
+            return jsonify({
+                'success': False,
+                'error': 'Already finalized',
+                'message': 'The session was finalized by another request'
+            }), 409
+        logger.info(f"✅ Upload session finalized: {original_filename} → {session_id}")
+        
+        # Chunk 0 was checked when staged; type the blob by its content as well
+        content_type = get_content_type(session_id)
+        if UPLOAD_CONTENT_SNIFFING:
+            content_type = detect_video_type(blob_client.download_blob(offset=0, length=SNIFF_SIZE).readall()) or content_type
+            if content_type != get_content_type(session_id):
+                blob_client.set_http_headers(content_settings=ContentSettings(content_type=content_type))
+        
+        entry = uploaded_file_entry(original_filename, session_id, size, blob_client, content_type)
+        record_upload(entry)
+        return upload_response([entry], [])
+        
+    except Exception as e:
+        logger.error(f"❌ Error finalizing session {session_id}: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Upload failed',
+            'message': str(e)
+        }), 500
+
+
+@app.route('/api/upload/sas', methods=['POST'])
+def create_direct_upload():
+    """Issue a short-lived SAS URL so the browser can upload straight to storage"""
+    try:
+        if not DIRECT_UPLOADS_ENABLED:
+            return jsonify({
+                'success': False,
+                'error': 'Direct uploads disabled',
+                'message': 'Upload through /api/upload instead'
+            }), 503
+        
+        if not storage_clients.configured:
+            return storage_not_configured()
+        
+        data = request.get_json(silent=True) or {}
+        filename = data.get('filename', '')
+        size = data.get('size')
+        
+        if not filename or not allowed_file(filename):
+            return jsonify(invalid_file_type_error(filename)), 400
+        
+        if not isinstance(size, int) or size < 0 or size > DIRECT_UPLOAD_MAX_SIZE:
+            return jsonify({
+                'success': False,
+                'error': 'File too large',
+                'message': f'Direct uploads must declare a size of at most {DIRECT_UPLOAD_MAX_SIZE} bytes'
+            }), 413
+        
+        original_filename = secure_filename(filename)
+        blob_name = generate_blob_name(original_filename)
+        blob_client = get_upload_container_client(blob_name).get_blob_client(blob_name)
+        
+        # The key must come from the account the blob is placed in
+        key, key_expiry = user_delegation_keys.get(storage_shards.placement(blob_name).clients.service_client)
+        expiry = min(datetime.now(timezone.utc) + timedelta(seconds=DIRECT_UPLOAD_SAS_TTL), key_expiry)
+        
+        return jsonify({
+            'success': True,
+            'blob_name': blob_name,
+            'filename': original_filename,
+            'upload_url': generate_upload_sas_url(blob_client, key, expiry),
+            'expires_at': expiry.isoformat(),
+            # Proves to /api/upload/complete that this blob name was issued here
+            'ticket': upload_tickets.issue(
+                blob_name, original_filename, expiry.timestamp() + DIRECT_UPLOAD_COMPLETE_WINDOW
+            ),
+            'headers': {
+                'x-ms-blob-type': 'BlockBlob',
+                'x-ms-blob-content-type': get_content_type(original_filename)
+            }
+        }), 201
+        
+    except Exception as e:
+        logger.error(f"❌ Error issuing upload SAS: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Server error',
+            'message': str(e)
+        }), 500
+
+
+@app.route('/api/upload/complete', methods=['POST'])
+def complete_direct_upload():
+    """Validate and record a blob uploaded directly with a SAS URL"""
+    try:
+        if not DIRECT_UPLOADS_ENABLED:
+            return jsonify({
+                'success': False,
+                'error': 'Direct uploads disabled',
+                'message': 'Upload through /api/upload instead'
+            }), 503
+        
+        if not storage_clients.configured:
+            return storage_not_configured()
+        
+        data = request.get_json(silent=True) or {}
+        blob_name = data.get('blob_name', '')
+        
+        # Only blobs issued by /api/upload/sas can be completed; anything else is never touched
+        claims = upload_tickets.verify(data.get('ticket'))
+        if claims is None or claims.get('blob_name') != blob_name \
+                or not is_valid_session_id(blob_name, ALLOWED_EXTENSIONS):
+            return jsonify({
+                'success': False,
+                'error': 'Invalid blob',
+                'message': 'Unknown upload'
+            }), 404
+        original_filename = claims.get('filename') or blob_name
+        
+        container_client = get_blob_container_client(blob_name)
+        blob_client = container_client.get_blob_client(blob_name)
+        
+        try:
+            properties = blob_client.get_blob_properties()
+        except ResourceNotFoundError:
+            return jsonify({
+                'success': False,
+                'error': 'Upload not found',
+                'message': 'The blob has not been uploaded'
+            }), 404
+        
+        # A completed upload carries its original filename; completing it again must not alter it
+        if 'original_filename' in (properties.metadata or {}):
+            return jsonify({
+                'success': False,
+                'error': 'Already completed',
+                'message': 'This upload has already been recorded'
+            }), 409
+        
+        if properties.size > DIRECT_UPLOAD_MAX_SIZE:
+            blob_client.delete_blob()
+            return jsonify({
+                'success': False,
+                'error': 'File too large',
+                'message': f'Maximum direct upload size is {DIRECT_UPLOAD_MAX_SIZE} bytes'
+            }), 413
+        
+        # The browser uploaded unchecked bytes: read the header back and drop anything that is not a video
+        head = blob_client.download_blob(offset=0, length=SNIFF_SIZE).readall() if properties.size else b''
+        content_type, error = sniff_upload(head, blob_name)
+        if error:
+            blob_client.delete_blob()
+            return jsonify({'success': False, **error, 'filename': original_filename}), 400
+        
+        # Record the original filename (keeping any other metadata) and enforce the server-side content type
+        blob_client.set_http_headers(content_settings=ContentSettings(content_type=content_type))
+        blob_client.set_blob_metadata({**(properties.metadata or {}), 'original_filename': original_filename})
+        logger.info(f"✅ Direct upload completed: {original_filename} → {blob_name}")
+        
+        entry = uploaded_file_entry(original_filename, blob_name, properties.size, blob_client, content_type)
+        record_upload(entry)
+        return upload_response([entry], [])
+        
+    except Exception as e:
+        logger.error(f"❌ Error completing direct upload: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Server error',
+            'message': str(e)
+        }), 500
+
+
+@app.route('/api/upload/dedup', methods=['POST'])
+def upload_by_hash():
+    """Record an upload by content hash alone when the same content is already stored"""
+    try:
+        if not dedup_enabled:
+            return jsonify({
+                'success': False,
+                'error': 'Deduplication disabled',
+                'message': 'Upload the file instead'
+            }), 503
+        
+        if not storage_clients.configured:
+            return storage_not_configured()
+        
+        data = request.get_json(silent=True) or {}
+        filename = data.get('filename', '')
+        size = data.get('size')
+        checksum = str(data.get('sha256', '')).lower()
+        
+        if not filename or not allowed_file(filename):
+            return jsonify(invalid_file_type_error(filename)), 400
+        
+        if not isinstance(size, int) or size < 0 or len(checksum) != 64 or not all(c in '0123456789abcdef' for c in checksum):
+            return jsonify({
+                'success': False,
+                'error': 'Invalid request',
+                'message': 'size (bytes) and sha256 (hex) are required'
+            }), 400
+        
+        existing = find_duplicate(checksum, size)
+        if not existing:
+            return jsonify({
+                'success': False,
+                'error': 'Not found',
+                'message': 'No stored video has this content; upload the file'
+            }), 404
+        
+        entry = record_duplicate(secure_filename(filename), existing, checksum)
+        return upload_response([entry], [])
+        
+    except Exception as e:
+        logger.error(f"❌ Error recording duplicate upload: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Server error',
+            'message': str(e)
+        }), 500
+
+
+def video_entry(blob, container_client):
+    """Build the listing entry for one blob"""
+    return {
+        'id': blob.name,
+        'filename': blob.name,
+        'size': blob.size,
+        'url': f"{container_client.url}/{blob.name}",
+        'stream_url': f"/api/videos/{blob.name}/stream",
+        'content_type': blob.content_settings.content_type if blob.content_settings else 'video/mp4',
+        'uploaded_at': blob.last_modified.isoformat() if blob.last_modified else None,
+        'media': media_from_metadata(blob.metadata)
+    }
+
+
+def list_shard_pages(shard, prefix):
+    """Yield one shard's listing, a page of entries at a time (a missing container lists as empty)"""
+    container_client = shard.container_client
+    try:
+        pages = container_client.list_blobs(
+            name_starts_with=prefix, include=['metadata'], results_per_page=VIDEO_LIST_STREAM_PAGE_SIZE
+        ).by_page()
+        for page in pages:
+            yield [video_entry(blob, container_client) for blob in page]
+    except ResourceNotFoundError as e:
+        if not is_container_missing(e):
+            raise
+        mark_container_missing()
+
+
+def stream_video_listing(prefix):
+    """Yield the full listing as a JSON document, one blob at a time, merged by name across shards"""
+    started = time.perf_counter()
+    yield '{"videos": ['
+    total = 0
+    
+    try:
+        # Every shard's next page is fetched in the background while the merge consumes the current ones
+        listings = [
+            itertools.chain.from_iterable(prefetched(list_shard_pages(shard, prefix), listing_executor))
+            for shard in storage_shards.shards
+        ]
+        for entry in heapq.merge(*listings, key=itemgetter('id')):
+            yield (',' if total else '') + json.dumps(entry)
+            total += 1
+        yield f'], "total": {total}, "success": true}}'
+        LIST_SECONDS.labels('stream').observe(time.perf_counter() - started)
+        
+    except Exception as e:
+        # Headers are already sent, so report the failure inside the document
+        logger.error(f"❌ Error streaming video list: {str(e)}")
+        yield f'], "total": {total}, "success": false, "error": "Server error"}}'
+
+
+def fetch_shard_page(shard_id, token, page_size, prefix=None):
+    """List one page of one shard: (entries, next token)"""
+    container_client = storage_shards.get(shard_id).container_client
+    pages = container_client.list_blobs(
+        name_starts_with=prefix, include=['metadata'], results_per_page=page_size
+    ).by_page(continuation_token=token)
+    
+    try:
+        return [video_entry(blob, container_client) for blob in next(pages, [])], pages.continuation_token or None
+    except ResourceNotFoundError as e:
+        if not is_container_missing(e):
+            raise
+        mark_container_missing()
+        return [], None
+
+
+def fetch_video_page(prefix, limit, continuation):
+    """List one page of blobs (a missing container simply means nothing was uploaded yet)"""
+    if storage_shards.sharded:
+        # Merged by name; the continuation tracks the position in every shard
+        videos, next_continuation = merged_page(
+            partial(fetch_shard_page, prefix=prefix), [shard.id for shard in storage_shards.shards],
+            limit, continuation, listing_executor, itemgetter('id')
+        )
+        return {
+            'success': True,
+            'videos': videos,
+            'total': len(videos),
+            'continuation': next_continuation
+        }
+    
+    container_client = get_container_client()
+    pages = container_client.list_blobs(
+        name_starts_with=prefix, include=['metadata'], results_per_page=limit
+    ).by_page(continuation_token=continuation)
+    
+    try:
+        videos = [video_entry(blob, container_client) for blob in next(pages, [])]
+    except ResourceNotFoundError as e:
+        if not is_container_missing(e):
+            raise
+        mark_container_missing()
+        return {
+            'success': True,
+            'videos': [],
+            'total': 0,
+            'continuation': None,
+            'message': 'No videos uploaded yet'
+        }
+    
+    return {
+        'success': True,
+        'videos': videos,
+        'total': len(videos),
+        'continuation': pages.continuation_token or None
+    }
+
+
+def indexed_video_entry(row):
+    """Build the listing entry for one metadata index row"""
+    # Entries indexed before sharding was configured have no shard: they are on the primary one
+    shard = storage_shards.get(row['shard']) or storage_shards.primary
+    return {
+        'id': row['id'],
+        'filename': row['original_filename'],
+        'blob_name': row['blob_name'],
+        'size': row['size'],
+        'url': f"{shard.container_client.url}/{row['blob_name']}",
+        'stream_url': f"/api/videos/{row['id']}/stream",
+        'content_type': row['content_type'],
+        'uploaded_at': row['uploaded_at'],
+        'media': media_from_json(row['media'])
+    }
+
+
+def query_video_index(args, prefix, limit, continuation):
+    """Answer a sorted/filtered listing page from the metadata index (args: the query string as a MultiDict)"""
+    sort = args.get('sort', 'uploaded_at')
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f'sort must be one of {", ".join(SORT_COLUMNS)}')
+    
+    rows, next_continuation = video_index.query(
+        sort=sort,
+        descending=args.get('order', 'desc').lower() != 'asc',
+        limit=limit,
+        continuation=continuation,
+        prefix=prefix,
+        content_type=args.get('content_type') or None,
+        min_size=args.get('min_size', type=int),
+        max_size=args.get('max_size', type=int),
+        search=args.get('q') or None
+    )
+    
+    return {
+        'success': True,
+        'videos': [indexed_video_entry(row) for row in rows],
+        'total': len(rows),
+        'continuation': next_continuation
+    }
+
+
+@app.route('/api/videos', methods=['GET'])
+def list_videos():
+    """List uploaded videos from Azure Blob Storage, one page at a time"""
+    try:
+        # Check if Azure Storage is configured
+        if not storage_clients.configured:
+            return storage_not_configured()
+        
+        prefix = request.args.get('prefix') or None
+        
+        if request.args.get('stream', '').lower() == 'true':
+            return Response(
+                stream_with_context(stream_video_listing(prefix)),
+                mimetype='application/json'
+            )
+        
+        limit = request.args.get('limit', VIDEO_LIST_PAGE_SIZE, type=int)
+        if not limit or not 0 < limit <= VIDEO_LIST_MAX_PAGE_SIZE:
+            return jsonify({
+                'success': False,
+                'error': 'Invalid request',
+                'message': f'limit must be between 1 and {VIDEO_LIST_MAX_PAGE_SIZE}'
+            }), 400
+        
+        # Repeat polls are answered from the cache, or with 304 when the client has it
+        if video_index is None and VIDEO_INDEX_PARAMS & set(request.args):
+            return jsonify({
+                'success': False,
+                'error': 'Invalid request',
+                'message': 'Sorting, filtering and search require the metadata index (VIDEO_INDEX_PATH)'
+            }), 400
+        
+        continuation = request.args.get('continuation') or None
+        cache_key = tuple(sorted(request.args.items(multi=True)))
+        started = time.perf_counter()
+        cached = listing_cache.get(cache_key)
+        source = 'cache'
+        
+        if cached is None:
+            source = 'index' if video_index is not None else 'storage'
+            try:
+                if video_index is not None:
+                    page = query_video_index(request.args, prefix, limit, continuation)
+                else:
+                    page = fetch_video_page(prefix, limit, continuation)
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': 'Invalid request',
+                    'message': str(e)
+                }), 400
+            cached = listing_cache.put(cache_key, json.dumps(page))
+        elapsed = time.perf_counter() - started
+        LIST_SECONDS.labels(source).observe(elapsed)
+        add_stage_time(f'list_{source}', elapsed)
+        
+        response = Response(cached.body, mimetype='application/json')
+        response.set_etag(cached.etag)
+        response.last_modified = cached.last_modified
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+        
+    except Exception as e:
+        logger.error(f"❌ Error listing videos: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Server error',
+            'message': str(e)
+        }), 500
+
+
+def resolve_video_blob(video_id):
+    """Map a video id to its blob name (deduplicated uploads share another entry's blob)"""
+    if video_index is not None:
+        row = video_index.get(video_id)
+        if row:
+            return row['blob_name']
+    return video_id if allowed_file(video_id) and '/' not in video_id else None
+
+
+def get_stream_info(blob_name):
+    """Get the size, ETag and content type of a blob (cached briefly so seeks skip the round trip)"""
+    info = chunk_cache.get_info(blob_name)
+    if info is None:
+        properties = get_blob_container_client(blob_name).get_blob_client(blob_name).get_blob_properties()
+        content_type = properties.content_settings.content_type or get_content_type(blob_name)
+        info = chunk_cache.put_info(blob_name, properties.size, properties.etag, content_type)
+    return info
+
+
+def read_chunk(info, index):
+    """Read one aligned chunk through the cache: bytes, or an open file for disk hits"""
+    def load():
+        offset, length = chunk_cache.chunk_range(index, info.size)
+        blob_client = get_blob_container_client(info.blob_name).get_blob_client(info.blob_name)
+        # Pin the ETag so a chunk of a replaced blob is never cached under the old version
+        return blob_client.download_blob(
+            offset=offset, length=length, etag=info.etag, match_condition=MatchConditions.IfNotModified
+        ).readall()
+    
+    return chunk_cache.fetch(info.blob_name, info.etag, index, load)
+
+
+def iter_video_chunks(info):
+    """Yield a whole video, chunk by chunk"""
+    for index in range(math.ceil(info.size / chunk_cache.chunk_size)):
+        chunk = read_chunk(info, index)
+        if not isinstance(chunk, bytes):
+            with chunk:
+                chunk = chunk.read()
+        yield chunk
+
+
+def video_range_response(info, start, stop):
+    """Build a 206 response for bytes [start, stop), trimmed to the chunk that contains start"""
+    index = start // chunk_cache.chunk_size
+    chunk_offset, chunk_length = chunk_cache.chunk_range(index, info.size)
+    # One chunk per response: players request the rest as they need it
+    stop = min(stop, chunk_offset + chunk_length)
+    chunk = read_chunk(info, index)
+    
+    if isinstance(chunk, bytes):
+        body = chunk[start - chunk_offset:stop - chunk_offset]
+    elif stop == chunk_offset + chunk_length:
+        # Disk hit running to the end of the chunk file: the server can sendfile it
+        chunk.seek(start - chunk_offset)
+        body = wrap_file(request.environ, chunk)
+    else:
+        with chunk:
+            chunk.seek(start - chunk_offset)
+            body = chunk.read(stop - start)
+    
+    response = Response(body, status=206, mimetype=info.content_type, direct_passthrough=True)
+    response.content_length = stop - start
+    response.content_range = ContentRange('bytes', start, stop, info.size)
+    return response
+
+
+@app.route('/api/videos/<video_id>/stream', methods=['GET'])
+def stream_video(video_id):
+    """Stream a video through the app, honouring Range requests"""
+    try:
+        if not storage_clients.configured:
+            return storage_not_configured()
+        
+        blob_name = resolve_video_blob(video_id)
+        if blob_name is None:
+            return jsonify({
+                'success': False,
+                'error': 'Not found',
+                'message': 'Unknown video'
+            }), 404
+        
+        # A single byte range is served from the cache; anything else gets the whole video
+        byte_range = request.range
+        if byte_range is not None and (byte_range.units != 'bytes' or len(byte_range.ranges) != 1):
+            byte_range = None
+        
+        for attempt in range(2):
+            try:
+                info = get_stream_info(blob_name)
+                if_range = request.headers.get('If-Range')
+                
+                if byte_range is None or (if_range and if_range != info.etag) or info.size == 0:
+                    response = Response(stream_with_context(iter_video_chunks(info)), mimetype=info.content_type)
+                    response.content_length = info.size
+                else:
+                    span = byte_range.range_for_length(info.size)
+                    if span is None:
+                        response = Response(status=416)
+                        response.headers['Content-Range'] = f'bytes */{info.size}'
+                        return response
+                    response = video_range_response(info, *span)
+                break
+            except ResourceModifiedError:
+                # The blob was replaced since its properties were cached: start over with the new version
+                chunk_cache.forget_info(blob_name)
+                if attempt:
+                    raise
+        
+        response.headers['Accept-Ranges'] = 'bytes'
+        response.headers['ETag'] = info.etag
+        response.cache_control.private = True
+        return response
+        
+    except ResourceNotFoundError:
+        chunk_cache.forget_info(blob_name)
+        return jsonify({
+            'success': False,
+            'error': 'Not found',
+            'message': 'Unknown video'
+        }), 404
+    except Exception as e:
+        logger.error(f"❌ Error streaming {video_id}: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Server error',
+            'message': str(e)
+        }), 500
+
+
+def bulk_operations_disabled():
+    return jsonify({
+        'success': False,
+        'error': 'Bulk operations disabled',
+        'message': 'Set BULK_OPERATIONS_ENABLED=true to enable them'
+    }), 503
+
+
+def invalid_bulk_request(message):
+    return jsonify({
+        'success': False,
+        'error': 'Invalid request',
+        'message': message
+    }), 400
+
+
+def parse_bulk_ids(data):
+    """Return (unique video ids in request order, error message) for a bulk request body"""
+    ids = data.get('ids')
+    if not isinstance(ids, list) or not ids or not all(isinstance(video_id, str) and video_id for video_id in ids):
+        return None, 'ids must be a non-empty list of video ids'
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > BULK_OPERATION_MAX_VIDEOS:
+        return None, f'At most {BULK_OPERATION_MAX_VIDEOS} videos can be changed per request'
+    return ids, None
+
+
+def resolve_bulk_blobs(ids):
+    """Return ({video id: blob name or None}, distinct blob names)"""
+    blob_of = {video_id: resolve_video_blob(video_id) for video_id in ids}
+    return blob_of, [blob_name for blob_name in dict.fromkeys(blob_of.values()) if blob_name]
+
+
+def run_on_shards(operation, blob_names):
+    """Run operation(container_client, blob names) on the shard holding each blob
+
+    Blobs go to their remembered, indexed or ring-placed shard first; those a
+    shard reports as not found are retried on the other shards in turn, so
+    blobs written before a shard was added are found without probing them
+    one by one.
+    """
+    hints = {}
+    if storage_shards.sharded and video_index is not None:
+        hints = {blob_name: video_index.shard_of(blob_name) for blob_name in blob_names}
+    candidates = {blob_name: storage_shards.candidates(blob_name, hints.get(blob_name)) for blob_name in blob_names}
+    
+    results = {}
+    pending = list(blob_names)
+    for attempt in range(len(storage_shards.shards)):
+        groups = {}
+        for blob_name in pending:
+            groups.setdefault(candidates[blob_name][attempt], []).append(blob_name)
+        for shard, names in groups.items():
+            results.update(operation(shard.container_client, names))
+        pending = [blob_name for blob_name in pending if results[blob_name]['status'] == 'not_found']
+        if not pending:
+            break
+    return results
+
+
+def bulk_response(blob_of, blob_results):
+    """Report the outcome for every requested video, in request order"""
+    results = []
+    for video_id, blob_name in blob_of.items():
+        result = blob_results.get(blob_name) if blob_name else None
+        results.append({'id': video_id, 'blob_name': blob_name, **(result or batch_result('not_found'))})
+    
+    failed = sum(1 for result in results if result['status'] == 'failed')
+    listing_cache.invalidate()
+    return jsonify({
+        'success': failed == 0,
+        'results': results,
+        'total': len(results),
+        'failed': failed
+    }), 200
+
+
+@app.route('/api/videos/delete', methods=['POST'])
+def delete_videos():
+    """Delete many videos with Blob Batch requests"""
+    try:
+        if not BULK_OPERATIONS_ENABLED:
+            return bulk_operations_disabled()
+        
+        if not storage_clients.configured:
+            return storage_not_configured()
+        
+        ids, error = parse_bulk_ids(request.get_json(silent=True) or {})
+        if error:
+            return invalid_bulk_request(error)
+        
+        blob_of, blob_names = resolve_bulk_blobs(ids)
+        
+        # A blob shared with deduplicated uploads that are not being deleted stays; only the entries go
+        shared = video_index.referenced_elsewhere(blob_names, ids) if video_index is not None else set()
+        blob_results = run_on_shards(
+            partial(delete_blobs, executor=batch_executor),
+            [blob_name for blob_name in blob_names if blob_name not in shared]
+        )
+        blob_results.update({blob_name: {'status': 'deleted', 'blob_kept': True} for blob_name in shared})
+        
+        gone = [
+            video_id for video_id, blob_name in blob_of.items()
+            if blob_name and blob_results[blob_name]['status'] in ('deleted', 'not_found')
+        ]
+        if video_index is not None:
+            video_index.remove(gone)
+        for blob_name in blob_names:
+            chunk_cache.forget_info(blob_name)
+        
+        logger.info(f"🗑️ Bulk delete: {len(gone)} of {len(ids)} videos removed")
+        return bulk_response(blob_of, blob_results)
+        
+    except Exception as e:
+        logger.error(f"❌ Error deleting videos: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Server error',
+            'message': str(e)
+        }), 500
+
+
+@app.route('/api/videos/tier', methods=['POST'])
+def set_videos_tier():
+    """Set the access tier of many videos with Blob Batch requests"""
+    try:
+        if not BULK_OPERATIONS_ENABLED:
+            return bulk_operations_disabled()
+        
+        if not storage_clients.configured:
+            return storage_not_configured()
+        
+        data = request.get_json(silent=True) or {}
+        ids, error = parse_bulk_ids(data)
+        if error:
+            return invalid_bulk_request(error)
+        
+        # Compared by value: StandardBlobTier.SMART only exists in newer SDKs
+        tiers = {tier.value.lower(): tier for tier in StandardBlobTier if tier.value != 'Smart'}
+        tier = tiers.get(str(data.get('tier', '')).lower())
+        if tier is None:
+            return invalid_bulk_request(f'tier must be one of {", ".join(tier.value for tier in tiers.values())}')
+        
+        blob_of, blob_names = resolve_bulk_blobs(ids)
+        blob_results = run_on_shards(
+            lambda container_client, names: set_blob_tiers(container_client, tier, names, batch_executor), blob_names
+        )
+        
+        logger.info(f"🧊 Bulk tier: {len(blob_names)} blobs → {tier.value}")
+        return bulk_response(blob_of, blob_results)
+        
+    except Exception as e:
+        logger.error(f"❌ Error setting video tiers: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Server error',
+            'message': str(e)
+        }), 500
+
+
+def metadata_changes_error(changes):
+    """Return why a metadata change set is invalid, or None"""
+    if not isinstance(changes, dict) or not changes:
+        return 'metadata must be a non-empty object of names to values (null removes a name)'
+    for name, value in changes.items():
+        if not METADATA_NAME.match(name):
+            return f'Invalid metadata name: {name}'
+        # These are written by the app itself
+        if name.lower() in ('original_filename', 'sha256') or name.lower().startswith('media_'):
+            return f'Metadata name is reserved: {name}'
+        if value is not None and (not isinstance(value, str) or not value.isascii()):
+            return f'Metadata values must be ASCII strings: {name}'
+    return None
+
+
+@app.route('/api/videos/metadata', methods=['POST'])
+def set_videos_metadata():
+    """Merge metadata into many videos"""
+    try:
+        if not BULK_OPERATIONS_ENABLED:
+            return bulk_operations_disabled()
+        
+        if not storage_clients.configured:
+            return storage_not_configured()
+        
+        data = request.get_json(silent=True) or {}
+        ids, error = parse_bulk_ids(data)
+        changes = data.get('metadata')
+        error = error or metadata_changes_error(changes)
+        if error:
+            return invalid_bulk_request(error)
+        
+        blob_of, blob_names = resolve_bulk_blobs(ids)
+        blob_results = run_on_shards(
+            lambda container_client, names: set_blobs_metadata(container_client, changes, names, batch_executor),
+            blob_names
+        )
+        
+        logger.info(f"🏷️ Bulk metadata: {len(blob_names)} blobs")
+        return bulk_response(blob_of, blob_results)
+        
+    except Exception as e:
+        logger.error(f"❌ Error setting video metadata: {str(e)}")
         return jsonify({
             'success': False,
             'error': 'Server error',
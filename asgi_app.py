@@ -0,0 +1,590 @@
+"""
+Azure Video Upload Web Application - async entry point
+ASGI app serving the upload, listing and health routes with azure.storage.blob.aio,
+so one worker can hold hundreds of slow uploads without tying up a process each
+
+Runs alongside the Flask app (app.py), for example:
+    gunicorn --bind=0.0.0.0 --timeout 600 --workers 2 -k uvicorn.workers.UvicornWorker asgi_app:app
+"""
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+from urllib.parse import parse_qs, parse_qsl
+
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
+from azure.identity.aio import DefaultAzureCredential
+from azure.storage.blob import ContentSettings
+from azure.storage.blob.aio import BlobServiceClient
+from werkzeug.datastructures import MultiDict
+from werkzeug.http import http_date, is_resource_modified, parse_options_header, quote_etag
+from werkzeug.sansio.multipart import Data, File
+from werkzeug.utils import secure_filename
+
+import app as wsgi
+from services.content_sniffer import SNIFF_SIZE
+from services.metrics import (
+    LIST_SECONDS, REQUEST_SECONDS, REQUESTS_IN_FLIGHT, UPLOADS_IN_FLIGHT, observe_stage, render_latest,
+    storage_client_options
+)
+from services.streaming_upload import AsyncBlockBlobWriter, aiter_multipart_events
+from services.upload_progress import VALID_ID, ProgressFeed
+
+logger = logging.getLogger(__name__)
+
+
+class StorageState:
+    """Async storage clients shared by every request on this worker's event loop"""
+
+    def __init__(self):
+        self.credential = None
+        self.service_client = None
+        self.container_client = None
+        # One service client per account and one container client per shard, placed as in app.storage_shards
+        self.service_clients = {}
+        self.containers = {}
+        self.container_lock = asyncio.Lock()
+
+    async def start(self):
+        """Create the credential and clients (one connection pool per account and worker)"""
+        if not wsgi.storage_clients.configured:
+            logger.warning("⚠️ Azure Storage account name not configured")
+            return
+
+        self.credential = DefaultAzureCredential()
+        for shard in wsgi.storage_shards.shards:
+            account_name = shard.clients.account_name
+            if account_name not in self.service_clients:
+                self.service_clients[account_name] = BlobServiceClient(
+                    account_url=f"https://{account_name}.blob.core.windows.net", credential=self.credential,
+                    **storage_client_options()
+                )
+            self.containers[shard.id] = self.service_clients[account_name].get_container_client(shard.container_name)
+
+        self.service_client = self.service_clients[wsgi.storage_clients.account_name]
+        self.container_client = self.containers[wsgi.storage_shards.primary.id]
+        logger.info("✅ Async Azure Blob Storage client initialized with Managed Identity")
+
+    async def stop(self):
+        """Close the connection pools and credential"""
+        for service_client in self.service_clients.values():
+            await service_client.close()
+        if self.credential:
+            await self.credential.close()
+
+    def container_for(self, blob_name, shard_id=None):
+        """Get the container client of the shard holding an existing blob (its shard in the index, when known)"""
+        return self.containers[wsgi.storage_shards.locate(blob_name, shard_id, probe=False).id]
+
+    async def upload_container(self, blob_name):
+        """Get the container client a new blob goes to, provisioning its container once per worker
+
+        Shares the shard's provisioned flag with the sync clients, so mark_container_missing() applies here too
+        """
+        shard = wsgi.storage_shards.placement(blob_name)
+        if not shard.provisioned:
+            async with self.container_lock:
+                if not shard.provisioned:
+                    try:
+                        await self.containers[shard.id].create_container()
+                        logger.info(f"✅ Container '{shard.id}' created")
+                    except ResourceExistsError:
+                        pass
+                    shard.provisioned = True
+        wsgi.storage_shards.remember(blob_name, shard)
+        return self.containers[shard.id]
+
+
+storage = StorageState()
+
+
+async def send_json(send, payload, status=200):
+    """Send a complete JSON response"""
+    body = json.dumps(payload).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode())
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def drain(receive):
+    """Consume the rest of a request body that will not be processed"""
+    message = {'more_body': True}
+    while message.get('more_body'):
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+def storage_not_configured():
+    return {
+        'success': False,
+        'error': 'Azure Storage not configured',
+        'message': 'Please configure AZURE_STORAGE_CONNECTION_STRING environment variable'
+    }
+
+
+async def find_duplicate(checksum, size):
+    """Async variant of app.find_duplicate (the index lookup itself is local)"""
+    if not wsgi.dedup_enabled:
+        return None
+
+    try:
+        # SQLite is blocking; keep it off the event loop
+        for existing in await asyncio.to_thread(wsgi.video_index.find_by_checksum, checksum, size):
+            container_client = storage.container_for(existing['blob_name'], existing['shard'])
+            if await container_client.get_blob_client(existing['blob_name']).exists():
+                return existing
+    except Exception as e:
+        logger.warning(f"⚠️ Duplicate lookup failed: {str(e)}")
+    return None
+
+
+def finishing_progress(send, progress):
+    """Wrap send so the upload's progress entry is finished when its response starts"""
+    async def send_and_finish(message):
+        if message['type'] == 'http.response.start':
+            progress.finish(message['status'] < 400)
+        await send(message)
+    return send_and_finish
+
+
+async def health_check(scope, receive, send):
+    """Health check endpoint"""
+    await send_json(send, {
+        'status': 'healthy',
+        'azure_storage': 'connected' if storage.service_client else 'not_configured',
+        'auth_method': 'managed-identity' if wsgi.AZURE_STORAGE_ACCOUNT_NAME else 'not-configured',
+        'server': 'asgi',
+        'transfer': wsgi.transfer_policy.stats(),
+        'timestamp': datetime.utcnow().isoformat()
+    })
+
+
+async def upload_video(scope, receive, send):
+    """Upload video files to Azure Blob Storage while the multipart body streams in"""
+    if not storage.service_client:
+        await drain(receive)
+        return await send_json(send, storage_not_configured(), 500)
+
+    headers = dict(scope['headers'])
+    mimetype, options = parse_options_header(headers.get(b'content-type', b'').decode('latin-1'))
+    boundary = options.get('boundary')
+    if mimetype != 'multipart/form-data' or not boundary:
+        await drain(receive)
+        return await send_json(send, {
+            'success': False,
+            'error': 'Invalid request',
+            'message': 'Expected a multipart/form-data body'
+        }, 400)
+
+    content_length = int(headers.get(b'content-length', 0) or 0)
+    if content_length > wsgi.app.config['MAX_CONTENT_LENGTH']:
+        return await send_json(send, {
+            'success': False,
+            'error': 'File too large',
+            'message': 'Maximum file size is 100MB'
+        }, 413)
+
+    progress = None
+    if wsgi.upload_progress is not None:
+        progress = wsgi.upload_progress.start(
+            headers.get(b'x-progress-channel', b'').decode('latin-1'),
+            headers.get(b'x-upload-id', b'').decode('latin-1'),
+            content_length or None
+        )
+    if progress is not None:
+        send = finishing_progress(send, progress)
+
+    uploaded_files = []
+    errors = []
+    file_parts = 0
+    selected_parts = 0
+    received = 0
+    writer = None
+    head = None
+    filename = None
+    original_filename = None
+
+    started = None
+
+    try:
+        async for event in aiter_multipart_events(receive, boundary.encode()):
+            if isinstance(event, File):
+                writer = None
+                if event.name != 'files[]':
+                    continue
+                file_parts += 1
+                if not event.filename:
+                    continue
+                selected_parts += 1
+                filename = event.filename
+
+                if not wsgi.allowed_file(filename):
+                    errors.append(wsgi.invalid_file_type_error(filename))
+                    continue
+
+                original_filename = secure_filename(filename)
+                head = bytearray()
+                started = time.perf_counter()
+                blob_name = wsgi.generate_blob_name(original_filename)
+                plan = wsgi.transfer_policy.plan()
+                try:
+                    container_client = await storage.upload_container(blob_name)
+                except Exception as e:
+                    errors.append(wsgi.upload_failed_error(filename, e))
+                    continue
+                writer = AsyncBlockBlobWriter(
+                    container_client.get_blob_client(blob_name),
+                    plan.block_size,
+                    metadata={'original_filename': original_filename},
+                    max_concurrency=plan.max_concurrency,
+                    progress_hook=progress.hook(blob_name) if progress is not None else None,
+                    block_hook=wsgi.transfer_policy.observe_block
+                )
+
+            elif isinstance(event, Data):
+                received += len(event.data)
+                if received > wsgi.app.config['MAX_CONTENT_LENGTH']:
+                    if writer is not None:
+                        writer.abort()
+                    return await send_json(send, {
+                        'success': False,
+                        'error': 'File too large',
+                        'message': 'Maximum file size is 100MB'
+                    }, 413)
+
+                if writer is None:
+                    continue
+                try:
+                    data = event.data
+                    if head is not None:
+                        # Hold the first bytes back until the real format is known
+                        head += data
+                        if len(head) < SNIFF_SIZE and event.more_data:
+                            continue
+                        content_type, error = wsgi.sniff_upload(bytes(head), filename)
+                        if error:
+                            errors.append(error)
+                            writer.abort()
+                            writer = None
+                            continue
+                        writer.content_settings = ContentSettings(content_type=content_type)
+                        data = bytes(head)
+                        head = None
+
+                    await writer.write(data)
+                    if not event.more_data:
+                        with observe_stage('transfer'):
+                            await writer.flush()
+                        existing = await find_duplicate(writer.checksum, writer.size)
+                        if existing:
+                            # Leave the staged blocks uncommitted; Azure garbage collects them
+                            entry = await asyncio.to_thread(
+                                wsgi.record_duplicate, original_filename, existing, writer.checksum,
+                                storage.container_for(existing['blob_name'], existing['shard'])
+                            )
+                        else:
+                            with observe_stage('commit'):
+                                await writer.close()
+                            wsgi.finish_transfer(plan, writer.size, time.perf_counter() - started)
+                            blob_client = writer.blob_client
+                            entry = wsgi.uploaded_file_entry(
+                                original_filename, blob_client.blob_name, writer.size, blob_client,
+                                writer.content_settings.content_type
+                            )
+                            await asyncio.to_thread(wsgi.record_upload, entry, writer.checksum)
+                            logger.info(f"✅ Uploaded: {original_filename} → {blob_client.blob_name}")
+                        uploaded_files.append(entry)
+                        writer = None
+                except Exception as e:
+                    errors.append(wsgi.upload_failed_error(filename, e))
+                    writer.abort()
+                    writer = None
+
+    except ConnectionError:
+        if writer is not None:
+            writer.abort()
+        logger.warning("⚠️ Client disconnected during upload")
+        return
+    except Exception as e:
+        logger.error(f"❌ Upload error: {str(e)}")
+        return await send_json(send, {'success': False, 'error': 'Server error', 'message': str(e)}, 500)
+
+    if file_parts == 0:
+        return await send_json(send, {
+            'success': False,
+            'error': 'No files provided',
+            'message': 'Please select files to upload'
+        }, 400)
+
+    if selected_parts == 0:
+        return await send_json(send, {
+            'success': False,
+            'error': 'No files selected',
+            'message': 'Please select at least one file to upload'
+        }, 400)
+
+    response = {
+        'success': len(uploaded_files) > 0,
+        'files': uploaded_files,
+        'total': len(uploaded_files)
+    }
+    if errors:
+        response['errors'] = errors
+        response['error_count'] = len(errors)
+    duplicates = [entry for entry in uploaded_files if entry.get('deduplicated')]
+    if duplicates:
+        response['duplicates'] = len(duplicates)
+        response['bytes_saved'] = sum(entry['size'] for entry in duplicates)
+    if uploaded_files:
+        wsgi.listing_cache.invalidate()
+        # Probing uses the sync clients on the probe executor's threads
+        wsgi.schedule_media_probes(uploaded_files)
+
+    await send_json(send, response, 200 if uploaded_files else 400)
+
+
+async def metrics(scope, receive, send):
+    """Prometheus metrics, aggregated across workers"""
+    body, content_type = render_latest()
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [(b'content-type', content_type.encode()), (b'content-length', str(len(body)).encode())]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def fetch_video_page(prefix, limit, continuation):
+    """One page of the container listing through the async client (unsharded storage)"""
+    container_client = storage.container_client
+    pages = container_client.list_blobs(
+        name_starts_with=prefix, include=['metadata'], results_per_page=limit
+    ).by_page(continuation_token=continuation)
+
+    videos = []
+    try:
+        async for page in pages:
+            async for blob in page:
+                videos.append(wsgi.video_entry(blob, container_client))
+            break
+    except ResourceNotFoundError as e:
+        if not wsgi.is_container_missing(e):
+            raise
+        wsgi.mark_container_missing()
+        return {
+            'success': True,
+            'videos': [],
+            'total': 0,
+            'continuation': None,
+            'message': 'No videos uploaded yet'
+        }
+
+    return {
+        'success': True,
+        'videos': videos,
+        'total': len(videos),
+        'continuation': pages.continuation_token or None
+    }
+
+
+async def list_videos(scope, receive, send):
+    """List uploaded videos from Azure Blob Storage, one page at a time"""
+    if not storage.service_client:
+        return await send_json(send, storage_not_configured(), 500)
+
+    args = parse_qsl(scope.get('query_string', b'').decode(), keep_blank_values=True)
+    query = dict(args)
+    prefix = query.get('prefix') or None
+    continuation = query.get('continuation') or None
+    try:
+        limit = int(query.get('limit', wsgi.VIDEO_LIST_PAGE_SIZE))
+    except ValueError:
+        limit = 0
+    if not 0 < limit <= wsgi.VIDEO_LIST_MAX_PAGE_SIZE:
+        return await send_json(send, {
+            'success': False,
+            'error': 'Invalid request',
+            'message': f'limit must be between 1 and {wsgi.VIDEO_LIST_MAX_PAGE_SIZE}'
+        }, 400)
+
+    if wsgi.video_index is None and wsgi.VIDEO_INDEX_PARAMS & set(query):
+        return await send_json(send, {
+            'success': False,
+            'error': 'Invalid request',
+            'message': 'Sorting, filtering and search require the metadata index (VIDEO_INDEX_PATH)'
+        }, 400)
+
+    # Same cache, sources and conditional responses as the Flask route
+    cache_key = tuple(sorted(args))
+    started = time.perf_counter()
+    try:
+        cached = await asyncio.to_thread(wsgi.listing_cache.get, cache_key)
+        source = 'cache'
+        if cached is None:
+            if wsgi.video_index is not None:
+                source = 'index'
+                page = await asyncio.to_thread(wsgi.query_video_index, MultiDict(args), prefix, limit, continuation)
+            elif wsgi.storage_shards.sharded:
+                # The merged listing fans out to every shard on the sync clients' threads
+                source = 'storage'
+                page = await asyncio.to_thread(wsgi.fetch_video_page, prefix, limit, continuation)
+            else:
+                source = 'storage'
+                page = await fetch_video_page(prefix, limit, continuation)
+            cached = await asyncio.to_thread(wsgi.listing_cache.put, cache_key, json.dumps(page))
+    except ValueError as e:
+        return await send_json(send, {'success': False, 'error': 'Invalid request', 'message': str(e)}, 400)
+    except Exception as e:
+        logger.error(f"❌ Error listing videos: {str(e)}")
+        return await send_json(send, {'success': False, 'error': 'Server error', 'message': str(e)}, 500)
+    LIST_SECONDS.labels(source).observe(time.perf_counter() - started)
+
+    headers = dict(scope['headers'])
+    etag = quote_etag(cached.etag)
+    response_headers = [
+        (b'etag', etag.encode()),
+        (b'last-modified', http_date(cached.last_modified).encode()),
+        (b'cache-control', b'no-cache')
+    ]
+    modified = is_resource_modified({
+        'REQUEST_METHOD': 'GET',
+        'HTTP_IF_NONE_MATCH': headers.get(b'if-none-match', b'').decode('latin-1'),
+        'HTTP_IF_MODIFIED_SINCE': headers.get(b'if-modified-since', b'').decode('latin-1')
+    }, etag=cached.etag, last_modified=cached.last_modified)
+    if not modified:
+        await send({'type': 'http.response.start', 'status': 304, 'headers': response_headers})
+        return await send({'type': 'http.response.body', 'body': b''})
+
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(cached.body)).encode()),
+            *response_headers
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': cached.body})
+
+
+async def upload_progress_feed(scope, receive, send):
+    """Storage-side progress of one browser's uploads: a JSON snapshot, or Server-Sent Events on request"""
+    if wsgi.upload_progress is None:
+        return await send_json(send, {
+            'success': False,
+            'error': 'Upload progress disabled',
+            'message': 'Only browser-side progress is available'
+        }, 503)
+
+    channel = parse_qs(scope.get('query_string', b'').decode()).get('channel', [''])[0]
+    if not VALID_ID.match(channel):
+        return await send_json(send, {
+            'success': False,
+            'error': 'Invalid request',
+            'message': 'channel must be 8-64 letters, digits, - or _'
+        }, 400)
+
+    # Same snapshot as the Flask route; only this app can afford to hold a connection per tab
+    if b'text/event-stream' not in dict(scope['headers']).get(b'accept', b''):
+        uploads = await asyncio.to_thread(wsgi.upload_progress.read, channel)
+        return await send_json(send, {'success': True, 'uploads': uploads})
+
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no')
+        ]
+    })
+    interval = wsgi.UPLOAD_PROGRESS_INTERVAL
+    await send({'type': 'http.response.body', 'body': f'retry: {int(interval * 1000)}\n\n'.encode(), 'more_body': True})
+
+    # The stream ends on its own once uploads go idle; EventSource reconnects while they continue
+    feed = ProgressFeed(wsgi.upload_progress, channel)
+    disconnected = asyncio.ensure_future(receive())
+    started = idle_since = sent = time.monotonic()
+    try:
+        while time.monotonic() - started < wsgi.UPLOAD_PROGRESS_STREAM_SECONDS and not disconnected.done():
+            events, active = await asyncio.to_thread(feed.poll)
+            if events or time.monotonic() - sent > 15:
+                body = (events or ': keep-alive\n\n').encode()
+                await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+                sent = time.monotonic()
+            if active:
+                idle_since = time.monotonic()
+            elif time.monotonic() - idle_since > wsgi.UPLOAD_PROGRESS_IDLE_SECONDS:
+                break
+            await asyncio.sleep(interval)
+        if not disconnected.done():
+            await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        disconnected.cancel()
+
+
+ROUTES = {
+    ('GET', '/health'): health_check,
+    ('GET', '/api/health'): health_check,
+    ('POST', '/api/upload'): upload_video,
+    ('GET', '/api/videos'): list_videos,
+    ('GET', '/api/upload/progress'): upload_progress_feed,
+    ('GET', '/metrics'): metrics,
+}
+
+
+async def lifespan(receive, send):
+    """Create the shared clients and start the worker's background services at startup; close them at shutdown"""
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await storage.start()
+            # Token warm-up and the index reconciler, as gunicorn's post_worker_init hook does for sync workers
+            wsgi.start_worker_services()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await storage.stop()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """ASGI application"""
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    handler = ROUTES.get((scope['method'], scope['path']))
+    if handler is None:
+        return await send_json(send, {
+            'success': False,
+            'error': 'Not found',
+            'message': 'The requested URL was not found'
+        }, 404)
+
+    status = []
+
+    async def send_and_record(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+        await send(message)
+
+    started = time.perf_counter()
+    with REQUESTS_IN_FLIGHT.track_inprogress():
+        if handler is upload_video:
+            with UPLOADS_IN_FLIGHT.track_inprogress():
+                await handler(scope, receive, send_and_record)
+        else:
+            await handler(scope, receive, send_and_record)
+    REQUEST_SECONDS.labels(scope['method'], scope['path'], str(status[0] if status else 0)).observe(
+        time.perf_counter() - started
+    )
@@ -0,0 +1,3 @@
+"""
+Benchmarks for the upload and listing paths
+"""
@@ -0,0 +1,270 @@
+"""
+In-process Azure Blob Storage stand-in for benchmarks
+Implements the subset of BlobServiceClient / ContainerClient / BlobClient
+the app uses, with a configurable per-call latency and per-transfer
+bandwidth so storage cost shows up in the measurements
+"""
+import itertools
+import threading
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+
+
+class StorageProfile:
+    """Simulated storage cost: fixed latency per call plus payload size / bandwidth"""
+
+    def __init__(self, latency=0.0, bandwidth=None):
+        self.latency = latency
+        self.bandwidth = bandwidth  # bytes per second per transfer; None is unlimited
+
+    def call(self, payload=0):
+        delay = self.latency
+        if self.bandwidth and payload:
+            delay += payload / self.bandwidth
+        if delay:
+            time.sleep(delay)
+
+
+def payload_size(data):
+    """Size of an upload body without keeping it (bytes, file-like or iterable)"""
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return len(data)
+    if hasattr(data, 'read'):
+        size = 0
+        for chunk in iter(lambda: data.read(1024 * 1024), b''):
+            size += len(chunk)
+        return size
+    return sum(len(chunk) for chunk in data)
+
+
+class FakeBlobProperties(SimpleNamespace):
+    pass
+
+
+class FakeDownload:
+    def __init__(self, data):
+        self._data = data
+
+    def readall(self):
+        return self._data
+
+    def chunks(self):
+        yield self._data
+
+
+class FakePages:
+    """Page iterator with a continuation_token, like ItemPaged.by_page()"""
+
+    def __init__(self, container, prefix, page_size, continuation_token):
+        self._container = container
+        self._prefix = prefix
+        self._page_size = page_size
+        self._position = int(continuation_token or 0)
+        self._done = False
+        self.continuation_token = continuation_token
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._done:
+            raise StopIteration
+        names = self._container.sorted_names(self._prefix)
+        page = names[self._position:self._position + self._page_size]
+        self._position += self._page_size
+        self._done = self._position >= len(names)
+        self.continuation_token = None if self._done else str(self._position)
+        self._container.profile.call()
+        return iter([self._container.properties(name) for name in page])
+
+
+class FakeItemPaged:
+    def __init__(self, container, prefix, page_size):
+        self._container = container
+        self._prefix = prefix
+        self._page_size = page_size
+
+    def by_page(self, continuation_token=None):
+        return FakePages(self._container, self._prefix, self._page_size, continuation_token)
+
+    def __iter__(self):
+        for page in self.by_page():
+            yield from page
+
+
+class FakeBlobClient:
+    def __init__(self, container, blob_name):
+        self._container = container
+        self.blob_name = blob_name
+        self.container_name = container.container_name
+        self.account_name = container.account_name
+        self.url = f"{container.url}/{blob_name}"
+
+    def upload_blob(self, data, overwrite=False, content_settings=None, metadata=None, **kwargs):
+        size = payload_size(data)
+        self._container.profile.call(size)
+        with self._container.lock:
+            if not overwrite and self.blob_name in self._container.blobs:
+                raise ResourceExistsError('BlobAlreadyExists')
+            self._container.put(self.blob_name, size, content_settings, metadata)
+
+    def stage_block(self, block_id, data, length=None, **kwargs):
+        size = payload_size(data)
+        self._container.profile.call(size)
+        with self._container.lock:
+            self._container.staged.setdefault(self.blob_name, {})[str(block_id)] = size
+
+    def commit_block_list(self, block_list, content_settings=None, metadata=None, **kwargs):
+        self._container.profile.call()
+        with self._container.lock:
+            if kwargs.get('match_condition') == MatchConditions.IfMissing and self.blob_name in self._container.blobs:
+                raise ResourceExistsError('BlobAlreadyExists')
+            staged = self._container.staged.pop(self.blob_name, {})
+            block_ids = [str(getattr(block, 'id', block)) for block in block_list]
+            blocks = {block_id: staged[block_id] for block_id in block_ids}
+            self._container.put(self.blob_name, sum(blocks.values()), content_settings, metadata, blocks)
+
+    def get_block_list(self, block_list_type='committed', **kwargs):
+        self._container.profile.call()
+        with self._container.lock:
+            staged = self._container.staged.get(self.blob_name)
+            blob = self._container.blobs.get(self.blob_name)
+            if staged is None and blob is None:
+                raise ResourceNotFoundError('BlobNotFound')
+            committed = blob['blocks'] if blob else {}
+            return (
+                [SimpleNamespace(id=block_id, size=size) for block_id, size in committed.items()],
+                [SimpleNamespace(id=block_id, size=size) for block_id, size in (staged or {}).items()]
+            )
+
+    def get_blob_properties(self, **kwargs):
+        self._container.profile.call()
+        if self.blob_name not in self._container.blobs:
+            raise ResourceNotFoundError('BlobNotFound')
+        return self._container.properties(self.blob_name)
+
+    def exists(self, **kwargs):
+        self._container.profile.call()
+        return self.blob_name in self._container.blobs
+
+    def download_blob(self, offset=0, length=None, **kwargs):
+        properties = self.get_blob_properties()
+        end = properties.size if length is None else min(properties.size, (offset or 0) + length)
+        if kwargs.get('match_condition') == MatchConditions.IfNotModified and kwargs.get('etag') != properties.etag:
+            raise ResourceModifiedError('ConditionNotMet')
+        self._container.profile.call(end - (offset or 0))
+        # Content is not kept; return zeros of the requested length
+        return FakeDownload(bytes(end - (offset or 0)))
+
+    def set_http_headers(self, content_settings=None, **kwargs):
+        self._container.profile.call()
+        self._container.blobs[self.blob_name].update(
+            content_settings=content_settings, etag=self._container.next_etag()
+        )
+
+    def set_blob_metadata(self, metadata=None, **kwargs):
+        self._container.profile.call()
+        self._container.blobs[self.blob_name].update(
+            metadata=dict(metadata or {}), etag=self._container.next_etag()
+        )
+
+    def delete_blob(self, **kwargs):
+        self._container.profile.call()
+        with self._container.lock:
+            if self._container.blobs.pop(self.blob_name, None) is None:
+                raise ResourceNotFoundError('BlobNotFound')
+            self._container.names = None
+
+
+class FakeContainerClient:
+    def __init__(self, service, container_name):
+        self.account_name = service.account_name
+        self.container_name = container_name
+        self.url = f"{service.url}/{container_name}"
+        self.profile = service.profile
+        self.lock = threading.Lock()
+        self.created = False
+        self.blobs = {}
+        self.staged = {}
+        self.names = None
+        self._etags = itertools.count(1)
+
+    def create_container(self, **kwargs):
+        self.profile.call()
+        if self.created:
+            raise ResourceExistsError('ContainerAlreadyExists')
+        self.created = True
+
+    def exists(self, **kwargs):
+        self.profile.call()
+        return self.created
+
+    def get_blob_client(self, blob):
+        return FakeBlobClient(self, blob)
+
+    def list_blobs(self, name_starts_with=None, include=None, results_per_page=None, **kwargs):
+        return FakeItemPaged(self, name_starts_with, results_per_page or 5000)
+
+    def put(self, name, size, content_settings=None, metadata=None, blocks=None):
+        """Store a blob's properties (callers hold the lock); content itself is discarded"""
+        now = datetime.now(timezone.utc)
+        self.blobs[name] = {
+            'size': size,
+            'content_settings': content_settings,
+            'metadata': dict(metadata or {}),
+            'last_modified': now,
+            'etag': self.next_etag(),
+            'blocks': dict(blocks or {}),
+            'creation_time': self.blobs.get(name, {}).get('creation_time', now)
+        }
+        self.names = None
+
+    def next_etag(self):
+        """A new ETag, as Azure Storage assigns on every write"""
+        return f'"0x{next(self._etags):016X}"'
+
+    def populate(self, count, size=1024 * 1024, prefix='bench-'):
+        """Add count synthetic blobs without simulated cost"""
+        with self.lock:
+            for i in range(count):
+                self.put(f"{prefix}{i:08d}.mp4", size, SimpleNamespace(content_type='video/mp4'))
+
+    def clear(self):
+        with self.lock:
+            self.blobs.clear()
+            self.staged.clear()
+            self.names = None
+
+    def sorted_names(self, prefix=None):
+        with self.lock:
+            if self.names is None:
+                self.names = sorted(self.blobs)
+            names = self.names
+        if prefix:
+            return [name for name in names if name.startswith(prefix)]
+        return names
+
+    def properties(self, name):
+        blob = self.blobs[name]
+        return FakeBlobProperties(name=name, **blob)
+
+
+class FakeBlobServiceClient:
+    """Stand-in for azure.storage.blob.BlobServiceClient"""
+
+    def __init__(self, profile=None, account_name='benchmark'):
+        self.account_name = account_name
+        self.url = f"https://{account_name}.blob.core.windows.net"
+        self.profile = profile or StorageProfile()
+        self._containers = {}
+        self._lock = threading.Lock()
+
+    def get_container_client(self, container):
+        with self._lock:
+            if container not in self._containers:
+                self._containers[container] = FakeContainerClient(self, container)
+            return self._containers[container]
@@ -0,0 +1,339 @@
+"""
+Upload and listing benchmarks
+Starts benchmarks/server.py (the Flask app on a local storage stand-in) in
+a subprocess, drives /api/upload and /api/videos across file sizes, file
+counts, container sizes and concurrency levels, and writes p50/p95/p99
+latency, throughput and peak server RSS to a JSON file
+
+    python -m benchmarks.run
+    python -m benchmarks.run --file-sizes 1MB,100MB --concurrency 1,8 --compare benchmarks/results/before.json
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+UNITS = {'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+
+# A minimal MP4 header so uploads pass the content check; the rest is padding
+MP4_HEADER = b'\x00\x00\x00\x18ftypisom\x00\x00\x02\x00isomiso2'
+PAD_CHUNK = bytes(1024 * 1024)
+
+
+def parse_size(value):
+    value = value.strip().upper()
+    for unit, factor in UNITS.items():
+        if value.endswith(unit):
+            return int(float(value[:-len(unit)]) * factor)
+    return int(value)
+
+
+def parse_list(value, parse=int):
+    return [parse(item) for item in value.split(',') if item.strip()]
+
+
+def format_size(size):
+    for unit in ('GB', 'MB', 'KB'):
+        if size >= UNITS[unit] and size % UNITS[unit] == 0:
+            return f"{size // UNITS[unit]}{unit}"
+    return f"{size}B"
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+class RssSampler:
+    """Track the peak resident set size of a process by polling /proc (Linux)"""
+
+    def __init__(self, pid, interval=0.01):
+        self.path = f'/proc/{pid}/status'
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def read(self):
+        try:
+            with open(self.path) as status:
+                for line in status:
+                    if line.startswith('VmRSS:'):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            return None
+        return None
+
+    def __enter__(self):
+        self.peak = self.read()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            rss = self.read()
+            if rss is not None:
+                self.peak = max(self.peak or 0, rss)
+
+
+class BenchmarkServer:
+    """benchmarks/server.py in a subprocess"""
+
+    def __init__(self, latency_ms, bandwidth_mbps, env=None):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            self.port = sock.getsockname()[1]
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'benchmarks.server', '--port', str(self.port),
+             '--latency-ms', str(latency_ms), '--bandwidth-mbps', str(bandwidth_mbps)],
+            cwd=ROOT, env={**os.environ, **(env or {})}, stdout=subprocess.PIPE, text=True
+        )
+        line = self.process.stdout.readline()
+        if not line.startswith('ready'):
+            self.process.kill()
+            raise RuntimeError('Benchmark server failed to start')
+
+    def request(self, method, path, body=None, headers=None):
+        """Send one request; returns (status, response body, seconds)"""
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=600)
+        started = time.perf_counter()
+        try:
+            connection.request(method, path, body=body, headers=headers or {})
+            response = connection.getresponse()
+            data = response.read()
+            return response.status, data, time.perf_counter() - started
+        finally:
+            connection.close()
+
+    def reset_container(self, blobs=0):
+        self.request('POST', '/_bench/container', json.dumps({'blobs': blobs}), {'Content-Type': 'application/json'})
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait(timeout=10)
+
+
+def multipart_upload(file_size, file_count):
+    """Return (headers, body iterator factory) for a multipart upload of generated files"""
+    boundary = uuid.uuid4().hex
+    part_head = (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="files[]"; filename="bench.mp4"\r\n'
+        f'Content-Type: video/mp4\r\n\r\n'
+    ).encode()
+    tail = f'--{boundary}--\r\n'.encode()
+    length = file_count * (len(part_head) + file_size + 2) + len(tail)
+
+    def file_body():
+        yield MP4_HEADER[:file_size]
+        remaining = file_size - min(file_size, len(MP4_HEADER))
+        while remaining > 0:
+            chunk = PAD_CHUNK[:remaining]
+            remaining -= len(chunk)
+            yield chunk
+
+    def body():
+        for _ in range(file_count):
+            yield part_head
+            yield from file_body()
+            yield b'\r\n'
+        yield tail
+
+    headers = {'Content-Type': f'multipart/form-data; boundary={boundary}', 'Content-Length': str(length)}
+    return headers, body
+
+
+def run_scenario(server, concurrency, total_requests, send):
+    """Run send() total_requests times on concurrency threads; returns measurements"""
+    latencies = []
+    errors = 0
+    transferred = 0
+    lock = threading.Lock()
+
+    def worker(_):
+        nonlocal errors, transferred
+        status, size, seconds = send()
+        with lock:
+            latencies.append(seconds)
+            if status != 200:
+                errors += 1
+            else:
+                transferred += size
+
+    with RssSampler(server.process.pid) as rss:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(worker, range(total_requests)))
+        wall = time.perf_counter() - started
+
+    return {
+        'requests': total_requests,
+        'errors': errors,
+        'wall_seconds': round(wall, 3),
+        'requests_per_second': round(total_requests / wall, 2),
+        'throughput_mb_per_second': round(transferred / wall / UNITS['MB'], 2),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50) * 1000, 2),
+            'p95': round(percentile(latencies, 95) * 1000, 2),
+            'p99': round(percentile(latencies, 99) * 1000, 2),
+            'max': round(max(latencies) * 1000, 2)
+        },
+        'peak_rss_mb': round(rss.peak / UNITS['MB'], 1) if rss.peak else None
+    }
+
+
+def upload_scenarios(server, args):
+    for file_size, file_count, concurrency in itertools.product(args.file_sizes, args.file_counts, args.concurrency):
+        server.reset_container()
+        headers, body = multipart_upload(file_size, file_count)
+
+        def send():
+            status, _, seconds = server.request('POST', '/api/upload', body(), headers)
+            return status, file_size * file_count, seconds
+
+        params = {'file_size': format_size(file_size), 'file_count': file_count, 'concurrency': concurrency}
+        yield 'upload', params, run_scenario(server, concurrency, args.requests, send)
+
+
+def list_scenarios(server, args, stream=False):
+    for container_size, concurrency in itertools.product(args.container_sizes, args.concurrency):
+        server.reset_container(container_size)
+        path = '/api/videos?stream=true' if stream else f'/api/videos?limit={args.page_size}'
+
+        def send():
+            status, data, seconds = server.request('GET', path)
+            return status, len(data), seconds
+
+        params = {'container_size': container_size, 'concurrency': concurrency}
+        if not stream:
+            params['page_size'] = args.page_size
+        yield 'list-stream' if stream else 'list', params, run_scenario(server, concurrency, args.requests, send)
+
+
+def scenario_key(result):
+    return (result['scenario'], json.dumps(result['params'], sort_keys=True))
+
+
+def compare(results, baseline_path):
+    """Print the change of each scenario against a previous results file"""
+    with open(baseline_path) as baseline_file:
+        baseline = {scenario_key(result): result for result in json.load(baseline_file)['results']}
+
+    print(f"\nCompared with {baseline_path}:")
+    for result in results:
+        before = baseline.get(scenario_key(result))
+        if before is None:
+            continue
+
+        def change(new, old):
+            return f"{(new - old) / old * 100:+.1f}%" if old else 'n/a'
+
+        print(
+            f"  {result['scenario']:<12} {json.dumps(result['params'])}: "
+            f"p50 {change(result['latency_ms']['p50'], before['latency_ms']['p50'])}, "
+            f"p95 {change(result['latency_ms']['p95'], before['latency_ms']['p95'])}, "
+            f"throughput {change(result['throughput_mb_per_second'], before['throughput_mb_per_second'])}"
+        )
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark /api/upload and /api/videos against a local storage stand-in')
+    parser.add_argument('--scenarios', type=lambda v: parse_list(v, str), default=['upload', 'list', 'list-stream'])
+    parser.add_argument('--file-sizes', type=lambda v: parse_list(v, parse_size), default=[UNITS['MB'], 10 * UNITS['MB']])
+    parser.add_argument('--file-counts', type=parse_list, default=[1, 4])
+    parser.add_argument('--container-sizes', type=parse_list, default=[100, 10000])
+    parser.add_argument('--concurrency', type=parse_list, default=[1, 8])
+    parser.add_argument('--requests', type=int, default=20, help='Requests per scenario')
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--latency-ms', type=float, default=5.0, help='Simulated latency of each storage call')
+    parser.add_argument('--bandwidth-mbps', type=float, default=200.0,
+                        help='Simulated storage bandwidth per transfer in MB/s (0 is unlimited)')
+    parser.add_argument('--list-cache', action='store_true', help='Keep the listing cache on (off by default)')
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--compare', help='Previous results file to compare against')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    env = {} if args.list_cache else {'VIDEO_LIST_CACHE_TTL': '0'}
+    server = BenchmarkServer(args.latency_ms, args.bandwidth_mbps, env)
+
+    results = []
+    try:
+        runs = []
+        if 'upload' in args.scenarios:
+            runs.append(upload_scenarios(server, args))
+        if 'list' in args.scenarios:
+            runs.append(list_scenarios(server, args))
+        if 'list-stream' in args.scenarios:
+            runs.append(list_scenarios(server, args, stream=True))
+
+        for scenario, params, measured in itertools.chain(*runs):
+            results.append({'scenario': scenario, 'params': params, **measured})
+            latency = measured['latency_ms']
+            print(
+                f"{scenario:<12} {json.dumps(params)}: p50 {latency['p50']}ms p95 {latency['p95']}ms "
+                f"p99 {latency['p99']}ms, {measured['throughput_mb_per_second']} MB/s, "
+                f"{measured['requests_per_second']} req/s, peak RSS {measured['peak_rss_mb']} MB"
+                + (f", {measured['errors']} errors" if measured['errors'] else ''),
+                flush=True
+            )
+    finally:
+        server.stop()
+
+    started = datetime.now(timezone.utc)
+    output = args.output or os.path.join(RESULTS_DIR, f"{started.strftime('%Y%m%dT%H%M%SZ')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as results_file:
+        json.dump({
+            'meta': {
+                'timestamp': started.isoformat(),
+                'commit': git_commit(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpus': os.cpu_count(),
+                'settings': {
+                    'latency_ms': args.latency_ms,
+                    'bandwidth_mbps': args.bandwidth_mbps,
+                    'list_cache': args.list_cache,
+                    'requests_per_scenario': args.requests
+                }
+            },
+            'results': results
+        }, results_file, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark server
+Runs the Flask app from app.py on a threaded local server, backed by the
+in-process storage stand-in, with a few control routes used by run.py
+"""
+import argparse
+import logging
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--port', type=int, default=8799)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Simulated latency of each storage call')
+    parser.add_argument('--bandwidth-mbps', type=float, default=0.0,
+                        help='Simulated storage bandwidth per transfer in MB/s (0 is unlimited)')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    # Configure the app before importing it: no Azure credentials, no background token refresh
+    os.environ.setdefault('AZURE_STORAGE_ACCOUNT_NAME', 'benchmark')
+    os.environ.setdefault('STORAGE_TOKEN_PREFETCH', 'false')
+    # Admission limits are sized for gunicorn's sync workers; measure the upload path itself
+    os.environ.setdefault('UPLOAD_ADMISSION_ENABLED', 'false')
+    # Probing reads each uploaded file's header back from storage; keep it out of upload timings
+    os.environ.setdefault('MEDIA_PROBE_ENABLED', 'false')
+    os.environ.pop('PROMETHEUS_MULTIPROC_DIR', None)
+    logging.disable(logging.INFO)
+
+    import app as video_app
+    from flask import jsonify, request
+    from werkzeug.serving import make_server
+
+    from benchmarks.fake_storage import FakeBlobServiceClient, StorageProfile
+
+    profile = StorageProfile(
+        latency=args.latency_ms / 1000,
+        bandwidth=args.bandwidth_mbps * 1024 * 1024 if args.bandwidth_mbps else None
+    )
+    video_app.storage_clients.use(FakeBlobServiceClient(profile))
+
+    @video_app.app.route('/_bench/container', methods=['POST'])
+    def bench_container():
+        """Reset the container and optionally fill it with synthetic blobs"""
+        container_client = video_app.get_container_client()
+        container_client.clear()
+        container_client.populate((request.get_json(silent=True) or {}).get('blobs', 0))
+        video_app.listing_cache.invalidate()
+        return jsonify({'success': True, 'blobs': len(container_client.blobs)})
+
+    server = make_server('127.0.0.1', args.port, video_app.app, threaded=True)
+    print(f"ready {args.port}", flush=True)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
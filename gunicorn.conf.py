@@ -0,0 +1,30 @@
+"""
+Gunicorn configuration
+Loaded automatically from the working directory; command-line flags
+(startup.txt) still set bind, timeout and workers
+"""
+import glob
+import os
+
+# Workers write Prometheus samples here so /metrics can aggregate them (set before any worker imports the app)
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus-metrics')
+
+
+def on_starting(server):
+    """Start every deployment with empty metrics"""
+    metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    os.makedirs(metrics_dir, exist_ok=True)
+    for path in glob.glob(os.path.join(metrics_dir, '*.db')):
+        os.remove(path)
+
+
+def post_worker_init(worker):
+    """Warm up storage clients in each worker as soon as it has forked"""
+    from app import start_worker_services
+    start_worker_services()
+
+
+def child_exit(server, worker):
+    """Drop a dead worker's live gauges from the aggregated metrics"""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
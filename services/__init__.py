@@ -0,0 +1,4 @@
+"""
+Service modules for the Azure Video Upload Web Application
+Storage, caching and upload helpers used by the Flask routes in app.py
+"""
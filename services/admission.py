@@ -0,0 +1,133 @@
+"""
+Upload admission control
+Caps concurrent uploads and in-flight upload bytes across every worker on
+the instance, with a fair share per client, so long uploads cannot occupy
+the workers that health checks and listings need. Leases live in a small
+SQLite database shared by the workers
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    id TEXT PRIMARY KEY,
+    client TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    pid INTEGER NOT NULL,
+    started REAL NOT NULL
+);
+"""
+
+# lease_id is None when the upload was turned away; reason says which limit it hit
+Admission = namedtuple('Admission', ['lease_id', 'reason'])
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class UploadAdmission:
+    """Instance-wide upload limits: concurrent uploads, in-flight bytes and per-client fair share
+
+    A client may always hold one upload while the global limits allow it;
+    beyond that it gets at most an equal share of the slots and bytes among
+    the clients that are uploading. Leases of workers that died (or that
+    outlived lease_ttl) are reclaimed on the next admission.
+    """
+
+    def __init__(self, path, max_uploads, max_bytes, max_per_client, lease_ttl=660):
+        self.path = path
+        self.max_uploads = max_uploads
+        self.max_bytes = max_bytes
+        self.max_per_client = max_per_client
+        self.lease_ttl = lease_ttl
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        # One connection per thread, never carried across a fork; transactions are explicit
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def acquire(self, client, size):
+        """Admit an upload of size bytes for client; returns an Admission"""
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._reclaim(conn)
+            leases = conn.execute("SELECT client, bytes FROM leases").fetchall()
+            reason = self._check(leases, client, size)
+            lease_id = None
+            if reason is None:
+                lease_id = uuid.uuid4().hex
+                conn.execute(
+                    "INSERT INTO leases (id, client, bytes, pid, started) VALUES (?, ?, ?, ?, ?)",
+                    (lease_id, client, size, os.getpid(), time.time())
+                )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return Admission(lease_id, reason)
+
+    def release(self, lease_id):
+        if lease_id:
+            self._connection().execute("DELETE FROM leases WHERE id = ?", (lease_id,))
+
+    def stats(self):
+        uploads, in_flight, clients = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(bytes), 0), COUNT(DISTINCT client) FROM leases"
+        ).fetchone()
+        return {
+            'uploads': uploads,
+            'bytes': in_flight,
+            'clients': clients,
+            'max_uploads': self.max_uploads,
+            'max_bytes': self.max_bytes,
+            'max_per_client': self.max_per_client
+        }
+
+    def _check(self, leases, client, size):
+        """Return the limit an upload would exceed ('uploads', 'bytes' or 'client'), or None"""
+        total_bytes = sum(lease_bytes for _, lease_bytes in leases)
+        if len(leases) >= self.max_uploads:
+            return 'uploads'
+        if total_bytes + size > self.max_bytes and leases:
+            return 'bytes'
+
+        own = [lease_bytes for lease_client, lease_bytes in leases if lease_client == client]
+        if not own:
+            return None
+        clients = len({lease_client for lease_client, _ in leases} | {client})
+        slot_share = max(1, min(self.max_per_client, math.floor(self.max_uploads / clients)))
+        byte_share = self.max_bytes / clients
+        if len(own) >= slot_share or sum(own) + size > byte_share:
+            return 'client'
+        return None
+
+    def _reclaim(self, conn):
+        stale = [
+            lease_id for lease_id, pid, started in conn.execute("SELECT id, pid, started FROM leases")
+            if started < time.time() - self.lease_ttl or not process_alive(pid)
+        ]
+        conn.executemany("DELETE FROM leases WHERE id = ?", [(lease_id,) for lease_id in stale])
@@ -0,0 +1,100 @@
+"""
+Static asset build
+Copies static/css and static/js to static/dist under content-hashed names,
+writes gzip (and brotli) variants next to them and a manifest mapping the
+source paths to the built ones. Run before deploying:
+
+    python -m services.assets
+"""
+import hashlib
+import json
+import os
+import shutil
+
+from services.compression import ENCODINGS, SUFFIXES, compress
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATIC_DIR = os.path.join(ROOT, 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_NAME = 'manifest.json'
+
+# Only text assets benefit from pre-compression
+BUILD_EXTENSIONS = {'.js', '.css', '.svg', '.json', '.txt', '.map'}
+
+
+def hashed_name(path, data):
+    """css/styles.css -> css/styles.<first 12 hex of sha256>.css"""
+    stem, extension = os.path.splitext(path)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{extension}"
+
+
+def build_assets(static_dir=STATIC_DIR, dist_dir=DIST_DIR):
+    """Build every asset under static_dir into a fresh dist_dir; returns the manifest"""
+    if os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+
+    manifest = {'assets': {}, 'encodings': list(ENCODINGS)}
+    for directory, subdirectories, filenames in os.walk(static_dir):
+        # Never rebuild previous output
+        subdirectories[:] = [name for name in subdirectories if os.path.join(directory, name) != dist_dir]
+        for filename in sorted(filenames):
+            if os.path.splitext(filename)[1] not in BUILD_EXTENSIONS:
+                continue
+            source = os.path.join(directory, filename)
+            path = os.path.relpath(source, static_dir).replace(os.sep, '/')
+            with open(source, 'rb') as source_file:
+                data = source_file.read()
+
+            built = hashed_name(path, data)
+            target = os.path.join(dist_dir, built)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as target_file:
+                target_file.write(data)
+            for encoding in ENCODINGS:
+                with open(target + SUFFIXES[encoding], 'wb') as compressed_file:
+                    compressed_file.write(compress(data, encoding, level=9))
+            manifest['assets'][path] = built
+
+    with open(os.path.join(dist_dir, MANIFEST_NAME), 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    return manifest
+
+
+class AssetManifest:
+    """Source path -> built asset lookup; empty (everything falls back to /static) when not built"""
+
+    def __init__(self, static_dir=STATIC_DIR, dist_dir=DIST_DIR):
+        self.dist_dir = dist_dir
+        try:
+            with open(os.path.join(dist_dir, MANIFEST_NAME)) as manifest_file:
+                manifest = json.load(manifest_file)
+        except (OSError, ValueError):
+            manifest = {}
+        # Sources edited since the build are served from /static until the next build
+        self.assets = {
+            path: built for path, built in manifest.get('assets', {}).items()
+            if self._is_current(os.path.join(static_dir, path), path, built)
+        }
+        self.encodings = tuple(manifest.get('encodings', ()))
+        self._built = set(self.assets.values())
+
+    @staticmethod
+    def _is_current(source, path, built):
+        try:
+            with open(source, 'rb') as source_file:
+                return hashed_name(path, source_file.read()) == built
+        except OSError:
+            return False
+
+    def get(self, path):
+        """Built name of a source path, or None"""
+        return self.assets.get(path)
+
+    def is_built(self, name):
+        return name in self._built
+
+
+if __name__ == '__main__':
+    built = build_assets()
+    for source, target in sorted(built['assets'].items()):
+        print(f"{source} -> dist/{target} ({', '.join(built['encodings'])})")
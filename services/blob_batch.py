@@ -0,0 +1,101 @@
+"""
+Bulk blob operations
+Deletes and re-tiers many blobs with Blob Batch requests (up to 256
+subrequests each, several batches in parallel) and sets metadata on many
+blobs concurrently, reporting the outcome of every blob
+"""
+import re
+
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceModifiedError, ResourceNotFoundError
+
+# Maximum subrequests in one Blob Batch request
+BATCH_LIMIT = 256
+
+# Metadata names must be valid C# identifiers
+METADATA_NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+def chunked(items, size=BATCH_LIMIT):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def batch_result(status, error=None):
+    result = {'status': status}
+    if error:
+        result['error'] = error
+    return result
+
+
+def run_batches(send, blob_names, executor, success):
+    """Call send(chunk) for every batch-sized chunk of blob_names in parallel
+
+    send returns the subrequest responses of its chunk, in order; a status in
+    success means the blob was updated. Returns {blob name: result}.
+    """
+    futures = [(chunk, executor.submit(lambda chunk: list(send(chunk)), chunk)) for chunk in chunked(blob_names)]
+    results = {}
+
+    for chunk, future in futures:
+        try:
+            responses = future.result()
+        except Exception as e:
+            # The whole batch failed (auth, network, throttling): report every blob in it
+            for blob_name in chunk:
+                results[blob_name] = batch_result('failed', str(e))
+            continue
+
+        for blob_name, response in zip(chunk, responses):
+            if response.status_code in success:
+                results[blob_name] = batch_result(success[response.status_code])
+            elif response.status_code == 404:
+                results[blob_name] = batch_result('not_found')
+            else:
+                results[blob_name] = batch_result('failed', f'{response.status_code} {response.reason}')
+    return results
+
+
+def delete_blobs(container_client, blob_names, executor):
+    """Delete blobs (and their snapshots) in parallel batches"""
+    def send(chunk):
+        return container_client.delete_blobs(*chunk, delete_snapshots='include', raise_on_any_failure=False)
+
+    return run_batches(send, blob_names, executor, {202: 'deleted'})
+
+
+def set_blob_tiers(container_client, tier, blob_names, executor):
+    """Set the access tier of blobs in parallel batches"""
+    def send(chunk):
+        return container_client.set_standard_blob_tier_blobs(tier, *chunk, raise_on_any_failure=False)
+
+    return run_batches(send, blob_names, executor, {200: 'updated', 202: 'updated'})
+
+
+def merge_blob_metadata(blob_client, changes, attempts=3):
+    """Apply changes (None removes a name) to a blob's metadata, retrying if it changes underneath us"""
+    for attempt in range(attempts):
+        properties = blob_client.get_blob_properties()
+        metadata = {**(properties.metadata or {}), **changes}
+        try:
+            blob_client.set_blob_metadata(
+                {name: value for name, value in metadata.items() if value is not None},
+                etag=properties.etag, match_condition=MatchConditions.IfNotModified
+            )
+            return
+        except ResourceModifiedError:
+            if attempt == attempts - 1:
+                raise
+
+
+def set_blobs_metadata(container_client, changes, blob_names, executor):
+    """Merge metadata changes into many blobs concurrently (there is no batch operation for metadata)"""
+    def update(blob_name):
+        try:
+            merge_blob_metadata(container_client.get_blob_client(blob_name), changes)
+            return batch_result('updated')
+        except ResourceNotFoundError:
+            return batch_result('not_found')
+        except Exception as e:
+            return batch_result('failed', str(e))
+
+    return dict(zip(blob_names, executor.map(update, blob_names)))
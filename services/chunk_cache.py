@@ -0,0 +1,191 @@
+"""
+Video chunk cache
+Read-through cache of fixed-size, aligned blob chunks for range requests:
+a small in-memory LRU in front of a bounded on-disk LRU that is shared by
+every worker on the instance. Disk hits are returned as open files so they
+can be sent with sendfile
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+BlobInfo = namedtuple('BlobInfo', ['blob_name', 'size', 'etag', 'content_type', 'expires'])
+
+
+class ChunkCache:
+    """Memory + disk LRU of blob chunks keyed by (blob name, ETag, chunk index)
+
+    A blob overwritten in storage gets a new ETag, so stale chunks are never
+    served; they simply age out. Concurrent misses for the same chunk share
+    one download.
+    """
+
+    def __init__(self, chunk_size, memory_bytes, disk_dir=None, disk_bytes=0, info_ttl=60):
+        self.chunk_size = chunk_size
+        self.memory_bytes = memory_bytes
+        self.disk_dir = disk_dir if disk_bytes else None
+        self.disk_bytes = disk_bytes
+        self.info_ttl = info_ttl
+        self.hits = {'memory': 0, 'disk': 0}
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._memory_used = 0
+        self._disk_used = None
+        self._info = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def chunk_range(self, index, size):
+        """Return (offset, length) of chunk index within a blob of size bytes"""
+        offset = index * self.chunk_size
+        return offset, min(self.chunk_size, size - offset)
+
+    def get_info(self, blob_name):
+        """Return cached blob properties (BlobInfo) or None"""
+        with self._lock:
+            info = self._info.get(blob_name)
+            if info and info.expires > time.time():
+                self._info.move_to_end(blob_name)
+                return info
+            self._info.pop(blob_name, None)
+            return None
+
+    def put_info(self, blob_name, size, etag, content_type):
+        info = BlobInfo(blob_name, size, etag, content_type, time.time() + self.info_ttl)
+        with self._lock:
+            self._info[blob_name] = info
+            while len(self._info) > 1024:
+                self._info.popitem(last=False)
+        return info
+
+    def forget_info(self, blob_name):
+        with self._lock:
+            self._info.pop(blob_name, None)
+
+    def fetch(self, blob_name, etag, index, load):
+        """Return chunk index as bytes (memory hit or fresh download) or an open file (disk hit)
+
+        load() downloads the chunk on a miss; only one caller per chunk does so at a time.
+        """
+        key = (blob_name, etag, index)
+
+        while True:
+            chunk = self._lookup(key)
+            if chunk is not None:
+                return chunk
+
+            with self._lock:
+                waiter = self._in_flight.get(key)
+                if waiter is None:
+                    self._in_flight[key] = threading.Event()
+                    self.misses += 1
+                    break
+            # Another thread is downloading this chunk; use its result
+            waiter.wait()
+
+        try:
+            data = load()
+            self._store(key, data)
+            return data
+        finally:
+            with self._lock:
+                self._in_flight.pop(key).set()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits['memory'] + self.hits['disk'] + self.misses
+            return {
+                'memory_hits': self.hits['memory'],
+                'disk_hits': self.hits['disk'],
+                'misses': self.misses,
+                'hit_rate': round((total - self.misses) / total, 3) if total else 0.0,
+                'memory_bytes': self._memory_used,
+                'disk': bool(self.disk_dir)
+            }
+
+    def _lookup(self, key):
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.hits['memory'] += 1
+                return data
+
+        if not self.disk_dir:
+            return None
+        path = self._path(key)
+        try:
+            chunk_file = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+        # The mtime is the LRU clock for disk eviction
+        os.utime(path)
+        with self._lock:
+            self.hits['disk'] += 1
+        return chunk_file
+
+    def _store(self, key, data):
+        if len(data) <= self.memory_bytes:
+            with self._lock:
+                if key not in self._memory:
+                    self._memory[key] = data
+                    self._memory_used += len(data)
+                while self._memory_used > self.memory_bytes:
+                    _, evicted = self._memory.popitem(last=False)
+                    self._memory_used -= len(evicted)
+
+        if self.disk_dir:
+            try:
+                self._write_disk(key, data)
+            except OSError:
+                pass  # The disk tier is best effort
+
+    def _path(self, key):
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.disk_dir, f'{digest}.chunk')
+
+    def _write_disk(self, key, data):
+        # Write-then-rename so other workers never read a partial chunk
+        fd, temp_path = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as chunk_file:
+            chunk_file.write(data)
+        os.replace(temp_path, self._path(key))
+
+        with self._lock:
+            if self._disk_used is not None:
+                self._disk_used += len(data)
+            needs_sweep = self._disk_used is None or self._disk_used > self.disk_bytes
+        if needs_sweep:
+            self._evict_disk()
+
+    def _evict_disk(self):
+        """Delete the least recently used chunks until the directory is under 90% of its budget"""
+        entries = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith('.chunk'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        used = sum(size for _, size, _ in entries)
+        if used > self.disk_bytes:
+            target = self.disk_bytes * 0.9
+            for _, size, path in sorted(entries):
+                if used <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                used -= size
+
+        with self._lock:
+            self._disk_used = used
@@ -0,0 +1,49 @@
+"""
+Response compression
+Content-encoding negotiation and gzip/brotli helpers shared by the asset
+build (pre-compressed files) and the JSON API (compressed on the fly).
+Brotli is used when the optional brotli package is installed
+"""
+import gzip
+import zlib
+
+try:
+    import brotli
+except ImportError:  # Optional dependency
+    brotli = None
+
+# Preferred first; file suffixes of pre-compressed assets
+ENCODINGS = ('br', 'gzip') if brotli else ('gzip',)
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def choose_encoding(accept_encodings, available=ENCODINGS):
+    """Pick the first available encoding the client accepts (request.accept_encodings), or None"""
+    for encoding in available:
+        if accept_encodings[encoding] > 0:
+            return encoding
+    return None
+
+
+def compress(data, encoding, level=6):
+    """Compress bytes; level is a gzip level (1-9) and is mapped onto brotli's quality range"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=min(11, level + 1))
+    # mtime=0 keeps the output reproducible (content-hashed assets)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def compress_stream(chunks, encoding, level=6):
+    """Compress an iterable of str/bytes chunks, yielding output as the compressor produces it"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=min(11, level + 1))
+        process, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+        process, finish = compressor.compress, compressor.flush
+
+    for chunk in chunks:
+        output = process(chunk.encode() if isinstance(chunk, str) else chunk)
+        if output:
+            yield output
+    yield finish()
@@ -0,0 +1,83 @@
+"""
+Video content sniffing
+Identifies the real container format of an upload from its first bytes
+(MP4/MOV ftyp boxes, Matroska/WebM EBML header, AVI RIFF header) so bad
+files are rejected before anything is sent to storage
+"""
+
+# Bytes needed from the start of a file to identify its format
+SNIFF_SIZE = 4096
+
+EBML_MAGIC = b'\x1a\x45\xdf\xa3'
+EBML_DOCTYPE_ID = b'\x42\x82'
+
+# Top-level atoms that open QuickTime files written without an ftyp box
+QUICKTIME_ATOMS = {b'moov', b'mdat', b'wide', b'free', b'skip', b'pnot'}
+
+# Extensions acceptable for each detected type (MP4/MOV and MKV/WebM share a container format)
+TYPE_EXTENSIONS = {
+    'video/mp4': {'mp4', 'mov'},
+    'video/quicktime': {'mov', 'mp4'},
+    'video/x-matroska': {'mkv', 'webm'},
+    'video/webm': {'webm', 'mkv'},
+    'video/x-msvideo': {'avi'}
+}
+
+FORMAT_NAMES = {
+    'video/mp4': 'MP4',
+    'video/quicktime': 'QuickTime',
+    'video/x-matroska': 'Matroska',
+    'video/webm': 'WebM',
+    'video/x-msvideo': 'AVI'
+}
+
+
+def read_vint(data, pos):
+    """Read an EBML variable-length integer; returns (value, next position) or (None, pos)"""
+    if pos >= len(data) or data[pos] == 0:
+        return None, pos
+    length = 8 - data[pos].bit_length() + 1
+    if pos + length > len(data):
+        return None, pos
+    value = data[pos] & (0xff >> length)
+    for byte in data[pos + 1:pos + length]:
+        value = (value << 8) | byte
+    return value, pos + length
+
+
+def ebml_doctype(head):
+    """Return the DocType string of an EBML header (e.g. 'webm', 'matroska'), or None"""
+    pos = head.find(EBML_DOCTYPE_ID, len(EBML_MAGIC))
+    if pos < 0:
+        return None
+    size, start = read_vint(head, pos + len(EBML_DOCTYPE_ID))
+    if size is None or start + size > len(head):
+        return None
+    return head[start:start + size].rstrip(b'\x00').decode('ascii', 'replace')
+
+
+def detect_video_type(head):
+    """Return the content type of a video from its first bytes, or None if unrecognised"""
+    if len(head) >= 12 and head[4:8] == b'ftyp':
+        return 'video/quicktime' if head[8:12] == b'qt  ' else 'video/mp4'
+
+    if len(head) >= 8 and head[4:8] in QUICKTIME_ATOMS:
+        return 'video/quicktime'
+
+    if head.startswith(EBML_MAGIC):
+        doctype = ebml_doctype(head)
+        if doctype == 'webm':
+            return 'video/webm'
+        if doctype == 'matroska':
+            return 'video/x-matroska'
+        return None
+
+    if len(head) >= 12 and head[:4] == b'RIFF' and head[8:12] == b'AVI ':
+        return 'video/x-msvideo'
+
+    return None
+
+
+def matches_extension(content_type, extension):
+    """Whether a detected content type is plausible for a filename extension"""
+    return extension.lower() in TYPE_EXTENSIONS.get(content_type, ())
@@ -0,0 +1,182 @@
+"""
+Video listing cache
+Keeps serialized /api/videos pages with a TTL and LRU eviction so repeat
+polls are answered without a storage call or JSON serialization
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timezone
+
+CachedListing = namedtuple('CachedListing', ['body', 'etag', 'last_modified', 'expires', 'generation'])
+
+
+class ListingCache:
+    """TTL/LRU cache of listing pages, invalidated as a whole after uploads
+
+    Every entry is tagged with a generation; invalidate() bumps it. When a
+    shared directory is configured, the generation is the mtime of a marker
+    file and pages are also stored there, so all gunicorn workers on the
+    instance share entries and see each other's invalidations. Stale and
+    surplus page files are pruned on invalidate() and every ttl seconds.
+    """
+
+    def __init__(self, ttl, max_entries, shared_dir=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.shared_dir = shared_dir
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._generation = 0
+        self._pruned = 0.0
+        self._lock = threading.Lock()
+
+        if shared_dir:
+            os.makedirs(shared_dir, exist_ok=True)
+            self._marker = os.path.join(shared_dir, 'generation')
+            if not os.path.exists(self._marker):
+                open(self._marker, 'a').close()
+
+    def get(self, key):
+        """Return a fresh cached page or None"""
+        generation = self._current_generation()
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and (entry.generation != generation or entry.expires <= now):
+                del self._entries[key]
+                entry = None
+
+        if entry is None and self.shared_dir:
+            entry = self._read_shared(key, generation, now)
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._store(key, entry)
+            return entry
+
+    def put(self, key, body):
+        """Cache a serialized page and return its entry"""
+        body = body.encode() if isinstance(body, str) else body
+        entry = CachedListing(
+            body=body,
+            etag=hashlib.sha1(body).hexdigest(),
+            last_modified=datetime.now(timezone.utc).replace(microsecond=0),
+            expires=time.time() + self.ttl,
+            generation=self._current_generation()
+        )
+
+        with self._lock:
+            self._store(key, entry)
+        if self.shared_dir:
+            self._write_shared(key, entry)
+            if time.time() - self._pruned >= self.ttl:
+                self._prune_shared()
+        return entry
+
+    def invalidate(self):
+        """Drop every cached page (in all workers when shared)"""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self.invalidations += 1
+
+        if self.shared_dir:
+            now = time.time_ns()
+            with open(self._marker, 'a'):
+                os.utime(self._marker, ns=(now, now))
+            self._prune_shared()
+
+    def stats(self):
+        """Hit/miss counters for the health endpoint"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'entries': len(self._entries),
+                'invalidations': self.invalidations,
+                'shared': bool(self.shared_dir)
+            }
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _current_generation(self):
+        if not self.shared_dir:
+            return self._generation
+        try:
+            return os.stat(self._marker).st_mtime_ns
+        except OSError:
+            return 0
+
+    def _shared_path(self, key):
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.shared_dir, f'{digest}.json')
+
+    def _read_shared(self, key, generation, now):
+        try:
+            with open(self._shared_path(key)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if data['generation'] != generation or data['expires'] <= now:
+            return None
+        return CachedListing(
+            body=data['body'].encode(),
+            etag=data['etag'],
+            last_modified=datetime.fromisoformat(data['last_modified']),
+            expires=data['expires'],
+            generation=data['generation']
+        )
+
+    def _write_shared(self, key, entry):
+        path = self._shared_path(key)
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump({
+                    'body': entry.body.decode(),
+                    'etag': entry.etag,
+                    'last_modified': entry.last_modified.isoformat(),
+                    'expires': entry.expires,
+                    'generation': entry.generation
+                }, f)
+            os.replace(temp_path, path)
+        except OSError:
+            pass
+
+    def _prune_shared(self):
+        """Delete page files written before the last invalidation or expired, then the oldest beyond max_entries"""
+        self._pruned = time.time()
+        cutoff = max(self._pruned - self.ttl, self._current_generation() / 1e9)
+        entries = []
+        for entry in os.scandir(self.shared_dir):
+            if entry.name.endswith(('.json', '.tmp')):
+                try:
+                    mtime = entry.stat().st_mtime
+                except FileNotFoundError:
+                    continue
+                entries.append((mtime, entry.path))
+
+        entries.sort(reverse=True)
+        for index, (mtime, path) in enumerate(entries):
+            if mtime < cutoff or index >= self.max_entries:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,375 @@
+"""
+Video metadata probing
+Reads duration, resolution, codecs and bitrate from MP4/MOV moov atoms and
+Matroska/WebM segment headers, fetching only the byte ranges it needs
+through a read(offset, length) callable (ranged blob downloads)
+"""
+import json
+import struct
+
+from services.content_sniffer import read_vint
+
+# First read of every probe; covers ftyp + a front moov or the EBML/Segment headers of most files
+PROBE_HEAD_SIZE = 64 * 1024
+# Header atoms/elements larger than this are not fetched
+MAX_HEADER_SIZE = 64 * 1024 * 1024
+MAX_TOP_LEVEL_BOXES = 64
+
+# Fields stored in blob metadata (as media_<name>) and returned in listings
+MEDIA_FIELDS = {
+    'duration': float,
+    'width': int,
+    'height': int,
+    'video_codec': str,
+    'audio_codec': str,
+    'bitrate': int
+}
+
+CODEC_NAMES = {
+    # MP4/MOV sample entry formats
+    'avc1': 'h264', 'avc3': 'h264', 'hvc1': 'hevc', 'hev1': 'hevc', 'av01': 'av1', 'vp08': 'vp8',
+    'vp09': 'vp9', 'mp4v': 'mpeg4', 'jpeg': 'mjpeg', 'apch': 'prores', 'apcn': 'prores',
+    'apcs': 'prores', 'apco': 'prores', 'ap4h': 'prores', 'mp4a': 'aac', 'ac-3': 'ac3',
+    'ec-3': 'eac3', 'opus': 'opus', 'fLaC': 'flac', '.mp3': 'mp3', 'lpcm': 'pcm', 'sowt': 'pcm',
+    'twos': 'pcm',
+    # Matroska CodecIDs
+    'V_MPEG4/ISO/AVC': 'h264', 'V_MPEGH/ISO/HEVC': 'hevc', 'V_AV1': 'av1', 'V_VP8': 'vp8',
+    'V_VP9': 'vp9', 'V_MPEG4/ISO/ASP': 'mpeg4', 'V_MJPEG': 'mjpeg', 'A_AAC': 'aac', 'A_OPUS': 'opus',
+    'A_VORBIS': 'vorbis', 'A_AC3': 'ac3', 'A_EAC3': 'eac3', 'A_FLAC': 'flac', 'A_MPEG/L3': 'mp3',
+    'A_PCM/INT/LIT': 'pcm'
+}
+
+MP4_CONTAINERS = {b'trak', b'mdia', b'minf', b'stbl'}
+
+# Matroska element IDs (marker bits included)
+EBML_HEADER = 0x1A45DFA3
+SEGMENT = 0x18538067
+SEEK_HEAD = 0x114D9B74
+SEEK = 0x4DBB
+SEEK_ID = 0x53AB
+SEEK_POSITION = 0x53AC
+INFO = 0x1549A966
+TIMECODE_SCALE = 0x2AD7B1
+DURATION = 0x4489
+TRACKS = 0x1654AE6B
+TRACK_ENTRY = 0xAE
+TRACK_TYPE = 0x83
+CODEC_ID = 0x86
+VIDEO = 0xE0
+PIXEL_WIDTH = 0xB0
+PIXEL_HEIGHT = 0xBA
+CLUSTER = 0x1F43B675
+
+
+def codec_name(codec_id):
+    return CODEC_NAMES.get(codec_id, codec_id.strip().lower())
+
+
+def probe_media(read, size, content_type):
+    """Return a dict of MEDIA_FIELDS for a video, or None if its headers are missing or malformed
+
+    read(offset, length) returns the bytes of a range of the video; size is its total length.
+    """
+    if not size:
+        return None
+    try:
+        if content_type in ('video/mp4', 'video/quicktime'):
+            media = probe_mp4(read, size)
+        elif content_type in ('video/webm', 'video/x-matroska'):
+            media = probe_matroska(read, size)
+        else:
+            return None
+    except (ValueError, IndexError, struct.error):
+        return None
+
+    if not media:
+        return None
+    if media.get('duration'):
+        media['bitrate'] = int(size * 8 / media['duration'])
+        media['duration'] = round(media['duration'], 3)
+    return {key: value for key, value in media.items() if value}
+
+
+def media_metadata(media):
+    """Blob metadata entries for probe results"""
+    return {f'media_{key}': str(value) for key, value in media.items() if key in MEDIA_FIELDS}
+
+
+def media_from_metadata(metadata):
+    """Probe results stored in blob metadata, or None if the blob has not been probed"""
+    media = {}
+    for key, parse in MEDIA_FIELDS.items():
+        value = (metadata or {}).get(f'media_{key}')
+        if value is not None:
+            try:
+                media[key] = parse(value)
+            except ValueError:
+                pass
+    return media or None
+
+
+def media_from_json(value):
+    return json.loads(value) if value else None
+
+
+# ===== MP4 / MOV =====
+
+def iter_boxes(data, start=0, end=None):
+    """Yield (type, payload start, box end) for the boxes in data[start:end]"""
+    end = len(data) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        box_size, box_type = struct.unpack_from('>I4s', data, pos)
+        header = 8
+        if box_size == 1:
+            box_size, = struct.unpack_from('>Q', data, pos + 8)
+            header = 16
+        elif box_size == 0:
+            box_size = end - pos
+        if box_size < header or pos + box_size > end:
+            return
+        yield box_type, pos + header, pos + box_size
+        pos += box_size
+
+
+def find_moov(read, size):
+    """Walk the top-level boxes, skipping over mdat, and return the moov payload, or None
+
+    Each read fetches a PROBE_HEAD_SIZE window, so a moov at either end of
+    the file usually arrives with the read that finds its header.
+    """
+    window_start = 0
+    window = read(0, min(size, PROBE_HEAD_SIZE))
+    pos = 0
+    for _ in range(MAX_TOP_LEVEL_BOXES):
+        if pos + 8 > size:
+            return None
+        if pos + min(16, size - pos) > window_start + len(window):
+            window_start = pos
+            window = read(pos, min(PROBE_HEAD_SIZE, size - pos))
+        header = window[pos - window_start:pos - window_start + 16]
+        box_size, box_type = struct.unpack_from('>I4s', header)
+        header_size = 8
+        if box_size == 1:
+            box_size, = struct.unpack_from('>Q', header, 8)
+            header_size = 16
+        elif box_size == 0:
+            box_size = size - pos
+        if box_size < header_size:
+            return None
+
+        if box_type == b'moov':
+            if box_size > MAX_HEADER_SIZE:
+                return None
+            if pos + box_size <= window_start + len(window):
+                return window[pos - window_start + header_size:pos - window_start + box_size]
+            return read(pos + header_size, box_size - header_size)
+        # Skip mdat and everything else without reading it
+        pos += box_size
+    return None
+
+
+def parse_mvhd(data, start):
+    if data[start] == 1:
+        timescale, duration = struct.unpack_from('>IQ', data, start + 20)
+    else:
+        timescale, duration = struct.unpack_from('>II', data, start + 12)
+    return duration / timescale if timescale else None
+
+
+def parse_tkhd_size(data, start):
+    offset = 88 if data[start] == 1 else 76
+    width, height = struct.unpack_from('>II', data, start + offset)
+    return width >> 16, height >> 16
+
+
+def parse_trak(data, start, end):
+    """Return the handler type, codec fourcc and size of one track"""
+    track = {'handler': None, 'codec': None, 'width': 0, 'height': 0}
+
+    def walk(start, end):
+        for box_type, payload, box_end in iter_boxes(data, start, end):
+            if box_type in MP4_CONTAINERS:
+                walk(payload, box_end)
+            elif box_type == b'tkhd':
+                track['width'], track['height'] = parse_tkhd_size(data, payload)
+            elif box_type == b'hdlr':
+                track['handler'] = data[payload + 8:payload + 12]
+            elif box_type == b'stsd' and box_end - payload >= 16:
+                entry = payload + 8
+                track['codec'] = data[entry + 4:entry + 8].decode('latin-1')
+                # Visual sample entries carry the coded size; used when tkhd has none
+                if not track['width'] and box_end - entry >= 36:
+                    track['width'], track['height'] = struct.unpack_from('>HH', data, entry + 32)
+
+    walk(start, end)
+    return track
+
+
+def probe_mp4(read, size):
+    moov = find_moov(read, size)
+    if moov is None:
+        return None
+
+    media = {}
+    for box_type, payload, box_end in iter_boxes(moov):
+        if box_type == b'mvhd':
+            media['duration'] = parse_mvhd(moov, payload)
+        elif box_type == b'trak':
+            track = parse_trak(moov, payload, box_end)
+            if track['handler'] == b'vide' and 'video_codec' not in media:
+                media['video_codec'] = codec_name(track['codec'] or '')
+                media['width'], media['height'] = track['width'], track['height']
+            elif track['handler'] == b'soun' and 'audio_codec' not in media:
+                media['audio_codec'] = codec_name(track['codec'] or '')
+    return media
+
+
+# ===== Matroska / WebM =====
+
+def read_element(data, pos):
+    """Read an EBML element header; returns (id, data size or None if unknown, data start) or None"""
+    if pos >= len(data) or data[pos] == 0:
+        return None
+    id_length = 9 - data[pos].bit_length()
+    if id_length > 4 or pos + id_length > len(data):
+        return None
+    element_id = int.from_bytes(data[pos:pos + id_length], 'big')
+    size, start = read_vint(data, pos + id_length)
+    if size is None:
+        return None
+    # All value bits set means "unknown size" (live streams)
+    if size == (1 << (7 * (start - pos - id_length))) - 1:
+        size = None
+    return element_id, size, start
+
+
+def iter_elements(data, start=0, end=None):
+    """Yield (id, data start, data end) for the complete elements in data[start:end]"""
+    end = len(data) if end is None else end
+    pos = start
+    while pos < end:
+        element = read_element(data, pos)
+        if element is None:
+            return
+        element_id, size, data_start = element
+        if size is None or data_start + size > end:
+            return
+        yield element_id, data_start, data_start + size
+        pos = data_start + size
+
+
+def read_uint(data, start, end):
+    return int.from_bytes(data[start:end], 'big')
+
+
+def read_float(data, start, end):
+    if end - start == 4:
+        return struct.unpack_from('>f', data, start)[0]
+    if end - start == 8:
+        return struct.unpack_from('>d', data, start)[0]
+    return None
+
+
+def parse_info(data, start, end):
+    scale = 1000000
+    duration = None
+    for element_id, value_start, value_end in iter_elements(data, start, end):
+        if element_id == TIMECODE_SCALE:
+            scale = read_uint(data, value_start, value_end)
+        elif element_id == DURATION:
+            duration = read_float(data, value_start, value_end)
+    return {'duration': duration * scale / 1e9 if duration else None}
+
+
+def parse_tracks(data, start, end):
+    media = {}
+    for element_id, entry_start, entry_end in iter_elements(data, start, end):
+        if element_id != TRACK_ENTRY:
+            continue
+        track_type = codec = None
+        width = height = 0
+        for child_id, value_start, value_end in iter_elements(data, entry_start, entry_end):
+            if child_id == TRACK_TYPE:
+                track_type = read_uint(data, value_start, value_end)
+            elif child_id == CODEC_ID:
+                codec = data[value_start:value_end].rstrip(b'\x00').decode('ascii', 'replace')
+            elif child_id == VIDEO:
+                for video_id, video_start, video_end in iter_elements(data, value_start, value_end):
+                    if video_id == PIXEL_WIDTH:
+                        width = read_uint(data, video_start, video_end)
+                    elif video_id == PIXEL_HEIGHT:
+                        height = read_uint(data, video_start, video_end)
+
+        if track_type == 1 and 'video_codec' not in media:
+            media.update(video_codec=codec_name(codec or ''), width=width, height=height)
+        elif track_type == 2 and 'audio_codec' not in media:
+            media['audio_codec'] = codec_name(codec or '')
+    return media
+
+
+def parse_seek_head(data, start, end):
+    """Return {element id: position relative to the segment data} from a SeekHead"""
+    positions = {}
+    for element_id, seek_start, seek_end in iter_elements(data, start, end):
+        if element_id != SEEK:
+            continue
+        target = position = None
+        for child_id, value_start, value_end in iter_elements(data, seek_start, seek_end):
+            if child_id == SEEK_ID:
+                target = read_uint(data, value_start, value_end)
+            elif child_id == SEEK_POSITION:
+                position = read_uint(data, value_start, value_end)
+        if target is not None and position is not None:
+            positions[target] = position
+    return positions
+
+
+def read_element_at(read, size, offset):
+    """Fetch the complete element starting at offset; returns (id, data, data start, data end) or None"""
+    data = read(offset, min(PROBE_HEAD_SIZE, size - offset))
+    element = read_element(data, 0)
+    if element is None or element[1] is None or element[1] > MAX_HEADER_SIZE:
+        return None
+    element_id, element_size, data_start = element
+    if data_start + element_size > len(data):
+        data = read(offset, data_start + element_size)
+    return element_id, data, data_start, data_start + element_size
+
+
+def probe_matroska(read, size):
+    head = read(0, min(size, PROBE_HEAD_SIZE))
+    header = read_element(head, 0)
+    if header is None or header[0] != EBML_HEADER or header[1] is None:
+        return None
+    segment = read_element(head, header[2] + header[1])
+    if segment is None or segment[0] != SEGMENT:
+        return None
+    segment_start = segment[2]
+
+    parsers = {INFO: parse_info, TRACKS: parse_tracks}
+    media = {}
+    found = set()
+    seek_positions = {}
+
+    # Info and Tracks normally sit right after the SeekHead, ahead of the first Cluster
+    for element_id, data_start, data_end in iter_elements(head, segment_start):
+        if element_id == SEEK_HEAD:
+            seek_positions = parse_seek_head(head, data_start, data_end)
+        elif element_id in parsers:
+            media.update(parsers[element_id](head, data_start, data_end))
+            found.add(element_id)
+        elif element_id == CLUSTER:
+            break
+
+    # Otherwise follow the SeekHead to wherever the muxer put them
+    for element_id in parsers.keys() - found:
+        position = seek_positions.get(element_id)
+        if position is None or segment_start + position >= size:
+            continue
+        element = read_element_at(read, size, segment_start + position)
+        if element and element[0] == element_id:
+            _, data, data_start, data_end = element
+            media.update(parsers[element_id](data, data_start, data_end))
+
+    return media
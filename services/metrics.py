@@ -0,0 +1,162 @@
+"""
+Prometheus metrics
+Upload stage and listing latency histograms, upload throughput, in-flight
+gauges and Azure Storage request/retry/error counters. When
+PROMETHEUS_MULTIPROC_DIR is set (gunicorn.conf.py sets it), every worker
+writes its samples there and /metrics aggregates them
+"""
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+
+# Seconds, from sub-millisecond cache hits up to the 600s request timeout
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+THROUGHPUT_BUCKETS = tuple(mb * 1024 * 1024 for mb in (0.25, 0.5, 1, 2, 5, 10, 25, 50, 100, 250))
+
+UPLOAD_STAGE_SECONDS = Histogram(
+    'video_upload_stage_seconds', 'Time spent in each stage of an upload', ['stage'], buckets=LATENCY_BUCKETS
+)
+UPLOAD_BYTES_PER_SECOND = Histogram(
+    'video_upload_bytes_per_second', 'Throughput of each uploaded file', buckets=THROUGHPUT_BUCKETS
+)
+UPLOAD_BYTES = Counter('video_upload_bytes', 'Bytes of video uploaded to storage')
+UPLOAD_FAILURES = Counter('video_upload_failures', 'Files that failed to upload', ['error'])
+UPLOAD_REJECTIONS = Counter(
+    'video_upload_rejections', 'Uploads turned away by admission control', ['reason']
+)
+UPLOADS_IN_FLIGHT = Gauge('video_uploads_in_flight', 'Upload requests in progress', multiprocess_mode='livesum')
+# Current choices of each worker's adaptive transfer policy
+TRANSFER_BLOCK_SIZE = Gauge(
+    'video_upload_block_size_bytes', 'Block size chosen for staged uploads', multiprocess_mode='liveall'
+)
+TRANSFER_CONCURRENCY = Gauge(
+    'video_upload_blob_concurrency', 'Parallel block uploads per blob', multiprocess_mode='liveall'
+)
+
+LIST_SECONDS = Histogram(
+    'video_list_seconds', 'Time to answer a video listing', ['source'], buckets=LATENCY_BUCKETS
+)
+
+REQUESTS_IN_FLIGHT = Gauge('http_requests_in_flight', 'HTTP requests in progress', multiprocess_mode='livesum')
+REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency', ['method', 'endpoint', 'status'],
+    buckets=LATENCY_BUCKETS
+)
+
+STORAGE_REQUESTS = Counter('azure_storage_requests', 'Azure Storage HTTP responses', ['method', 'status'])
+STORAGE_RETRIES = Counter('azure_storage_retries', 'Azure Storage requests re-sent by the SDK retry policy')
+
+# Stage -> seconds of the current request, while the profiler collects a breakdown for it (None otherwise)
+request_stages = ContextVar('request_stages', default=None)
+
+# Responses asking the client to back off; listeners (the transfer policy) are told about each one
+THROTTLE_STATUSES = (429, 503)
+_throttle_listeners = []
+
+
+def add_stage_time(stage, seconds):
+    """Add to the current request's stage breakdown, when one is being collected"""
+    stages = request_stages.get()
+    if stages is not None:
+        stages[stage] = stages.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def observe_stage(stage):
+    """Time the enclosed block as one upload stage"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        UPLOAD_STAGE_SECONDS.labels(stage).observe(elapsed)
+        add_stage_time(stage, elapsed)
+
+
+def timed_iter(iterable, stage):
+    """Yield from iterable, observing the time spent producing items (not consuming them) as one stage"""
+    iterator = iter(iterable)
+    elapsed = 0.0
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                elapsed += time.perf_counter() - started
+            yield item
+    finally:
+        UPLOAD_STAGE_SECONDS.labels(stage).observe(elapsed)
+        add_stage_time(stage, elapsed)
+
+
+def record_transfer(size, seconds):
+    """Count an uploaded file and its throughput"""
+    UPLOAD_BYTES.inc(size)
+    if seconds > 0:
+        UPLOAD_BYTES_PER_SECOND.observe(size / seconds)
+
+
+def on_storage_request(request):
+    """raw_request_hook: runs once per attempt, so every attempt after the first is a retry"""
+    attempt = request.context.get('metrics_attempt', 0)
+    if attempt:
+        STORAGE_RETRIES.inc()
+    request.context['metrics_attempt'] = attempt + 1
+
+
+def on_storage_response(response):
+    """raw_response_hook: count every response by method and status"""
+    status = response.http_response.status_code
+    STORAGE_REQUESTS.labels(response.http_request.method, str(status)).inc()
+    if status in THROTTLE_STATUSES:
+        for listener in _throttle_listeners:
+            listener()
+
+
+def add_throttle_listener(listener):
+    """Call listener() for every throttled Azure Storage response in this process"""
+    _throttle_listeners.append(listener)
+
+
+def storage_client_options():
+    """Keyword arguments that instrument an Azure Storage client"""
+    return {'raw_request_hook': on_storage_request, 'raw_response_hook': on_storage_response}
+
+
+class InstrumentedCredential:
+    """Token credential wrapper that times token acquisition as the 'token' stage"""
+
+    def __init__(self, credential):
+        self._credential = credential
+        # azure-core prefers get_token_info whenever it exists; older azure-identity credentials lack it
+        if hasattr(credential, 'get_token_info'):
+            self.get_token_info = self._get_token_info
+
+    def get_token(self, *scopes, **kwargs):
+        with observe_stage('token'):
+            return self._credential.get_token(*scopes, **kwargs)
+
+    def _get_token_info(self, *scopes, **kwargs):
+        with observe_stage('token'):
+            return self._credential.get_token_info(*scopes, **kwargs)
+
+    def close(self):
+        self._credential.close()
+
+
+def render_latest():
+    """Return (body, content type) for the /metrics endpoint"""
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
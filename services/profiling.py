@@ -0,0 +1,188 @@
+"""
+Request profiling
+Opt-in sampling profiler: one background thread per worker samples the
+stacks of profiled requests (and of the worker's transfer threads) into
+folded-stack files for flamegraph tools, and starts sampling requests that
+run past a latency threshold. Nothing runs while no request is watched
+"""
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Leaf frame of a pool thread waiting for work; such samples say nothing about the request
+IDLE_FRAMES = {('_worker', 'thread.py')}
+
+
+def frame_label(code):
+    """'function (path:line)' with paths relative to the app, or the last two components elsewhere"""
+    path = code.co_filename
+    if path.startswith(ROOT + os.sep):
+        path = os.path.relpath(path, ROOT)
+    else:
+        path = '/'.join(path.replace(os.sep, '/').split('/')[-2:])
+    return f'{code.co_name} ({path}:{code.co_firstlineno})'
+
+
+class Capture:
+    """One watched request: sampled from the start (reason given) or once it turns slow"""
+
+    def __init__(self, thread_id, reason=None):
+        self.thread_id = thread_id
+        self.reason = reason
+        self.started = time.perf_counter()
+        self.stacks = Counter()
+        self.samples = 0
+
+    @property
+    def profiling(self):
+        return self.reason is not None
+
+
+class RequestProfiler:
+    """Per-worker sampling profiler writing <id>.folded and <id>.json files to directory
+
+    Samples of the worker's helper threads (thread names starting with one of
+    thread_prefixes) are added to every request being profiled at the time,
+    under a root frame named after the pool. At most max_files captures are
+    kept; the oldest are deleted first.
+    """
+
+    def __init__(self, directory, interval=0.01, slow_seconds=0, max_files=200, thread_prefixes=()):
+        self.directory = directory
+        self.interval = interval
+        self.slow_seconds = slow_seconds
+        self.max_files = max_files
+        self.thread_prefixes = tuple(thread_prefixes)
+        self._captures = {}
+        self._labels = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+        os.makedirs(directory, exist_ok=True)
+
+    def begin(self, reason=None):
+        """Watch the calling thread's request; profile it right away when a reason is given"""
+        self._ensure_thread()
+        capture = Capture(threading.get_ident(), reason)
+        with self._lock:
+            self._captures[capture.thread_id] = capture
+        self._wake.set()
+        return capture
+
+    def end(self, capture, details):
+        """Stop watching; write the capture when it was profiled or slow and return its id, else None"""
+        with self._lock:
+            if self._captures.get(capture.thread_id) is capture:
+                del self._captures[capture.thread_id]
+            stacks, samples = dict(capture.stacks), capture.samples
+
+        duration = time.perf_counter() - capture.started
+        if not capture.profiling and not (self.slow_seconds and duration >= self.slow_seconds):
+            return None
+        return self._write(capture.reason or 'slow', duration, stacks, samples, details)
+
+    def _ensure_thread(self):
+        # One sampler per worker process, started on first use (never carried across a fork)
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._captures = {}
+                threading.Thread(target=self._run, name='request-profiler', daemon=True).start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                captures = list(self._captures.values())
+            if not captures:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+
+            now = time.perf_counter()
+            for capture in captures:
+                if not capture.profiling and self.slow_seconds and now - capture.started >= self.slow_seconds:
+                    capture.reason = 'slow'
+            profiling = [capture for capture in captures if capture.profiling]
+            if profiling:
+                self._sample(profiling)
+            # Only watching for slow requests needs far fewer wake-ups than sampling
+            time.sleep(self.interval if profiling else min(0.1, self.slow_seconds / 4 or 0.1))
+
+    def _sample(self, captures):
+        frames = sys._current_frames()
+        helpers = []
+        if self.thread_prefixes:
+            for thread in threading.enumerate():
+                if thread.name.startswith(self.thread_prefixes) and thread.ident in frames:
+                    frame = frames[thread.ident]
+                    if (frame.f_code.co_name, os.path.basename(frame.f_code.co_filename)) not in IDLE_FRAMES:
+                        helpers.append(f"[{thread.name.rsplit('_', 1)[0]}];{self._fold(frame)}")
+
+        with self._lock:
+            for capture in captures:
+                frame = frames.get(capture.thread_id)
+                if frame is None:
+                    continue
+                capture.stacks[self._fold(frame)] += 1
+                capture.stacks.update(helpers)
+                capture.samples += 1
+
+    def _fold(self, frame):
+        labels = []
+        while frame is not None:
+            label = self._labels.get(frame.f_code)
+            if label is None:
+                if len(self._labels) > 10000:
+                    self._labels.clear()
+                label = self._labels[frame.f_code] = frame_label(frame.f_code)
+            labels.append(label)
+            frame = frame.f_back
+        return ';'.join(reversed(labels))
+
+    def _write(self, reason, duration, stacks, samples, details):
+        # Ids start with the time to the millisecond, so name order is age order
+        now = time.time()
+        stamp = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}{int(now * 1000) % 1000:03d}"
+        capture_id = f'{stamp}-{os.getpid()}-{uuid.uuid4().hex[:8]}'
+        base = os.path.join(self.directory, capture_id)
+        record = {
+            'id': capture_id,
+            'reason': reason,
+            'duration_seconds': round(duration, 4),
+            'samples': samples,
+            'interval_seconds': self.interval,
+            **details
+        }
+        try:
+            if stacks:
+                # Folded stacks: one "frame;frame;... count" line per distinct stack (flamegraph.pl, speedscope)
+                with open(base + '.folded', 'w') as folded_file:
+                    folded_file.writelines(f'{stack} {count}\n' for stack, count in sorted(stacks.items()))
+                record['profile'] = capture_id + '.folded'
+            with open(base + '.json', 'w') as record_file:
+                json.dump(record, record_file, indent=2)
+            self._prune()
+        except OSError:
+            return None
+        return capture_id
+
+    def _prune(self):
+        captures = {}
+        for entry in os.scandir(self.directory):
+            capture_id, extension = os.path.splitext(entry.name)
+            if extension in ('.json', '.folded'):
+                captures.setdefault(capture_id, []).append(entry.path)
+        for capture_id in sorted(captures)[:max(0, len(captures) - self.max_files)]:
+            for path in captures[capture_id]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
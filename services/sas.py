@@ -0,0 +1,113 @@
+"""
+Direct-to-storage upload helpers
+Issues short-lived, single-blob write SAS URLs signed with a cached
+user delegation key obtained through the app's managed identity, and the
+signed tickets that tie a completion request to the SAS it was issued with
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from azure.storage.blob import BlobSasPermissions, generate_blob_sas
+
+# Allow for clock skew between the app and the storage service
+CLOCK_SKEW = timedelta(minutes=5)
+
+
+class UserDelegationKeyCache:
+    """Holds one user delegation key per storage account and refreshes it shortly before it expires"""
+
+    def __init__(self, key_lifetime, refresh_margin=timedelta(minutes=5)):
+        self.key_lifetime = key_lifetime
+        self.refresh_margin = refresh_margin
+        self._lock = threading.Lock()
+        self._keys = {}
+
+    def get(self, blob_service_client):
+        """Return (key, key_expiry) for the client's account, fetching a new key only when needed"""
+        now = datetime.now(timezone.utc)
+
+        with self._lock:
+            key, expiry = self._keys.get(blob_service_client.account_name, (None, None))
+            if key is None or now >= expiry - self.refresh_margin:
+                expiry = now + self.key_lifetime
+                key = blob_service_client.get_user_delegation_key(now - CLOCK_SKEW, expiry)
+                self._keys[blob_service_client.account_name] = key, expiry
+            return key, expiry
+
+
+def generate_upload_sas_url(blob_client, user_delegation_key, expiry):
+    """Build a create/write-only SAS URL scoped to a single blob"""
+    sas_token = generate_blob_sas(
+        account_name=blob_client.account_name,
+        container_name=blob_client.container_name,
+        blob_name=blob_client.blob_name,
+        user_delegation_key=user_delegation_key,
+        permission=BlobSasPermissions(create=True, write=True),
+        start=datetime.now(timezone.utc) - CLOCK_SKEW,
+        expiry=expiry,
+        protocol='https'
+    )
+    return f"{blob_client.url}?{sas_token}"
+
+
+def load_signing_key(value, path):
+    """Ticket signing key: value when configured, else a random key kept in path for every worker on the instance"""
+    if value:
+        return value.encode()
+    try:
+        descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(path, 'rb') as key_file:
+            return key_file.read()
+    key = secrets.token_hex(32).encode()
+    with os.fdopen(descriptor, 'wb') as key_file:
+        key_file.write(key)
+    return key
+
+
+class UploadTicketSigner:
+    """Signs and checks the tickets handed out with each SAS URL and upload session
+
+    A ticket names the blob and original filename it was issued for, and
+    what for (purpose); the completion and session endpoints only accept
+    blobs with a valid, unexpired ticket of their own purpose.
+    """
+
+    def __init__(self, key):
+        self.key = key
+
+    def issue(self, blob_name, filename, expires_at, purpose='direct'):
+        payload = base64.urlsafe_b64encode(json.dumps({
+            'blob_name': blob_name,
+            'filename': filename,
+            'expires_at': int(expires_at),
+            'purpose': purpose
+        }).encode()).decode()
+        return f'{payload}.{self._signature(payload)}'
+
+    def verify(self, ticket, purpose='direct'):
+        """Return the ticket's claims, or None when it is malformed, forged, expired or for another purpose"""
+        if not isinstance(ticket, str):
+            return None
+        payload, _, signature = ticket.partition('.')
+        if not payload or not hmac.compare_digest(signature, self._signature(payload)):
+            return None
+        try:
+            claims = json.loads(base64.urlsafe_b64decode(payload.encode()))
+        except ValueError:
+            return None
+        if not isinstance(claims, dict) or claims.get('expires_at', 0) < time.time():
+            return None
+        if claims.get('purpose', 'direct') != purpose:
+            return None
+        return claims
+
+    def _signature(self, payload):
+        return hmac.new(self.key, payload.encode(), hashlib.sha256).hexdigest()
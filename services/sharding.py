@@ -0,0 +1,252 @@
+"""
+Storage sharding
+Spreads new blobs over several storage accounts and containers with a
+consistent-hash ring on the blob name, finds the shard that holds an
+existing blob (so adding a shard never moves data) and merges listings
+fetched from every shard concurrently
+"""
+import base64
+import bisect
+import hashlib
+import json
+import threading
+from collections import OrderedDict, deque
+
+from services.storage_clients import StorageClients
+
+
+def parse_shards(value, default_account, default_container):
+    """'account/container, account, ...' -> [(account, container)]
+
+    A shard without a container uses default_container; an empty value is
+    the single default account and container.
+    """
+    shards = []
+    for item in (value or '').split(','):
+        account, _, container = item.strip().partition('/')
+        if account.strip():
+            shards.append((account.strip(), container.strip() or default_container))
+    return list(dict.fromkeys(shards)) or [(default_account, default_container)]
+
+
+class HashRing:
+    """Consistent-hash ring: a new shard takes over about 1/N of the key space and nothing else moves"""
+
+    def __init__(self, shard_ids, vnodes=128):
+        points = sorted(
+            (self._hash(f'{shard_id}#{point}'), shard_id) for shard_id in shard_ids for point in range(vnodes)
+        )
+        self._hashes = [point_hash for point_hash, _ in points]
+        self._owners = [shard_id for _, shard_id in points]
+
+    @staticmethod
+    def _hash(key):
+        return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], 'big')
+
+    def get(self, key):
+        """Shard id owning key (the first ring point clockwise of its hash)"""
+        index = bisect.bisect(self._hashes, self._hash(key)) % len(self._hashes)
+        return self._owners[index]
+
+
+class Shard:
+    """One container in one storage account, provisioned lazily once per worker"""
+
+    def __init__(self, clients, container_name):
+        self.clients = clients
+        self.container_name = container_name
+        self.id = f"{clients.account_name or ''}/{container_name}"
+        self.provisioned = False
+        self.lock = threading.Lock()
+
+    @property
+    def container_client(self):
+        return self.clients.container_client_for(self.container_name)
+
+
+class ShardSet:
+    """The configured shards: placement of new blobs, location of existing ones and per-account clients
+
+    The first shard is the primary; its clients are the app's storage_clients
+    and entries indexed before sharding was configured live on it.
+    """
+
+    def __init__(self, shards, refresh_margin=300, vnodes=128, location_cache_size=10000):
+        accounts = {}
+        self.shards = []
+        for account, container in shards:
+            if account not in accounts:
+                accounts[account] = StorageClients(account, container, refresh_margin=refresh_margin)
+            self.shards.append(Shard(accounts[account], container))
+
+        self.accounts = list(accounts.values())
+        self.primary = self.shards[0]
+        self.ring = HashRing([shard.id for shard in self.shards], vnodes)
+        self._by_id = {shard.id: shard for shard in self.shards}
+        self._locations = OrderedDict()
+        self._location_cache_size = location_cache_size
+        self._lock = threading.Lock()
+
+    @property
+    def sharded(self):
+        return len(self.shards) > 1
+
+    def get(self, shard_id):
+        """Shard by id, or None (unknown or no longer configured)"""
+        return self._by_id.get(shard_id)
+
+    def placement(self, blob_name):
+        """Shard a new blob is written to"""
+        return self._by_id[self.ring.get(blob_name)]
+
+    def remember(self, blob_name, shard):
+        with self._lock:
+            self._locations[blob_name] = shard.id
+            self._locations.move_to_end(blob_name)
+            while len(self._locations) > self._location_cache_size:
+                self._locations.popitem(last=False)
+
+    def locate(self, blob_name, hint=None, probe=True):
+        """Shard holding an existing blob
+
+        Uses the blob's remembered shard or hint (its shard in the index);
+        otherwise checks its ring placement first and then the other shards,
+        since blobs written before a shard was added stay where they are.
+        Without probe (or when no shard has it) returns the ring placement.
+        """
+        if not self.sharded:
+            return self.primary
+
+        with self._lock:
+            shard = self.get(self._locations.get(blob_name))
+        shard = shard or self.get(hint)
+        if shard is None and probe:
+            shard = next(
+                (candidate for candidate in self.candidates(blob_name)
+                 if candidate.container_client.get_blob_client(blob_name).exists()),
+                None
+            )
+        if shard is None:
+            return self.placement(blob_name)
+        self.remember(blob_name, shard)
+        return shard
+
+    def candidates(self, blob_name, hint=None):
+        """Every shard, most likely holder of blob_name first"""
+        first = self.locate(blob_name, hint, probe=False)
+        return [first] + [shard for shard in self.shards if shard is not first]
+
+    def mark_unprovisioned(self):
+        for shard in self.shards:
+            shard.provisioned = False
+
+    def warm(self):
+        return all([clients.warm() for clients in self.accounts])
+
+    def start_warmup(self):
+        for clients in self.accounts:
+            clients.start_warmup()
+
+    def readiness(self):
+        """Readiness details of the primary account; every account must be ready when there are several"""
+        details = self.primary.clients.readiness()
+        if len(self.accounts) > 1:
+            accounts = {clients.account_name: clients.readiness()['ready'] for clients in self.accounts}
+            details['ready'] = all(accounts.values())
+            details['accounts'] = accounts
+        return details
+
+
+def encode_cursor(cursor):
+    return base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+
+
+def decode_cursor(token):
+    """Decode a merged listing continuation token (ValueError when malformed)"""
+    try:
+        cursor = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError('Invalid continuation token') from e
+    # 5000 is the largest page List Blobs returns
+    if not isinstance(cursor, dict) or not isinstance(cursor.get('page_size'), int) \
+            or not 0 < cursor['page_size'] <= 5000 or not isinstance(cursor.get('shards'), dict):
+        raise ValueError('Invalid continuation token')
+    if any(position is not None and (not isinstance(position, list) or len(position) != 2)
+           for position in cursor['shards'].values()):
+        raise ValueError('Invalid continuation token')
+    return cursor
+
+
+def merged_page(fetch, shard_ids, limit, continuation, executor, key):
+    """One page of a listing merged in key order across shards; returns (items, next continuation)
+
+    fetch(shard_id, token, page_size) returns one page of a shard's listing
+    in key order and the token of the next page. Shards are fetched
+    concurrently, and again whenever the merge runs through a shard's page.
+    The continuation records, per shard, the token of the page being read
+    and the last key returned from it, so every shard resumes exactly where
+    it stopped; shards added since the first page start from the beginning.
+    """
+    cursor = decode_cursor(continuation) if continuation else {'page_size': limit, 'shards': {}}
+    page_size = cursor['page_size']
+    # shard id -> [page token, last key returned], or None once the shard is exhausted
+    positions = {shard_id: cursor['shards'].get(shard_id, [None, None]) for shard_id in shard_ids}
+    buffers = {}
+    next_tokens = {}
+
+    def load(shard_id, token, after):
+        while True:
+            page, next_token = fetch(shard_id, token, page_size)
+            remaining = [item for item in page if after is None or key(item) > after]
+            if remaining or next_token is None:
+                return [token, after], deque(remaining), next_token
+            token, after = next_token, None
+
+    items = []
+    pending = [shard_id for shard_id, position in positions.items() if position is not None]
+    while True:
+        futures = {shard_id: executor.submit(load, shard_id, *positions[shard_id]) for shard_id in pending}
+        for shard_id, future in futures.items():
+            position, buffer, next_tokens[shard_id] = future.result()
+            if buffer:
+                buffers[shard_id] = buffer
+                positions[shard_id] = position
+            else:
+                positions[shard_id] = None
+
+        if not buffers or len(items) == limit:
+            break
+
+        shard_id = min(buffers, key=lambda candidate: key(buffers[candidate][0]))
+        item = buffers[shard_id].popleft()
+        items.append(item)
+        positions[shard_id][1] = key(item)
+        pending = []
+        if not buffers[shard_id]:
+            del buffers[shard_id]
+            if next_tokens[shard_id] is None:
+                positions[shard_id] = None
+            else:
+                positions[shard_id] = [next_tokens[shard_id], None]
+                if len(items) < limit:
+                    pending = [shard_id]
+
+    if all(position is None for position in positions.values()):
+        return items, None
+    return items, encode_cursor({'page_size': page_size, 'shards': positions})
+
+
+def prefetched(pages, executor):
+    """Iterate pages while the next one is fetched in the background (the first fetch starts immediately)"""
+    pages = iter(pages)
+    pending = executor.submit(next, pages, None)
+
+    def iterate(pending):
+        while True:
+            page = pending.result()
+            if page is None:
+                return
+            pending = executor.submit(next, pages, None)
+            yield page
+
+    return iterate(pending)
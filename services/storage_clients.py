@@ -0,0 +1,184 @@
+"""
+Azure Storage client lifecycle
+Creates the credential and blob clients lazily in each worker process
+(never reusing a connection pool across fork), pre-fetches and refreshes
+the storage token in the background, and reports startup timings and
+readiness
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from azure.identity import DefaultAzureCredential
+from azure.storage.blob import BlobServiceClient
+
+from services.metrics import InstrumentedCredential, storage_client_options
+
+logger = logging.getLogger(__name__)
+
+STORAGE_SCOPE = 'https://storage.azure.com/.default'
+
+
+class StorageClients:
+    """Per-process Azure clients with background token warm-up"""
+
+    def __init__(self, account_name, container_name, refresh_margin=300, client_options=None):
+        self.account_name = account_name
+        self.container_name = container_name
+        self.refresh_margin = refresh_margin
+        self.client_options = client_options or {}
+        self._lock = threading.Lock()
+        self._pid = None
+        self._reset()
+
+    @property
+    def configured(self):
+        """Whether a storage account is configured at all"""
+        return bool(self.account_name)
+
+    @property
+    def credential(self):
+        self._ensure_clients()
+        return self._credential
+
+    @property
+    def service_client(self):
+        self._ensure_clients()
+        return self._service_client
+
+    @property
+    def container_client(self):
+        self._ensure_clients()
+        return self._container_client
+
+    def container_client_for(self, container_name):
+        """Client for any container of this account (created once per process)"""
+        if container_name == self.container_name:
+            return self.container_client
+        service_client = self.service_client
+        with self._lock:
+            if container_name not in self._containers:
+                self._containers[container_name] = service_client.get_container_client(container_name)
+            return self._containers[container_name]
+
+    def _reset(self):
+        self._credential = None
+        self._service_client = None
+        self._container_client = None
+        self._containers = {}
+        self._warmup_thread = None
+        self.token_expires_on = None
+        self.pool_ready = False
+        self.timings = {}
+        self.last_error = None
+
+    def _ensure_clients(self):
+        """Create the clients on first use in this process (again after a fork)"""
+        if self._pid == os.getpid() or not self.configured:
+            return
+
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+
+            self._reset()
+            started = time.perf_counter()
+            # Token fetches are timed and every storage attempt is counted in the metrics
+            self._credential = InstrumentedCredential(DefaultAzureCredential())
+            account_url = f"https://{self.account_name}.blob.core.windows.net"
+            self._service_client = BlobServiceClient(
+                account_url=account_url, credential=self._credential,
+                **storage_client_options(), **self.client_options
+            )
+            self._container_client = self._service_client.get_container_client(self.container_name)
+            self.timings['client_init_ms'] = round((time.perf_counter() - started) * 1000, 1)
+            self._pid = os.getpid()
+            logger.info(f"✅ Azure Blob Storage client initialized with Managed Identity (pid {self._pid})")
+
+    def use(self, service_client):
+        """Serve this process from a pre-built service client (e.g. a local storage stand-in)"""
+        with self._lock:
+            self._reset()
+            self.account_name = self.account_name or service_client.account_name
+            self._service_client = service_client
+            self._container_client = service_client.get_container_client(self.container_name)
+            self._pid = os.getpid()
+
+    def warm(self):
+        """Fetch a storage token and open a pooled connection; returns True when ready"""
+        if not self.configured:
+            return False
+
+        try:
+            if self.token_expires_on is None:
+                started = time.perf_counter()
+                self.token_expires_on = self.credential.get_token(STORAGE_SCOPE).expires_on
+                self.timings['token_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+            if not self.pool_ready:
+                started = time.perf_counter()
+                # Any authenticated call works; this one also tells us whether the container exists
+                self.container_client.exists()
+                self.timings['connection_ms'] = round((time.perf_counter() - started) * 1000, 1)
+                self.pool_ready = True
+
+            self.last_error = None
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            logger.warning(f"⚠️ Storage warm-up failed: {str(e)}")
+            return False
+
+    def start_warmup(self, refresh=True):
+        """Warm up in a background thread and keep the token fresh before it expires"""
+        if not self.configured:
+            return
+
+        self._ensure_clients()
+        with self._lock:
+            if self._warmup_thread is not None:
+                return
+            self._warmup_thread = threading.Thread(
+                target=self._warmup_loop, args=(refresh,), name='storage-warmup', daemon=True
+            )
+            self._warmup_thread.start()
+
+    def _warmup_loop(self, refresh):
+        started = time.perf_counter()
+        delay = 1
+        while not self.warm():
+            time.sleep(delay)
+            delay = min(delay * 2, 30)
+
+        self.timings['warmup_total_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(
+            "⏱️ Storage startup: "
+            + ", ".join(f"{name} {value}ms" for name, value in self.timings.items())
+        )
+
+        while refresh:
+            # Re-acquire shortly before expiry so no request ever waits for a token
+            time.sleep(max(self.token_expires_on - time.time() - self.refresh_margin, 30))
+            try:
+                self.token_expires_on = self.credential.get_token(STORAGE_SCOPE).expires_on
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning(f"⚠️ Storage token refresh failed: {str(e)}")
+
+    def readiness(self):
+        """Readiness details for the /ready endpoint"""
+        ready = self.configured and self.token_expires_on is not None and self.pool_ready
+        details = {
+            'ready': ready,
+            'pid': os.getpid(),
+            'token_acquired': self.token_expires_on is not None,
+            'connection_pool_warm': self.pool_ready,
+            'timings': self.timings
+        }
+        if self.token_expires_on:
+            details['token_expires_at'] = datetime.fromtimestamp(self.token_expires_on, timezone.utc).isoformat()
+        if self.last_error:
+            details['last_error'] = self.last_error
+        return details
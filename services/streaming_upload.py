@@ -0,0 +1,257 @@
+"""
+Streaming upload helpers
+Parses multipart request bodies incrementally and pushes fixed-size
+blocks to Azure Blob Storage as they arrive, so no upload is ever
+spooled to a temp file or held in memory as a whole
+"""
+import asyncio
+import hashlib
+import threading
+import time
+import uuid
+from collections import deque
+
+from azure.storage.blob import BlobBlock
+from werkzeug.sansio.multipart import Epilogue, MultipartDecoder, NeedData
+
+# Size of each read from the request body
+READ_SIZE = 64 * 1024
+
+
+def split_before_boundary(data, boundary):
+    """Split data into (ready, held) so that no boundary is cut off just before its line break
+
+    werkzeug's MultipartDecoder passes the CR ahead of a boundary on as part data when its buffer
+    ends inside the "--" or line break following the boundary. Holding back from the first line
+    break near the end keeps every boundary and its suffix in a single receive_data() call.
+    """
+    start = max(0, len(data) - len(boundary) - 10)
+    breaks = [index for index in (data.find(b'\r', start), data.find(b'\n', start)) if index != -1]
+    if not breaks:
+        return data, b''
+    return data[:min(breaks)], data[min(breaks):]
+
+
+def iter_multipart_events(stream, boundary, read_size=READ_SIZE):
+    """Yield multipart events (Field, File, Data) while reading the body incrementally"""
+    decoder = MultipartDecoder(boundary)
+    held = b''
+
+    while True:
+        data = stream.read(read_size)
+        if data:
+            ready, held = split_before_boundary(held + data, boundary)
+            decoder.receive_data(ready)
+        else:
+            # An empty read means the body is exhausted; None tells the decoder so
+            decoder.receive_data(held)
+            decoder.receive_data(None)
+
+        event = decoder.next_event()
+        while not isinstance(event, (Epilogue, NeedData)):
+            yield event
+            event = decoder.next_event()
+
+        if isinstance(event, Epilogue) or not data:
+            return
+
+
+async def aiter_multipart_events(receive, boundary):
+    """Async variant of iter_multipart_events reading ASGI http.request messages"""
+    decoder = MultipartDecoder(boundary)
+    more_body = True
+    held = b''
+
+    while more_body:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise ConnectionError('Client disconnected')
+
+        data = message.get('body', b'')
+        more_body = message.get('more_body', False)
+        if more_body:
+            ready, held = split_before_boundary(held + data, boundary)
+            decoder.receive_data(ready)
+        else:
+            decoder.receive_data(held + data)
+            decoder.receive_data(None)
+
+        event = decoder.next_event()
+        while not isinstance(event, (Epilogue, NeedData)):
+            yield event
+            event = decoder.next_event()
+
+        if isinstance(event, Epilogue):
+            return
+
+
+class BlockBlobWriter:
+    """Write-only stream that stages fixed-size blocks and commits them on close
+
+    With an executor, up to max_concurrency blocks are staged in parallel
+    while the caller keeps writing; memory stays bounded by that many blocks.
+    progress_hook(current, total) is called with the bytes staged so far,
+    like the SDK's upload progress_hook (total is not known while streaming);
+    block_hook(size, seconds) with the size and staging time of every block.
+    """
+
+    def __init__(self, blob_client, block_size, content_settings=None, metadata=None,
+                 executor=None, max_concurrency=1, progress_hook=None, block_hook=None):
+        self.blob_client = blob_client
+        self.block_size = block_size
+        self.content_settings = content_settings
+        self.metadata = dict(metadata or {})
+        self.executor = executor
+        self.max_concurrency = max(1, max_concurrency)
+        self.progress_hook = progress_hook
+        self.block_hook = block_hook
+        self.size = 0
+        self.staged = 0
+        self._buffer = bytearray()
+        self._blocks = []
+        self._in_flight = deque()
+        self._sha256 = hashlib.sha256()
+        self._staged_lock = threading.Lock()
+
+    @property
+    def checksum(self):
+        """SHA-256 (hex) of everything written so far"""
+        return self._sha256.hexdigest()
+
+    def write(self, data):
+        """Buffer data and stage every complete block"""
+        self._buffer += data
+        self.size += len(data)
+        self._sha256.update(data)
+
+        while len(self._buffer) >= self.block_size:
+            self._stage_block(bytes(self._buffer[:self.block_size]))
+            del self._buffer[:self.block_size]
+
+    def flush(self):
+        """Stage the remaining bytes and wait for in-flight blocks (checksum is final afterwards)"""
+        if self._buffer:
+            self._stage_block(bytes(self._buffer))
+            self._buffer.clear()
+
+        while self._in_flight:
+            self._in_flight.popleft().result()
+
+    def close(self):
+        """Flush and commit the block list"""
+        self.flush()
+
+        # The content hash is recorded in blob metadata alongside any caller metadata
+        self.blob_client.commit_block_list(
+            self._blocks,
+            content_settings=self.content_settings,
+            metadata={**self.metadata, 'sha256': self.checksum}
+        )
+
+    def abort(self):
+        """Drop buffered data; staged blocks are garbage collected by Azure"""
+        self._buffer.clear()
+        self._blocks = []
+        while self._in_flight:
+            self._in_flight.popleft().cancel()
+
+    def _stage_block(self, chunk):
+        # Block ids only need to be unique and equal-length; the SDK base64-encodes them
+        block_id = uuid.uuid4().hex
+        self._blocks.append(BlobBlock(block_id=block_id))
+
+        if self.executor is None:
+            self._stage(block_id, chunk)
+            return
+
+        self._in_flight.append(self.executor.submit(self._stage, block_id, chunk))
+        # Wait for the oldest block (surfacing its error) once the window is full
+        while len(self._in_flight) > self.max_concurrency:
+            self._in_flight.popleft().result()
+
+    def _stage(self, block_id, chunk):
+        started = time.perf_counter()
+        self.blob_client.stage_block(block_id, chunk, length=len(chunk))
+        if self.block_hook is not None:
+            self.block_hook(len(chunk), time.perf_counter() - started)
+        if self.progress_hook is not None:
+            with self._staged_lock:
+                self.staged += len(chunk)
+                self.progress_hook(self.staged, None)
+
+
+class AsyncBlockBlobWriter:
+    """Async variant of BlockBlobWriter for azure.storage.blob.aio blob clients"""
+
+    def __init__(self, blob_client, block_size, content_settings=None, metadata=None, max_concurrency=1,
+                 progress_hook=None, block_hook=None):
+        self.blob_client = blob_client
+        self.block_size = block_size
+        self.content_settings = content_settings
+        self.metadata = dict(metadata or {})
+        self.max_concurrency = max(1, max_concurrency)
+        self.progress_hook = progress_hook
+        self.block_hook = block_hook
+        self.size = 0
+        self.staged = 0
+        self._buffer = bytearray()
+        self._blocks = []
+        self._in_flight = deque()
+        self._sha256 = hashlib.sha256()
+
+    @property
+    def checksum(self):
+        """SHA-256 (hex) of everything written so far"""
+        return self._sha256.hexdigest()
+
+    async def write(self, data):
+        """Buffer data and stage every complete block"""
+        self._buffer += data
+        self.size += len(data)
+        self._sha256.update(data)
+
+        while len(self._buffer) >= self.block_size:
+            await self._stage_block(bytes(self._buffer[:self.block_size]))
+            del self._buffer[:self.block_size]
+
+    async def flush(self):
+        """Stage the remaining bytes and wait for in-flight blocks (checksum is final afterwards)"""
+        if self._buffer:
+            await self._stage_block(bytes(self._buffer))
+            self._buffer.clear()
+
+        while self._in_flight:
+            await self._in_flight.popleft()
+
+    async def close(self):
+        """Flush and commit the block list"""
+        await self.flush()
+
+        await self.blob_client.commit_block_list(
+            self._blocks,
+            content_settings=self.content_settings,
+            metadata={**self.metadata, 'sha256': self.checksum}
+        )
+
+    def abort(self):
+        """Drop buffered data and cancel in-flight blocks"""
+        self._buffer.clear()
+        self._blocks = []
+        while self._in_flight:
+            self._in_flight.popleft().cancel()
+
+    async def _stage_block(self, chunk):
+        block_id = uuid.uuid4().hex
+        self._blocks.append(BlobBlock(block_id=block_id))
+        self._in_flight.append(asyncio.ensure_future(self._stage(block_id, chunk)))
+        while len(self._in_flight) > self.max_concurrency:
+            await self._in_flight.popleft()
+
+    async def _stage(self, block_id, chunk):
+        started = time.perf_counter()
+        await self.blob_client.stage_block(block_id, chunk, length=len(chunk))
+        if self.block_hook is not None:
+            self.block_hook(len(chunk), time.perf_counter() - started)
+        if self.progress_hook is not None:
+            self.staged += len(chunk)
+            self.progress_hook(self.staged, None)
@@ -0,0 +1,125 @@
+"""
+Adaptive transfer policy
+Chooses single put or staged blocks, the block size and the per-blob
+concurrency of each upload from the file size, the per-connection speed
+measured on recent blocks and the throughput of recent uploads in this
+worker. Concurrency grows additively while throughput holds and is halved
+whenever Azure Storage throttles (429/503)
+"""
+import math
+import threading
+from collections import deque, namedtuple
+
+MB = 1024 * 1024
+
+# single_put: one Put Blob request (the file fits in one block); throttles: the worker's count when planned
+TransferPlan = namedtuple('TransferPlan', ['single_put', 'block_size', 'max_concurrency', 'throttles'])
+
+
+def round_block_size(size, min_block_size, max_block_size):
+    """Largest power-of-two multiple of 1MB not above size, within the limits"""
+    if size < MB:
+        return min_block_size
+    return max(min_block_size, min(max_block_size, MB * 2 ** int(math.log2(size / MB))))
+
+
+class TransferPolicy:
+    """Per-worker upload tuning: block size from connection speed, concurrency by AIMD
+
+    Block size aims for blocks that take about target_block_seconds on one
+    connection, so slow links retry small blocks and fast links make fewer
+    requests. After an upload that saw no throttling and at least kept up
+    with the recent average throughput, concurrency goes up by one (up to
+    max_concurrency); any throttled response during an upload halves it.
+    With adaptive off the configured block size and concurrency are used.
+    """
+
+    def __init__(self, block_size, concurrency, min_block_size=MB, max_block_size=32 * MB, max_concurrency=8,
+                 adaptive=True, window=20, target_block_seconds=2.0):
+        self.block_size = block_size
+        self.concurrency = max(1, min(concurrency, max_concurrency))
+        self.min_block_size = min_block_size
+        self.max_block_size = max(min_block_size, max_block_size)
+        self.max_concurrency = max_concurrency
+        self.adaptive = adaptive
+        self.target_block_seconds = target_block_seconds
+        self.throttles = 0
+        self.transfers = 0
+        self._blocks = deque(maxlen=window)  # (bytes, seconds) of recently staged blocks
+        self._uploads = deque(maxlen=window)  # (bytes, seconds) of recent uploads
+        self._lock = threading.Lock()
+
+    def plan(self, size=None):
+        """TransferPlan for a file of size bytes (None when unknown, e.g. while streaming)"""
+        with self._lock:
+            block_size, concurrency = self.block_size, self.concurrency
+            if self.adaptive:
+                rate = self._rate(self._blocks)
+                if rate:
+                    block_size = round_block_size(
+                        rate * self.target_block_seconds, self.min_block_size, self.max_block_size
+                    )
+            throttles = self.throttles
+
+        if size is not None and size <= block_size:
+            return TransferPlan(True, block_size, 1, throttles)
+        if size is not None and self.adaptive:
+            # Spread the file over every connection rather than leaving some idle
+            block_size = min(block_size, round_block_size(
+                math.ceil(size / concurrency), self.min_block_size, self.max_block_size
+            ))
+            concurrency = min(concurrency, math.ceil(size / block_size))
+        return TransferPlan(False, block_size, concurrency, throttles)
+
+    def observe_block(self, size, seconds):
+        """Record one staged block (or single put): the speed of one connection"""
+        if seconds > 0:
+            with self._lock:
+                self._blocks.append((size, seconds))
+
+    def record(self, plan, size, seconds):
+        """Record a finished upload made with plan and adjust concurrency"""
+        if seconds <= 0:
+            return
+        with self._lock:
+            self.transfers += 1
+            recent = self._rate(self._uploads)
+            self._uploads.append((size, seconds))
+            if not self.adaptive:
+                return
+            if self.throttles > plan.throttles:
+                self.concurrency = max(1, self.concurrency // 2)
+            elif not plan.single_put and plan.max_concurrency >= self.concurrency \
+                    and (recent is None or size / seconds >= 0.9 * recent):
+                # Only uploads that used every connection say anything about adding one
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+
+    def note_throttled(self):
+        """Azure Storage asked this worker to back off (raw_response_hook saw a 429 or 503)"""
+        with self._lock:
+            self.throttles += 1
+
+    def stats(self):
+        with self._lock:
+            rate = self._rate(self._uploads)
+            connection_rate = self._rate(self._blocks)
+            block_size, concurrency = self.block_size, self.concurrency
+            throttles, transfers = self.throttles, self.transfers
+        if self.adaptive and connection_rate:
+            block_size = round_block_size(
+                connection_rate * self.target_block_seconds, self.min_block_size, self.max_block_size
+            )
+        return {
+            'adaptive': self.adaptive,
+            'block_size': block_size,
+            'max_concurrency': concurrency,
+            'mb_per_second': round(rate / MB, 2) if rate else None,
+            'connection_mb_per_second': round(connection_rate / MB, 2) if connection_rate else None,
+            'throttled_responses': throttles,
+            'transfers': transfers
+        }
+
+    @staticmethod
+    def _rate(samples):
+        seconds = sum(sample_seconds for _, sample_seconds in samples)
+        return sum(sample_bytes for sample_bytes, _ in samples) / seconds if seconds else None
@@ -0,0 +1,178 @@
+"""
+Upload progress registry
+Tracks the bytes each upload request has stored in Azure Storage (fed by
+the SDK's progress_hook and the block writer) in small JSON files shared
+by every worker, read back as snapshots or Server-Sent Events
+"""
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Channel and upload ids come from the browser and become file names
+VALID_ID = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+# Finished entries are dropped this long after their last update
+FINISHED_TTL = 60
+
+
+class UploadProgress:
+    """Storage-side progress of one upload request; updated from the transfer threads"""
+
+    def __init__(self, path, upload_id, total, interval, window=5.0):
+        self.path = path
+        self.upload_id = upload_id
+        self.total = total
+        self.interval = interval
+        self.window = window
+        self.status = 'uploading'
+        self.started = time.time()
+        self._stored = {}
+        self._samples = deque([(self.started, 0)])
+        self._written = 0.0
+        self._lock = threading.Lock()
+        self._save()
+
+    def hook(self, key):
+        """progress_hook(current, total) for the transfer of one file of the request"""
+        def progress_hook(current, total=None):
+            self.update(key, current)
+        return progress_hook
+
+    def update(self, key, stored):
+        """Record that stored bytes of file key are in storage (written out at most every interval)"""
+        with self._lock:
+            self._stored[key] = stored
+            now = time.time()
+            self._samples.append((now, sum(self._stored.values())))
+            while len(self._samples) > 2 and self._samples[0][0] < now - self.window:
+                self._samples.popleft()
+            if now - self._written >= self.interval:
+                self._save()
+
+    def finish(self, success):
+        with self._lock:
+            self.status = 'done' if success else 'failed'
+            self._save()
+
+    def snapshot(self):
+        """Progress as reported to the browser: bytes stored, throughput over the last few seconds and ETA"""
+        stored = sum(self._stored.values())
+        (first_time, first_stored), (last_time, last_stored) = self._samples[0], self._samples[-1]
+        rate = (last_stored - first_stored) / (last_time - first_time) if last_time > first_time else 0.0
+        eta = None
+        if self.status == 'uploading' and self.total and rate > 0:
+            eta = round(max(self.total - stored, 0) / rate, 1)
+        return {
+            'upload_id': self.upload_id,
+            'status': self.status,
+            'stored_bytes': stored,
+            'total_bytes': self.total,
+            'bytes_per_second': round(rate),
+            'eta_seconds': eta,
+            'started_at': self.started,
+            'updated_at': time.time()
+        }
+
+    def _save(self):
+        # Readers in other workers must never see a partial file
+        self._written = time.time()
+        temporary = f'{self.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(temporary, 'w') as progress_file:
+                json.dump(self.snapshot(), progress_file)
+            os.replace(temporary, self.path)
+        except OSError as e:
+            logger.debug(f"Upload progress not saved: {str(e)}")
+
+
+class ProgressRegistry:
+    """Upload progress shared across workers: <directory>/<channel>/<upload id>.json
+
+    A channel is one browser tab; its uploads are reported on one feed.
+    Channels idle for ttl seconds are removed.
+    """
+
+    def __init__(self, directory, interval=0.5, ttl=600):
+        self.directory = directory
+        self.interval = interval
+        self.ttl = ttl
+        self._cleaned = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def start(self, channel, upload_id, total):
+        """Register an upload request; returns its UploadProgress, or None when the ids are missing or invalid"""
+        if not VALID_ID.match(channel or '') or not VALID_ID.match(upload_id or ''):
+            return None
+        self._cleanup()
+        directory = os.path.join(self.directory, channel)
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError as e:
+            logger.warning(f"⚠️ Upload progress unavailable: {str(e)}")
+            return None
+        return UploadProgress(os.path.join(directory, f'{upload_id}.json'), upload_id, total, self.interval)
+
+    def read(self, channel):
+        """Current entries of a channel, oldest first"""
+        directory = os.path.join(self.directory, channel)
+        try:
+            names = [name for name in os.listdir(directory) if name.endswith('.json')]
+        except OSError:
+            return []
+
+        entries = []
+        for name in names:
+            path = os.path.join(directory, name)
+            try:
+                with open(path) as progress_file:
+                    entry = json.load(progress_file)
+            except (OSError, ValueError):
+                continue
+            if entry['status'] != 'uploading' and entry['updated_at'] < time.time() - FINISHED_TTL:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            entries.append(entry)
+        return sorted(entries, key=lambda entry: entry['started_at'])
+
+    def _cleanup(self):
+        # At most once a minute per worker
+        now = time.time()
+        if now - self._cleaned < 60:
+            return
+        self._cleaned = now
+        try:
+            for entry in os.scandir(self.directory):
+                if entry.is_dir() and entry.stat().st_mtime < now - self.ttl:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+        except OSError:
+            pass
+
+
+class ProgressFeed:
+    """One channel's progress changes as Server-Sent Events"""
+
+    def __init__(self, registry, channel):
+        self.registry = registry
+        self.channel = channel
+        self._sent = {}
+
+    def poll(self):
+        """Return (events text for entries changed since the last poll, whether any upload is in progress)"""
+        events = []
+        active = False
+        for entry in self.registry.read(self.channel):
+            active = active or entry['status'] == 'uploading'
+            if self._sent.get(entry['upload_id']) != entry['updated_at']:
+                self._sent[entry['upload_id']] = entry['updated_at']
+                events.append(f"event: progress\ndata: {json.dumps(entry)}\n\n")
+        return ''.join(events), active
@@ -0,0 +1,49 @@
+"""
+Resumable upload session helpers
+A session is a blob whose numbered chunks are staged as Azure blocks and
+committed in order on finalize, so Azure itself holds all session state
+"""
+import re
+
+from azure.core.exceptions import ResourceNotFoundError
+
+# Azure allows at most 50,000 blocks per block blob
+MAX_CHUNKS = 50000
+
+SESSION_ID_PATTERN = re.compile(
+    r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\.([a-z0-9]+)$'
+)
+
+
+def is_valid_session_id(session_id, allowed_extensions):
+    """Check that a session id is a server-generated blob name"""
+    match = SESSION_ID_PATTERN.match(session_id)
+    return bool(match) and match.group(1) in allowed_extensions
+
+
+def block_id_for_chunk(index):
+    """Map a chunk index to its fixed-length block id (the SDK base64-encodes it)"""
+    return f"{index:06d}"
+
+
+def chunk_index_for_block(block_id):
+    """Map a block id back to its chunk index (None for foreign blocks)"""
+    return int(block_id) if len(block_id) == 6 and block_id.isdigit() else None
+
+
+def get_session_chunks(blob_client):
+    """Return ({index: size} committed, {index: size} staged) for a session blob"""
+    try:
+        committed, uncommitted = blob_client.get_block_list('all')
+    except ResourceNotFoundError:
+        return {}, {}
+
+    def by_index(blocks):
+        chunks = {}
+        for block in blocks:
+            index = chunk_index_for_block(block.id)
+            if index is not None:
+                chunks[index] = block.size
+        return chunks
+
+    return by_index(committed), by_index(uncommitted)
@@ -0,0 +1,367 @@
+"""
+Local metadata index of uploaded videos
+An embedded SQLite database that answers sorted, filtered and paginated
+listings without listing blobs, kept in sync with the container by a
+background reconciler
+"""
+import base64
+import fcntl
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+from services.media_probe import media_from_metadata
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    id TEXT PRIMARY KEY,
+    blob_name TEXT NOT NULL,
+    original_filename TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    content_type TEXT,
+    uploaded_at TEXT NOT NULL,
+    last_modified TEXT,
+    checksum TEXT,
+    media TEXT,
+    shard TEXT,
+    sweep INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_videos_blob_name ON videos (blob_name);
+CREATE INDEX IF NOT EXISTS idx_videos_uploaded_at ON videos (uploaded_at, id);
+CREATE INDEX IF NOT EXISTS idx_videos_size ON videos (size, id);
+CREATE INDEX IF NOT EXISTS idx_videos_filename ON videos (original_filename, id);
+CREATE INDEX IF NOT EXISTS idx_videos_content_type ON videos (content_type, uploaded_at);
+CREATE INDEX IF NOT EXISTS idx_videos_checksum ON videos (checksum);
+CREATE TABLE IF NOT EXISTS index_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Public sort keys mapped to indexed columns
+SORT_COLUMNS = {
+    'uploaded_at': 'uploaded_at',
+    'size': 'size',
+    'filename': 'original_filename'
+}
+
+COLUMNS = [
+    'id', 'blob_name', 'original_filename', 'size', 'content_type', 'uploaded_at', 'last_modified', 'checksum', 'media',
+    'shard'
+]
+
+
+def to_utc_iso(value):
+    """Format a datetime like the upload records do (naive UTC ISO 8601)"""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat()
+
+
+def chunked(values, size=500):
+    """Split values for IN (...) clauses, well under SQLite's bound parameter limit"""
+    values = list(values)
+    return [values[i:i + size] for i in range(0, len(values), size)]
+
+
+def encode_cursor(values):
+    """Encode a keyset position as an opaque continuation token"""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(token):
+    """Decode a continuation token (ValueError when malformed)"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError('Invalid continuation token') from e
+    if not isinstance(values, list) or len(values) != 2:
+        raise ValueError('Invalid continuation token')
+    return values
+
+
+class VideoIndex:
+    """SQLite-backed index of videos; safe to share across threads and worker processes"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._reconciler = None
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+            self._migrate(conn)
+
+    def _migrate(self, conn):
+        # Columns added after the first release; another worker may add them first
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(videos)")}
+        for column in ('media', 'shard'):
+            if column not in columns:
+                try:
+                    conn.execute(f"ALTER TABLE videos ADD COLUMN {column} TEXT")
+                except sqlite3.OperationalError:
+                    pass
+
+    def _connection(self):
+        # One connection per thread, never carried across a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def record(self, video_id, blob_name, original_filename, size, content_type, uploaded_at, checksum=None,
+               shard=None):
+        """Insert or replace the entry for one uploaded video (shard: id of the storage shard holding the blob)
+
+        Entries that share a blob (duplicates) inherit its probed media details.
+        """
+        with self._connection() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO videos
+                    (id, blob_name, original_filename, size, content_type, uploaded_at, last_modified, checksum, media,
+                     shard)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?,
+                        (SELECT media FROM videos WHERE blob_name = ? AND media IS NOT NULL LIMIT 1), ?)
+                """,
+                (
+                    video_id, blob_name, original_filename, size, content_type, uploaded_at, uploaded_at, checksum,
+                    blob_name, shard
+                )
+            )
+
+    def set_media(self, blob_name, media):
+        """Store probed media details (a dict) on every entry of a blob"""
+        with self._connection() as conn:
+            conn.execute("UPDATE videos SET media = ? WHERE blob_name = ?", (json.dumps(media), blob_name))
+
+    def shard_of(self, blob_name):
+        """Return the id of the shard holding a blob, or None when unknown"""
+        row = self._connection().execute(
+            "SELECT shard FROM videos WHERE blob_name = ? AND shard IS NOT NULL LIMIT 1", (blob_name,)
+        ).fetchone()
+        return row['shard'] if row else None
+
+    def get(self, video_id):
+        """Return one entry as a dict, or None"""
+        row = self._connection().execute(
+            f"SELECT {', '.join(COLUMNS)} FROM videos WHERE id = ?", (video_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def remove(self, video_ids):
+        """Delete the entries of video_ids"""
+        with self._connection() as conn:
+            for chunk in chunked(video_ids):
+                conn.execute(f"DELETE FROM videos WHERE id IN ({', '.join('?' * len(chunk))})", chunk)
+
+    def referenced_elsewhere(self, blob_names, video_ids):
+        """Return the blob names still used by entries other than video_ids (deduplicated uploads)"""
+        conn = self._connection()
+        excluded = set(video_ids)
+        referenced = set()
+        for chunk in chunked(blob_names):
+            rows = conn.execute(
+                f"SELECT id, blob_name FROM videos WHERE blob_name IN ({', '.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            referenced.update(row['blob_name'] for row in rows if row['id'] not in excluded)
+        return referenced
+
+    def find_by_checksum(self, checksum, size, limit=3):
+        """Return up to limit entries with this content, one per distinct blob, newest first"""
+        rows = self._connection().execute(
+            f"SELECT {', '.join(COLUMNS)} FROM videos WHERE checksum = ? AND size = ? "
+            "AND id = blob_name ORDER BY uploaded_at DESC LIMIT ?",
+            (checksum, size, limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def dedup_stats(self):
+        """Duplicate rate and bytes saved by entries that share another entry's blob"""
+        total, duplicates, bytes_saved = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(id != blob_name), 0), "
+            "COALESCE(SUM(CASE WHEN id != blob_name THEN size ELSE 0 END), 0) FROM videos"
+        ).fetchone()
+        return {
+            'videos': total,
+            'duplicates': duplicates,
+            'duplicate_rate': round(duplicates / total, 3) if total else 0.0,
+            'bytes_saved': bytes_saved
+        }
+
+    def query(self, sort='uploaded_at', descending=True, limit=100, continuation=None,
+              prefix=None, content_type=None, min_size=None, max_size=None, search=None):
+        """Return (entries, next_continuation) for one page of a sorted, filtered listing"""
+        column = SORT_COLUMNS[sort]
+        clauses = []
+        params = []
+
+        if prefix:
+            clauses.append("id >= ? AND id < ?")
+            params += [prefix, prefix + '\uffff']
+        if content_type:
+            clauses.append("content_type = ?")
+            params.append(content_type)
+        if min_size is not None:
+            clauses.append("size >= ?")
+            params.append(min_size)
+        if max_size is not None:
+            clauses.append("size <= ?")
+            params.append(max_size)
+        if search:
+            escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            clauses.append("original_filename LIKE ? ESCAPE '\\'")
+            params.append(f'%{escaped}%')
+
+        # Keyset pagination: continue strictly after the last (sort value, id) returned
+        if continuation:
+            last_value, last_id = decode_cursor(continuation)
+            op = '<' if descending else '>'
+            clauses.append(f"({column} {op} ? OR ({column} = ? AND id {op} ?))")
+            params += [last_value, last_value, last_id]
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        direction = 'DESC' if descending else 'ASC'
+        rows = self._connection().execute(
+            f"SELECT {', '.join(COLUMNS)} FROM videos {where} "
+            f"ORDER BY {column} {direction}, id {direction} LIMIT ?",
+            params + [limit + 1]
+        ).fetchall()
+
+        entries = [dict(row) for row in rows[:limit]]
+        next_continuation = None
+        if len(rows) > limit:
+            last = entries[-1]
+            next_continuation = encode_cursor([last[column], last['id']])
+        return entries, next_continuation
+
+    def reconcile_page(self, containers, page_size=5000):
+        """Sync one page of the listing of the (shard id, container client) pairs into the index
+
+        The listing position is persisted, so each call continues where the
+        previous one stopped; a pass lists the containers one after another.
+        When a full pass completes, entries whose blob was not seen during the
+        pass (and that predate it) are removed.
+        """
+        conn = self._connection()
+        state = dict(conn.execute("SELECT key, value FROM index_state").fetchall())
+        sweep = int(state.get('sweep', 1))
+        token = state.get('continuation') or None
+        pass_started = state.get('pass_started') or to_utc_iso(datetime.now(timezone.utc))
+
+        shard_ids = [shard_id for shard_id, _ in containers]
+        # Passes started before sharding have no shard recorded: they were listing the first container
+        position = shard_ids.index(state['shard']) if state.get('shard') in shard_ids else 0
+        shard_id, container_client = containers[position]
+
+        pages = container_client.list_blobs(include=['metadata'], results_per_page=page_size).by_page(
+            continuation_token=token
+        )
+        blobs = list(next(pages, []))
+        token = pages.continuation_token or None
+
+        with conn:
+            for blob in blobs:
+                self._sync_blob(conn, blob, sweep, shard_id)
+
+            if token:
+                self._save_state(conn, sweep=sweep, continuation=token, pass_started=pass_started, shard=shard_id)
+            elif position + 1 < len(containers):
+                self._save_state(
+                    conn, sweep=sweep, continuation='', pass_started=pass_started, shard=shard_ids[position + 1]
+                )
+                return len(blobs), False
+            else:
+                removed = conn.execute(
+                    "DELETE FROM videos WHERE sweep < ? AND uploaded_at < ?", (sweep, pass_started)
+                ).rowcount
+                if removed:
+                    logger.info(f"🧹 Video index: removed {removed} entries for deleted blobs")
+                self._save_state(conn, sweep=sweep + 1, continuation='', pass_started='', shard='')
+
+        return len(blobs), token is None
+
+    def _sync_blob(self, conn, blob, sweep, shard):
+        content_type = blob.content_settings.content_type if blob.content_settings else None
+        last_modified = to_utc_iso(blob.last_modified)
+        metadata = blob.metadata or {}
+        media = media_from_metadata(metadata)
+        media = json.dumps(media) if media else None
+
+        updated = conn.execute(
+            "UPDATE videos SET size = ?, content_type = ?, last_modified = ?, media = COALESCE(?, media), shard = ?, "
+            "sweep = ? WHERE blob_name = ?",
+            (blob.size, content_type, last_modified, media, shard, sweep, blob.name)
+        ).rowcount
+
+        if not updated:
+            created = getattr(blob, 'creation_time', None) or blob.last_modified
+            conn.execute(
+                """
+                INSERT INTO videos
+                    (id, blob_name, original_filename, size, content_type, uploaded_at, last_modified, checksum, media,
+                     shard, sweep)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    blob.name, blob.name, metadata.get('original_filename', blob.name), blob.size, content_type,
+                    to_utc_iso(created) or last_modified, last_modified, metadata.get('sha256'), media, shard, sweep
+                )
+            )
+
+    def _save_state(self, conn, **values):
+        conn.executemany(
+            "INSERT OR REPLACE INTO index_state (key, value) VALUES (?, ?)",
+            [(key, str(value)) for key, value in values.items()]
+        )
+
+    def start_reconciler(self, get_containers, interval):
+        """Run reconcile_page periodically in a daemon thread (one worker per instance)
+
+        get_containers returns the (shard id, container client) pairs to reconcile.
+        """
+        if self._reconciler is not None:
+            return
+        self._reconciler = threading.Thread(
+            target=self._reconcile_loop, args=(get_containers, interval),
+            name='video-index-reconciler', daemon=True
+        )
+        self._reconciler.start()
+
+    def _reconcile_loop(self, get_containers, interval):
+        # Only the worker holding the lock reconciles; the others stay idle
+        lock_file = open(f'{self.path}.reconcile.lock', 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return
+
+        while True:
+            delay = interval
+            try:
+                containers = get_containers()
+                if containers:
+                    count, finished = self.reconcile_page(containers)
+                    logger.info(f"🔄 Video index reconciled {count} blobs{' (pass complete)' if finished else ''}")
+                    # Keep going page by page until the pass is complete
+                    delay = interval if finished else 1
+            except Exception as e:
+                logger.warning(f"⚠️ Video index reconciliation failed: {str(e)}")
+            time.sleep(delay)
@@ -7,18 +7,36 @@
 const CONFIG = {
     API_ENDPOINTS: {
         UPLOAD: '/api/upload',
+        UPLOAD_SAS: '/api/upload/sas',
+        UPLOAD_COMPLETE: '/api/upload/complete',
+        UPLOAD_DEDUP: '/api/upload/dedup',
+        UPLOAD_PROGRESS: '/api/upload/progress',
         VIDEOS: '/api/videos',
         HEALTH: '/api/health'
     },
     MAX_FILE_SIZE: 100 * 1024 * 1024, // 100MB
     ALLOWED_EXTENSIONS: ['mp4', 'mov', 'avi', 'mkv', 'webm'],
-    NOTIFICATION_TIMEOUT: 5000 // 5 seconds
+    NOTIFICATION_TIMEOUT: 5000, // 5 seconds
+    VIDEOS_PAGE_SIZE: 100,
+    DEDUP_HASH_MAX_SIZE: 100 * 1024 * 1024, // Larger files are uploaded without a hash check
+    DEDUP_HASH_SLICE_SIZE: 4 * 1024 * 1024, // Files are read and hashed this much at a time
+    UPLOAD_BUSY_RETRIES: 5, // Retries when the server answers 503 with Retry-After
+    PROGRESS_POLL_INTERVAL: 1000 // 1 second between server-side progress checks, when the server cannot stream them
 };
 
 // ===== State Management =====
 const state = {
     uploadingFiles: new Map(),
-    uploadedVideos: []
+    uploadedVideos: [],
+    videosContinuation: null, // Continuation token of the next listing page, null once all are loaded
+    directUploads: true, // Cleared once the server reports direct uploads are disabled
+    dedup: null, // Whether the server deduplicates uploads (asked from /api/health on first use)
+    progressChannel: randomId(), // Identifies this tab's uploads on the server-side progress feed
+    progressTimer: null,
+    progressFeed: true, // Cleared once the server reports the progress feed is disabled
+    progressEvents: null, // EventSource of the progress feed while it is open
+    progressStream: true, // Cleared once the server answers the feed with snapshots only (sync workers)
+    storageUploads: new Map() // Upload id -> progress item id, for uploads sent through the API
 };
 
 // ===== DOM Elements =====
@@ -32,12 +50,23 @@ const elements = {
     videosList: document.getElementById('videosList'),
     videoCount: document.getElementById('videoCount'),
     emptyState: document.getElementById('emptyState'),
+    loadMoreBtn: document.getElementById('loadMoreBtn'),
     notificationContainer: document.getElementById('notificationContainer'),
     healthCheckBtn: document.getElementById('healthCheckBtn')
 };
 
 // ===== Utility Functions =====
 
+/**
+ * Random id of letters and digits (progress channel and upload ids)
+ */
+function randomId() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID().replace(/-/g, '');
+    }
+    return Date.now().toString(36) + Math.random().toString(36).slice(2, 12);
+}
+
 /**
  * Format file size in human-readable format
  */
@@ -182,6 +211,108 @@ function updateProgress(progressItemId, percentage) {
     }
 }
 
+/**
+ * Show how much of a file the server has stored in Azure (once the browser has sent all of it)
+ */
+function updateStorageProgress(progressItemId, progress) {
+    const progressItem = document.getElementById(progressItemId);
+    if (!progressItem || progressItem.dataset.sent !== 'true' || !progress.total_bytes) return;
+    
+    const percentage = Math.min(99, Math.round((progress.stored_bytes / progress.total_bytes) * 100));
+    const progressBar = progressItem.querySelector('.progress-bar');
+    const percentageText = progressItem.querySelector('.progress-item-percentage');
+    
+    progressBar.classList.remove('bg-success');
+    progressBar.classList.add('bg-primary');
+    progressBar.style.width = `${percentage}%`;
+    progressBar.setAttribute('aria-valuenow', percentage);
+    
+    let text = `Storing ${percentage}%`;
+    if (progress.bytes_per_second) text += ` · ${formatFileSize(progress.bytes_per_second)}/s`;
+    if (progress.eta_seconds !== null) text += ` · ${Math.ceil(progress.eta_seconds)}s left`;
+    percentageText.textContent = text;
+}
+
+/**
+ * Show one server-side progress entry on the item of its upload
+ */
+function applyStorageProgress(progress) {
+    const progressItemId = state.storageUploads.get(progress.upload_id);
+    if (progressItemId && progress.status === 'uploading') {
+        updateStorageProgress(progressItemId, progress);
+    }
+}
+
+/**
+ * Follow the server-side progress of this tab's API uploads while any is running (one feed for all of them):
+ * Server-Sent Events where the server streams them (ASGI), otherwise a check once a second
+ */
+function startProgressUpdates() {
+    if (!state.progressFeed || state.progressEvents || state.progressTimer) return;
+    if (state.progressStream && window.EventSource) {
+        openProgressStream();
+    } else {
+        state.progressTimer = setTimeout(pollProgress, CONFIG.PROGRESS_POLL_INTERVAL);
+    }
+}
+
+/**
+ * Open the Server-Sent Events feed; a server that only returns snapshots fails it before it opens
+ */
+function openProgressStream() {
+    const source = new EventSource(`${CONFIG.API_ENDPOINTS.UPLOAD_PROGRESS}?channel=${state.progressChannel}`);
+    let opened = false;
+    state.progressEvents = source;
+    
+    source.addEventListener('open', () => {
+        opened = true;
+    });
+    source.addEventListener('progress', (event) => applyStorageProgress(JSON.parse(event.data)));
+    source.addEventListener('error', () => {
+        // The server ends idle streams; EventSource reconnects by itself unless it gave up
+        if (opened && source.readyState !== EventSource.CLOSED) return;
+        source.close();
+        state.progressEvents = null;
+        if (!opened) state.progressStream = false;
+        if (state.storageUploads.size > 0) startProgressUpdates();
+    });
+}
+
+/**
+ * Fetch the progress snapshot and schedule the next check while uploads remain
+ */
+async function pollProgress() {
+    state.progressTimer = null;
+    try {
+        const response = await fetch(`${CONFIG.API_ENDPOINTS.UPLOAD_PROGRESS}?channel=${state.progressChannel}`);
+        if (response.ok) {
+            const data = await response.json();
+            data.uploads.forEach(applyStorageProgress);
+        } else if (response.status === 503 || response.status === 404) {
+            state.progressFeed = false;
+        }
+    } catch (error) {
+        // Missed updates are harmless; the next check catches up
+    }
+    
+    if (state.storageUploads.size > 0) startProgressUpdates();
+}
+
+/**
+ * Stop following server-side progress once no API upload is left
+ */
+function stopProgressUpdates() {
+    if (state.storageUploads.size > 0) return;
+    if (state.progressTimer) {
+        clearTimeout(state.progressTimer);
+        state.progressTimer = null;
+    }
+    if (state.progressEvents) {
+        state.progressEvents.close();
+        state.progressEvents = null;
+    }
+}
+
 /**
  * Show/hide progress section
  */
@@ -226,6 +357,9 @@ function createVideoItem(video) {
             </div>
         </div>
         <div class="video-item-status">
+            ${video.stream_url ? `<a class="badge badge-play" href="${video.stream_url}" target="_blank" rel="noopener">
+                <i class="bi bi-play-circle" aria-hidden="true"></i> Play
+            </a>` : ''}
             <span class="badge badge-success">
                 <i class="bi bi-check-circle" aria-hidden="true"></i> Uploaded
             </span>
@@ -236,66 +370,272 @@ function createVideoItem(video) {
 }
 
 /**
- * Update videos list
+ * Update the video count, empty state and "Load more" button
  */
 function updateVideosList() {
-    if (state.uploadedVideos.length === 0) {
-        elements.emptyState.style.display = 'block';
-        elements.videoCount.textContent = '0';
-        return;
-    }
-    
-    elements.emptyState.style.display = 'none';
-    elements.videoCount.textContent = state.uploadedVideos.length;
-    
-    // Clear existing items except empty state
-    const existingItems = elements.videosList.querySelectorAll('.video-item');
-    existingItems.forEach(item => item.remove());
-    
-    // Add video items (newest first)
-    const sortedVideos = [...state.uploadedVideos].reverse();
-    sortedVideos.forEach(video => {
-        const videoItem = createVideoItem(video);
-        elements.videosList.insertBefore(videoItem, elements.emptyState);
-    });
+    const count = state.uploadedVideos.length;
+    elements.emptyState.style.display = count === 0 ? 'block' : 'none';
+    elements.videoCount.textContent = state.videosContinuation ? `${count}+` : count;
+    elements.loadMoreBtn.style.display = state.videosContinuation ? 'inline-block' : 'none';
+}
+
+/**
+ * Add videos to the end of the list (listing pages come in the server's order, newest first)
+ */
+function appendVideos(videos) {
+    const fragment = document.createDocumentFragment();
+    videos.forEach(video => fragment.appendChild(createVideoItem(video)));
+    elements.videosList.insertBefore(fragment, elements.emptyState);
+    state.uploadedVideos.push(...videos);
+    updateVideosList();
 }
 
 /**
- * Load videos from API
+ * Add a just-uploaded video to the top of the list
+ */
+function prependVideo(video) {
+    elements.videosList.insertBefore(createVideoItem(video), elements.videosList.firstChild);
+    state.uploadedVideos.unshift(video);
+    updateVideosList();
+}
+
+/**
+ * Load the next page of videos from the API (the first page when nothing is loaded yet)
  */
 async function loadVideos() {
+    elements.loadMoreBtn.disabled = true;
     try {
-        const response = await fetch(CONFIG.API_ENDPOINTS.VIDEOS);
+        const params = new URLSearchParams({ limit: CONFIG.VIDEOS_PAGE_SIZE });
+        if (state.videosContinuation) params.set('continuation', state.videosContinuation);
+        
+        const response = await fetch(`${CONFIG.API_ENDPOINTS.VIDEOS}?${params}`);
         const data = await response.json();
         
         if (data.success) {
-            state.uploadedVideos = data.videos || [];
-            updateVideosList();
+            state.videosContinuation = data.continuation || null;
+            appendVideos(data.videos || []);
         }
     } catch (error) {
         console.error('Error loading videos:', error);
         showNotification('error', 'Error', 'Failed to load videos list');
+    } finally {
+        elements.loadMoreBtn.disabled = false;
     }
 }
 
 // ===== File Upload =====
 
 /**
- * Upload single file
+ * Request a direct-to-storage upload ticket (SAS URL)
+ * Returns null when the server does not offer direct uploads
  */
-async function uploadFile(file) {
-    const progressItem = createProgressItem(file);
-    const progressItemId = progressItem.id;
-    elements.progressList.appendChild(progressItem);
-    state.uploadingFiles.set(file.name, file);
+async function requestDirectUpload(file) {
+    if (!state.directUploads) return null;
     
-    toggleProgressSection(true);
-    updateUploadCount();
+    try {
+        const response = await fetch(CONFIG.API_ENDPOINTS.UPLOAD_SAS, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ filename: file.name, size: file.size })
+        });
+        
+        if (response.status === 503) {
+            state.directUploads = false;
+            return null;
+        }
+        
+        const data = await response.json();
+        return data.success ? data : null;
+    } catch (error) {
+        return null;
+    }
+}
+
+const SHA256_K = new Uint32Array([
+    0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+    0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+    0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+    0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+    0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+    0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+    0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+    0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2
+]);
+
+/**
+ * Incremental SHA-256, so a file can be hashed a slice at a time
+ * (crypto.subtle only digests a whole buffer, which means reading the whole file into memory)
+ */
+class Sha256 {
+    constructor() {
+        this.hash = new Uint32Array([
+            0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a, 0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19
+        ]);
+        this.words = new Uint32Array(64);
+        this.block = new Uint8Array(64);
+        this.blockLength = 0;
+        this.length = 0;
+    }
     
-    const formData = new FormData();
-    formData.append('files[]', file);
+    update(bytes) {
+        let offset = 0;
+        this.length += bytes.length;
+        
+        if (this.blockLength > 0) {
+            offset = Math.min(64 - this.blockLength, bytes.length);
+            this.block.set(bytes.subarray(0, offset), this.blockLength);
+            this.blockLength += offset;
+            if (this.blockLength < 64) return;
+            this.compress(this.block, 0);
+            this.blockLength = 0;
+        }
+        
+        for (; offset + 64 <= bytes.length; offset += 64) {
+            this.compress(bytes, offset);
+        }
+        this.block.set(bytes.subarray(offset));
+        this.blockLength = bytes.length - offset;
+    }
+    
+    digestHex() {
+        // Pad with 0x80, zeros and the message length in bits to a whole number of blocks
+        const bits = this.length * 8;
+        const padding = new Uint8Array((this.blockLength < 56 ? 64 : 128) - this.blockLength);
+        const view = new DataView(padding.buffer);
+        padding[0] = 0x80;
+        view.setUint32(padding.length - 8, Math.floor(bits / 0x100000000));
+        view.setUint32(padding.length - 4, bits >>> 0);
+        this.update(padding);
+        return Array.from(this.hash, (word) => word.toString(16).padStart(8, '0')).join('');
+    }
+    
+    compress(bytes, offset) {
+        const w = this.words;
+        for (let i = 0; i < 16; i++) {
+            const j = offset + i * 4;
+            w[i] = (bytes[j] << 24) | (bytes[j + 1] << 16) | (bytes[j + 2] << 8) | bytes[j + 3];
+        }
+        for (let i = 16; i < 64; i++) {
+            const x = w[i - 15];
+            const y = w[i - 2];
+            const s0 = ((x >>> 7) | (x << 25)) ^ ((x >>> 18) | (x << 14)) ^ (x >>> 3);
+            const s1 = ((y >>> 17) | (y << 15)) ^ ((y >>> 19) | (y << 13)) ^ (y >>> 10);
+            w[i] = w[i - 16] + s0 + w[i - 7] + s1;
+        }
+        
+        let [a, b, c, d, e, f, g, h] = this.hash;
+        for (let i = 0; i < 64; i++) {
+            const s1 = ((e >>> 6) | (e << 26)) ^ ((e >>> 11) | (e << 21)) ^ ((e >>> 25) | (e << 7));
+            const t1 = (h + s1 + ((e & f) ^ (~e & g)) + SHA256_K[i] + w[i]) | 0;
+            const s0 = ((a >>> 2) | (a << 30)) ^ ((a >>> 13) | (a << 19)) ^ ((a >>> 22) | (a << 10));
+            const t2 = (s0 + ((a & b) ^ (a & c) ^ (b & c))) | 0;
+            h = g;
+            g = f;
+            f = e;
+            e = (d + t1) | 0;
+            d = c;
+            c = b;
+            b = a;
+            a = (t1 + t2) | 0;
+        }
+        
+        const hash = this.hash;
+        hash[0] += a;
+        hash[1] += b;
+        hash[2] += c;
+        hash[3] += d;
+        hash[4] += e;
+        hash[5] += f;
+        hash[6] += g;
+        hash[7] += h;
+    }
+}
+
+/**
+ * Compute the SHA-256 (hex) of a file in the browser, reading one slice at a time
+ */
+async function hashFile(file) {
+    const hash = new Sha256();
+    for (let offset = 0; offset < file.size; offset += CONFIG.DEDUP_HASH_SLICE_SIZE) {
+        const slice = file.slice(offset, offset + CONFIG.DEDUP_HASH_SLICE_SIZE);
+        hash.update(new Uint8Array(await slice.arrayBuffer()));
+    }
+    return hash.digestHex();
+}
+
+/**
+ * Whether the server deduplicates uploads; asked once from /api/health, before any file is hashed
+ */
+async function dedupAvailable() {
+    if (state.dedup === null) {
+        state.dedup = fetch(CONFIG.API_ENDPOINTS.HEALTH)
+            .then((response) => response.json())
+            .then((data) => Boolean(data.dedup))
+            .catch(() => false);
+    }
+    return state.dedup;
+}
+
+/**
+ * Record a file by content hash alone when the server already stores the same content
+ * Returns null when the file still has to be uploaded
+ */
+async function uploadByHash(file) {
+    if (file.size > CONFIG.DEDUP_HASH_MAX_SIZE || !(await dedupAvailable())) return null;
     
     try {
+        const response = await fetch(CONFIG.API_ENDPOINTS.UPLOAD_DEDUP, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ filename: file.name, size: file.size, sha256: await hashFile(file) })
+        });
+        
+        if (response.status === 503) {
+            state.dedup = false;
+            return null;
+        }
+        
+        return response.ok ? await response.json() : null;
+    } catch (error) {
+        return null;
+    }
+}
+
+/**
+ * Mark upload as finished and show the result
+ */
+function finishUpload(file, progressItem, response) {
+    state.uploadingFiles.delete(file.name);
+    updateUploadCount();
+    
+    if (response && response.success && response.files && response.files.length > 0) {
+        updateProgress(progressItem.id, 100);
+        const uploadedFile = response.files[0];
+        prependVideo(uploadedFile);
+        showNotification('success', 'Upload Successful', `${file.name} uploaded successfully`);
+    } else {
+        showNotification('error', 'Upload Failed', (response && response.message) || 'Unknown error occurred');
+    }
+    
+    // Remove progress item after brief delay
+    setTimeout(() => progressItem.remove(), 1500);
+}
+
+/**
+ * Mark upload as failed
+ */
+function failUpload(file, progressItem, message) {
+    state.uploadingFiles.delete(file.name);
+    updateUploadCount();
+    showNotification('error', 'Upload Error', message);
+    progressItem.remove();
+}
+
+/**
+ * Send a request body with XHR, reporting upload progress
+ */
+function sendWithProgress(method, url, body, headers, progressItemId) {
+    return new Promise((resolve, reject) => {
         const xhr = new XMLHttpRequest();
         
         // Track upload progress
@@ -305,46 +645,107 @@ async function uploadFile(file) {
                 updateProgress(progressItemId, percentage);
             }
         });
-        
-        // Handle completion
-        xhr.addEventListener('load', () => {
-            state.uploadingFiles.delete(file.name);
-            updateUploadCount();
-            
-            if (xhr.status === 200) {
-                const response = JSON.parse(xhr.responseText);
-                if (response.success && response.files && response.files.length > 0) {
-                    const uploadedFile = response.files[0];
-                    state.uploadedVideos.push(uploadedFile);
-                    updateVideosList();
-                    showNotification('success', 'Upload Successful', `${file.name} uploaded successfully`);
-                } else {
-                    showNotification('error', 'Upload Failed', response.message || 'Unknown error occurred');
-                }
-            } else {
-                showNotification('error', 'Upload Failed', `Server returned status ${xhr.status}`);
-            }
-            
-            // Remove progress item after brief delay
-            setTimeout(() => progressItem.remove(), 1500);
+        xhr.upload.addEventListener('load', () => {
+            // From here on, the server-side progress feed takes over
+            const progressItem = document.getElementById(progressItemId);
+            if (progressItem) progressItem.dataset.sent = 'true';
         });
         
-        // Handle errors
-        xhr.addEventListener('error', () => {
-            state.uploadingFiles.delete(file.name);
-            updateUploadCount();
-            showNotification('error', 'Upload Error', `Failed to upload ${file.name}`);
-            progressItem.remove();
-        });
+        xhr.addEventListener('load', () => resolve(xhr));
+        xhr.addEventListener('error', () => reject(new Error('Network error')));
         
-        xhr.open('POST', CONFIG.API_ENDPOINTS.UPLOAD);
-        xhr.send(formData);
+        xhr.open(method, url);
+        Object.entries(headers).forEach(([name, value]) => xhr.setRequestHeader(name, value));
+        xhr.send(body);
+    });
+}
+
+/**
+ * Upload single file straight to Azure Storage, then record it with the API
+ */
+async function uploadDirect(file, ticket, progressItem) {
+    const xhr = await sendWithProgress('PUT', ticket.upload_url, file, ticket.headers, progressItem.id);
+    
+    if (xhr.status !== 201) {
+        showNotification('error', 'Upload Failed', `Storage returned status ${xhr.status}`);
+        return failUpload(file, progressItem, `Failed to upload ${file.name}`);
+    }
+    
+    const response = await fetch(CONFIG.API_ENDPOINTS.UPLOAD_COMPLETE, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ blob_name: ticket.blob_name, ticket: ticket.ticket })
+    });
+    finishUpload(file, progressItem, await response.json());
+}
+
+/**
+ * Upload single file through the Flask API
+ */
+async function uploadViaApi(file, progressItem) {
+    const formData = new FormData();
+    formData.append('files[]', file);
+    
+    // The server reports how much it has stored in Azure under this id on the progress feed
+    const uploadId = randomId();
+    const headers = { 'X-Progress-Channel': state.progressChannel, 'X-Upload-Id': uploadId };
+    state.storageUploads.set(uploadId, progressItem.id);
+    startProgressUpdates();
+    
+    let xhr;
+    try {
+        xhr = await sendWithProgress('POST', CONFIG.API_ENDPOINTS.UPLOAD, formData, headers, progressItem.id);
         
-    } catch (error) {
+        // The server turns uploads away while it is busy; wait as long as it asks and try again
+        for (let attempt = 0; xhr.status === 503 && xhr.getResponseHeader('Retry-After') && attempt < CONFIG.UPLOAD_BUSY_RETRIES; attempt++) {
+            const retryAfter = parseInt(xhr.getResponseHeader('Retry-After'), 10) || 5;
+            delete progressItem.dataset.sent;
+            updateProgress(progressItem.id, 0);
+            await new Promise(resolve => setTimeout(resolve, retryAfter * 1000));
+            xhr = await sendWithProgress('POST', CONFIG.API_ENDPOINTS.UPLOAD, formData, headers, progressItem.id);
+        }
+    } finally {
+        state.storageUploads.delete(uploadId);
+        stopProgressUpdates();
+    }
+    
+    if (xhr.status === 200) {
+        finishUpload(file, progressItem, JSON.parse(xhr.responseText));
+    } else {
         state.uploadingFiles.delete(file.name);
         updateUploadCount();
-        showNotification('error', 'Upload Error', error.message);
-        progressItem.remove();
+        showNotification('error', 'Upload Failed', `Server returned status ${xhr.status}`);
+        setTimeout(() => progressItem.remove(), 1500);
+    }
+}
+
+/**
+ * Upload single file
+ */
+async function uploadFile(file) {
+    const progressItem = createProgressItem(file);
+    elements.progressList.appendChild(progressItem);
+    state.uploadingFiles.set(file.name, file);
+    
+    toggleProgressSection(true);
+    updateUploadCount();
+    
+    try {
+        const duplicate = await uploadByHash(file);
+        if (duplicate) {
+            updateProgress(progressItem.id, 100);
+            return finishUpload(file, progressItem, duplicate);
+        }
+        
+        const ticket = await requestDirectUpload(file);
+        
+        if (ticket) {
+            await uploadDirect(file, ticket, progressItem);
+        } else {
+            await uploadViaApi(file, progressItem);
+        }
+    } catch (error) {
+        failUpload(file, progressItem, `Failed to upload ${file.name}`);
     }
 }
 
@@ -450,6 +851,11 @@ elements.uploadZone.addEventListener('keydown', (e) => {
     }
 });
 
+/**
+ * Load more button: fetch the next page of the listing
+ */
+elements.loadMoreBtn.addEventListener('click', () => loadVideos());
+
 /**
  * Health check button
  */
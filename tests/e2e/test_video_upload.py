@@ -56,6 +56,29 @@ class TestHealthEndpoint:
         assert '"healthy"' in content or '"connected"' in content, "Health check not reporting healthy"
 
 
+class TestVideosApi:
+    """Test the video listing API."""
+
+    def test_videos_listing_is_paginated(self, page: Page, app_url: str):
+        """Verify the listing honors limit and returns a continuation field."""
+        response = page.request.get(f"{app_url}/api/videos?limit=1")
+        assert response.status == 200, f"Videos endpoint returned {response.status}"
+
+        data = response.json()
+        assert data["success"] is True
+        assert len(data["videos"]) <= 1
+        assert "continuation" in data, "Listing response missing 'continuation' field"
+
+    def test_videos_listing_conditional_get(self, page: Page, app_url: str):
+        """Verify a repeat poll with the ETag gets 304 Not Modified."""
+        response = page.request.get(f"{app_url}/api/videos")
+        etag = response.headers.get("etag")
+        assert etag, "Listing response missing ETag header"
+
+        repeat = page.request.get(f"{app_url}/api/videos", headers={"If-None-Match": etag})
+        assert repeat.status == 304, f"Conditional listing returned {repeat.status}"
+
+
 class TestApplicationUI:
     """Test the main application UI."""
 
@@ -100,6 +123,22 @@ class TestApplicationUI:
         progress = page.locator("#uploadProgress")
         assert progress.count() > 0, "Progress bar element not found"
 
+    def test_videos_list_loads_first_page_only(self, page: Page, app_url: str):
+        """Verify the list fetches one page and offers the rest behind Load more."""
+        listing_requests = []
+        page.on("request", lambda request: listing_requests.append(request.url) if "/api/videos?" in request.url else None)
+        with page.expect_response(lambda response: "/api/videos?" in response.url) as listing:
+            page.goto(app_url)
+        continuation = listing.value.json()["continuation"]
+        page.wait_for_timeout(1000)
+
+        assert len(listing_requests) == 1, f"Expected one listing request on load, got {len(listing_requests)}"
+        load_more = page.locator("#loadMoreBtn")
+        if continuation:
+            expect(load_more).to_be_visible()
+        else:
+            expect(load_more).to_be_hidden()
+
 
 class TestVideoUpload:
     """Test video upload functionality."""
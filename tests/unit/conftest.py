@@ -0,0 +1,42 @@
+"""
+Shared fixtures for unit tests that drive the Flask app.
+
+The app is imported on first use, configured like the benchmark server:
+no Azure credentials, no background token refresh, no admission limits
+and no media probing, backed by the in-process storage stand-in.
+"""
+
+import os
+
+import pytest
+
+from benchmarks.fake_storage import FakeBlobServiceClient, StorageProfile
+
+
+@pytest.fixture(scope="session")
+def video_app():
+    os.environ.setdefault("STORAGE_TOKEN_PREFETCH", "false")
+    os.environ.setdefault("UPLOAD_ADMISSION_ENABLED", "false")
+    os.environ.setdefault("MEDIA_PROBE_ENABLED", "false")
+    import app
+    return app
+
+
+@pytest.fixture
+def storage_latency():
+    """Seconds each fake storage call takes; override in a module to slow storage down"""
+    return 0.0
+
+
+@pytest.fixture
+def storage(video_app, storage_latency):
+    """The app's (primary) container, fresh for every test"""
+    service = FakeBlobServiceClient(StorageProfile(latency=storage_latency))
+    video_app.storage_clients.use(service)
+    yield service.get_container_client(video_app.CONTAINER_NAME)
+    video_app.storage_shards.primary.provisioned = False
+
+
+@pytest.fixture
+def client(video_app, storage):
+    return video_app.app.test_client()
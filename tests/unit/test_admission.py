@@ -0,0 +1,125 @@
+"""
+Unit tests for upload admission control.
+
+Tests the instance-wide limits and the per-client fair share:
+1. Global upload and byte limits
+2. Fair share of slots and bytes among uploading clients
+3. Leases of dead workers and expired leases being reclaimed
+"""
+
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+
+import pytest
+
+from services.admission import UploadAdmission
+
+
+@pytest.fixture
+def admission(tmp_path):
+    return UploadAdmission(str(tmp_path / "admission.db"), max_uploads=4, max_bytes=100, max_per_client=3)
+
+
+def dead_pid():
+    """Pid of a process that has exited"""
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def insert_lease(admission, client, size, pid, started=None):
+    with sqlite3.connect(admission.path) as conn:
+        conn.execute(
+            "INSERT INTO leases (id, client, bytes, pid, started) VALUES (?, ?, ?, ?, ?)",
+            (f"{client}-{pid}-{size}", client, size, pid, started or time.time())
+        )
+
+
+class TestGlobalLimits:
+    """Test the instance-wide limits."""
+
+    def test_upload_slots(self, admission):
+        """Verify new clients are turned away once every slot is taken."""
+        leases = [("a", 1), ("b", 1), ("c", 1), ("d", 1)]
+        assert admission._check(leases, "e", 1) == "uploads"
+
+    def test_bytes(self, admission):
+        """Verify in-flight bytes are capped, but a lone upload larger than the cap is admitted."""
+        assert admission._check([("a", 60)], "b", 50) == "bytes"
+        assert admission._check([("a", 60)], "b", 40) is None
+        assert admission._check([], "a", 500) is None
+
+
+class TestFairShare:
+    """Test the per-client share among uploading clients."""
+
+    def test_first_upload_always_admitted(self, admission):
+        """Verify a client without uploads is admitted while the global limits allow it."""
+        assert admission._check([("a", 10), ("a", 10), ("a", 10)], "b", 30) is None
+
+    def test_slot_share(self, admission):
+        """Verify slots are split equally among clients (floor of max_uploads / clients)."""
+        assert admission._check([("a", 1), ("a", 1), ("b", 1)], "a", 1) == "client"
+        assert admission._check([("a", 1), ("b", 1)], "a", 1) is None
+
+    def test_max_per_client(self, admission):
+        """Verify a lone client never holds more than max_per_client uploads."""
+        assert admission._check([("a", 1), ("a", 1)], "a", 1) is None
+        assert admission._check([("a", 1), ("a", 1), ("a", 1)], "a", 1) == "client"
+
+    def test_byte_share(self, admission):
+        """Verify a client's in-flight bytes stay within max_bytes / clients."""
+        assert admission._check([("a", 40), ("b", 10)], "a", 20) == "client"
+        assert admission._check([("a", 40), ("b", 10)], "a", 10) is None
+
+    def test_share_shrinks_as_clients_arrive(self, admission):
+        """Verify uploads admitted alone count against the share once another client joins."""
+        assert admission.acquire("a", 10).lease_id
+        assert admission.acquire("a", 10).lease_id
+        assert admission.acquire("b", 10).lease_id
+        assert admission.acquire("a", 10).reason == "client"
+        assert admission.acquire("b", 10).lease_id
+
+
+class TestLeases:
+    """Test lease bookkeeping shared by the workers."""
+
+    def test_release_frees_a_slot(self, admission):
+        """Verify releasing a lease admits the next upload."""
+        leases = [admission.acquire(client, 1).lease_id for client in "abcd"]
+        assert admission.acquire("e", 1).reason == "uploads"
+
+        admission.release(leases[0])
+
+        assert admission.acquire("e", 1).lease_id
+        assert admission.stats()["uploads"] == 4
+
+    def test_dead_worker_leases_reclaimed(self, admission):
+        """Verify leases held by a worker that died are dropped on the next admission."""
+        pid = dead_pid()
+        for client in "abcd":
+            insert_lease(admission, client, 1, pid)
+
+        result = admission.acquire("e", 1)
+
+        assert result.lease_id and result.reason is None
+        assert admission.stats()["uploads"] == 1
+
+    def test_expired_leases_reclaimed(self, admission):
+        """Verify leases older than lease_ttl are dropped even when their worker is alive."""
+        for client in "abcd":
+            insert_lease(admission, client, 1, pid=1, started=time.time() - admission.lease_ttl - 1)
+        insert_lease(admission, "f", 1, pid=os.getpid())
+
+        assert admission.acquire("e", 1).lease_id
+        assert admission.stats() == {
+            "uploads": 2,
+            "bytes": 2,
+            "clients": 2,
+            "max_uploads": 4,
+            "max_bytes": 100,
+            "max_per_client": 3
+        }
@@ -0,0 +1,129 @@
+"""
+Unit tests for response compression and the static asset build.
+
+Tests the helpers behind compressed JSON responses and /assets:
+1. Encoding negotiation from Accept-Encoding
+2. compress_stream output decoding to the joined input
+3. The asset build: hashed names, compressed variants and the manifest
+4. AssetManifest dropping sources edited since the build
+"""
+
+import gzip
+import json
+
+import pytest
+from werkzeug.datastructures import Accept
+
+from services.assets import MANIFEST_NAME, AssetManifest, build_assets, hashed_name
+from services.compression import choose_encoding, compress, compress_stream
+
+SCRIPT = b"function init() { return 'ok'; }\n" * 50
+
+
+@pytest.fixture
+def static_dir(tmp_path):
+    static = tmp_path / "static"
+    (static / "js").mkdir(parents=True)
+    (static / "css").mkdir()
+    (static / "js" / "app.js").write_bytes(SCRIPT)
+    (static / "css" / "styles.css").write_bytes(b"body { margin: 0; }\n")
+    (static / "img.png").write_bytes(b"\x89PNG")
+    return static
+
+
+class TestCompression:
+    """Test encoding negotiation and compression."""
+
+    def test_choose_encoding(self):
+        """Verify the first available encoding the client accepts is chosen, and refused ones are skipped."""
+        assert choose_encoding(Accept([("gzip", 1), ("br", 1)]), ("br", "gzip")) == "br"
+        assert choose_encoding(Accept([("gzip", 1), ("br", 0)]), ("br", "gzip")) == "gzip"
+        assert choose_encoding(Accept([("deflate", 1)]), ("br", "gzip")) is None
+
+    def test_stream_round_trip(self):
+        """Verify str and bytes chunks compress to a gzip stream of the joined input."""
+        chunks = ['{"videos": [', b'{"id": "a"}', ", " * 1000, "]}"]
+        output = list(compress_stream(iter(chunks), "gzip"))
+
+        expected = b"".join(chunk.encode() if isinstance(chunk, str) else chunk for chunk in chunks)
+        assert gzip.decompress(b"".join(output)) == expected
+
+    def test_stream_is_incremental(self):
+        """Verify output is yielded before the input is exhausted once the compressor has some."""
+        consumed = []
+
+        def chunks():
+            for number in range(200):
+                consumed.append(number)
+                yield bytes(range(256)) * 64 + str(number).encode()
+
+        stream = compress_stream(chunks(), "gzip")
+        next(stream)
+        assert len(consumed) < 200
+
+    def test_compress_is_reproducible(self):
+        """Verify gzip output does not depend on the time (built assets are content-hashed)."""
+        assert compress(SCRIPT, "gzip") == compress(SCRIPT, "gzip")
+        assert gzip.decompress(compress(SCRIPT, "gzip", level=9)) == SCRIPT
+
+
+class TestBuild:
+    """Test building assets into dist."""
+
+    def test_hashed_name(self):
+        """Verify the content hash is inserted before the extension."""
+        assert hashed_name("css/styles.css", b"x").startswith("css/styles.")
+        assert hashed_name("css/styles.css", b"x").endswith(".css")
+        assert hashed_name("css/styles.css", b"x") != hashed_name("css/styles.css", b"y")
+
+    def test_build(self, static_dir):
+        """Verify text assets get hashed copies with gzip variants and a manifest; other files are skipped."""
+        dist = static_dir / "dist"
+
+        manifest = build_assets(str(static_dir), str(dist))
+
+        assert set(manifest["assets"]) == {"js/app.js", "css/styles.css"}
+        built = dist / manifest["assets"]["js/app.js"]
+        assert built.read_bytes() == SCRIPT
+        assert gzip.decompress((dist / (manifest["assets"]["js/app.js"] + ".gz")).read_bytes()) == SCRIPT
+        assert json.loads((dist / MANIFEST_NAME).read_text()) == manifest
+
+    def test_rebuild_replaces_old_output(self, static_dir):
+        """Verify a rebuild never picks up its previous output and drops stale copies."""
+        dist = static_dir / "dist"
+        first = build_assets(str(static_dir), str(dist))
+        (static_dir / "js" / "app.js").write_bytes(SCRIPT + b"// changed\n")
+
+        second = build_assets(str(static_dir), str(dist))
+
+        assert set(second["assets"]) == {"js/app.js", "css/styles.css"}
+        assert not (dist / first["assets"]["js/app.js"]).exists()
+
+
+class TestAssetManifest:
+    """Test looking up built assets."""
+
+    def test_lookup(self, static_dir):
+        """Verify built names are returned for sources and recognised as built."""
+        manifest = build_assets(str(static_dir), str(static_dir / "dist"))
+        assets = AssetManifest(str(static_dir), str(static_dir / "dist"))
+
+        assert assets.get("js/app.js") == manifest["assets"]["js/app.js"]
+        assert assets.is_built(manifest["assets"]["js/app.js"])
+        assert not assets.is_built("js/app.js")
+        assert "gzip" in assets.encodings
+
+    def test_edited_source_is_stale(self, static_dir):
+        """Verify a source edited after the build falls back to /static, while the others stay built."""
+        build_assets(str(static_dir), str(static_dir / "dist"))
+        (static_dir / "js" / "app.js").write_bytes(SCRIPT + b"// edited\n")
+
+        assets = AssetManifest(str(static_dir), str(static_dir / "dist"))
+
+        assert assets.get("js/app.js") is None
+        assert assets.get("css/styles.css")
+
+    def test_not_built(self, static_dir):
+        """Verify a missing manifest leaves every asset on /static."""
+        assets = AssetManifest(str(static_dir), str(static_dir / "dist"))
+        assert assets.get("js/app.js") is None and assets.encodings == ()
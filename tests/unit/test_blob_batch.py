@@ -0,0 +1,150 @@
+"""
+Unit tests for bulk blob operations.
+
+Tests the helpers behind /api/videos/delete, /tier and /metadata:
+1. run_batches splitting names into batches and mapping each response to its blob
+2. A failed batch reported for every blob in it
+3. Delete and tier requests sent with the right arguments
+4. Metadata merges retried when the blob changes underneath
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from azure.core.exceptions import ResourceModifiedError
+
+from benchmarks.fake_storage import FakeBlobServiceClient
+from services.blob_batch import (
+    BATCH_LIMIT, delete_blobs, merge_blob_metadata, run_batches, set_blob_tiers, set_blobs_metadata
+)
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        yield executor
+
+
+def response(status_code, reason="OK"):
+    return SimpleNamespace(status_code=status_code, reason=reason)
+
+
+class TestRunBatches:
+    """Test batching and result mapping."""
+
+    def test_results_follow_each_chunk(self, executor):
+        """Verify every blob gets the result of its own subrequest across several batches."""
+        names = [f"{number:04d}.mp4" for number in range(BATCH_LIMIT * 2 + 10)]
+        sent = []
+
+        def send(chunk):
+            sent.append(len(chunk))
+            return [response(202) if int(name[:4]) % 2 == 0 else response(404, "Not Found") for name in chunk]
+
+        results = run_batches(send, names, executor, {202: "deleted"})
+
+        assert sorted(sent) == [10, BATCH_LIMIT, BATCH_LIMIT]
+        assert results["0000.mp4"] == {"status": "deleted"}
+        assert results["0521.mp4"] == {"status": "not_found"}
+        assert len(results) == len(names)
+
+    def test_unexpected_status(self, executor):
+        """Verify a subrequest that is neither a success nor a 404 reports its status and reason."""
+        results = run_batches(lambda chunk: [response(409, "Conflict")], ["a.mp4"], executor, {202: "deleted"})
+        assert results == {"a.mp4": {"status": "failed", "error": "409 Conflict"}}
+
+    def test_failed_batch(self, executor):
+        """Verify a batch that raises fails every blob in it and leaves the other batches alone."""
+        names = [f"{number:04d}.mp4" for number in range(BATCH_LIMIT + 1)]
+
+        def send(chunk):
+            if len(chunk) == BATCH_LIMIT:
+                raise ConnectionError("throttled")
+            return [response(200)]
+
+        results = run_batches(send, names, executor, {200: "updated"})
+
+        assert results["0000.mp4"] == {"status": "failed", "error": "throttled"}
+        assert results[names[-1]] == {"status": "updated"}
+
+    def test_responses_from_a_generator(self, executor):
+        """Verify lazily produced responses (as the SDK returns them) are mapped too."""
+        results = run_batches(lambda chunk: (response(202) for _ in chunk), ["a", "b"], executor, {202: "deleted"})
+        assert results == {"a": {"status": "deleted"}, "b": {"status": "deleted"}}
+
+
+class TestBatchRequests:
+    """Test the arguments of the batch calls."""
+
+    def test_delete_includes_snapshots(self, executor):
+        """Verify deletes remove snapshots and never raise for one failed blob."""
+        calls = []
+
+        def delete(*blob_names, **kwargs):
+            calls.append((blob_names, kwargs))
+            return [response(202) for _ in blob_names]
+
+        results = delete_blobs(SimpleNamespace(delete_blobs=delete), ["a.mp4", "b.mp4"], executor)
+
+        assert calls == [(("a.mp4", "b.mp4"), {"delete_snapshots": "include", "raise_on_any_failure": False})]
+        assert results == {"a.mp4": {"status": "deleted"}, "b.mp4": {"status": "deleted"}}
+
+    def test_tier_accepts_200_and_202(self, executor):
+        """Verify a tier change counts as updated whether it applied at once (200) or is pending (202)."""
+        calls = []
+
+        def set_tier(tier, *blob_names, **kwargs):
+            calls.append((tier, blob_names, kwargs))
+            return [response(200), response(202)]
+
+        results = set_blob_tiers(SimpleNamespace(set_standard_blob_tier_blobs=set_tier), "Cool", ["a", "b"], executor)
+
+        assert calls == [("Cool", ("a", "b"), {"raise_on_any_failure": False})]
+        assert results == {"a": {"status": "updated"}, "b": {"status": "updated"}}
+
+
+class ConflictingBlobClient:
+    """Blob client whose metadata changes underneath the first conditional writes"""
+
+    def __init__(self, conflicts):
+        self.conflicts = conflicts
+        self.metadata = {"keep": "1", "drop": "x"}
+        self.writes = 0
+
+    def get_blob_properties(self):
+        return SimpleNamespace(metadata=dict(self.metadata), etag=f'"{self.writes}"')
+
+    def set_blob_metadata(self, metadata, etag=None, match_condition=None):
+        self.writes += 1
+        if self.writes <= self.conflicts:
+            raise ResourceModifiedError("ConditionNotMet")
+        self.metadata = metadata
+
+
+class TestMetadata:
+    """Test metadata merges."""
+
+    def test_retries_a_conflict(self):
+        """Verify a conditional write that lost a race is retried with fresh metadata."""
+        blob_client = ConflictingBlobClient(conflicts=2)
+
+        merge_blob_metadata(blob_client, {"drop": None, "tag": "new"})
+
+        assert blob_client.metadata == {"keep": "1", "tag": "new"}
+
+    def test_gives_up_after_the_last_attempt(self):
+        """Verify the conflict is raised once every attempt lost."""
+        with pytest.raises(ResourceModifiedError):
+            merge_blob_metadata(ConflictingBlobClient(conflicts=3), {"tag": "new"})
+
+    def test_reports_every_blob(self, executor):
+        """Verify each blob reports updated or not_found."""
+        container = FakeBlobServiceClient().get_container_client("videos")
+        with container.lock:
+            container.put("a.mp4", 10, metadata={"keep": "1"})
+
+        results = set_blobs_metadata(container, {"tag": "new"}, ["a.mp4", "gone.mp4"], executor)
+
+        assert results == {"a.mp4": {"status": "updated"}, "gone.mp4": {"status": "not_found"}}
+        assert container.blobs["a.mp4"]["metadata"] == {"keep": "1", "tag": "new"}
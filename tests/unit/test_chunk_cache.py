@@ -0,0 +1,164 @@
+"""
+Unit tests for the video chunk cache.
+
+Tests the read-through cache behind range requests:
+1. Memory hits, disk hits and ETag-keyed entries
+2. Concurrent misses for one chunk sharing a single download
+3. Memory and disk eviction of the least recently used chunks
+4. Cached blob properties expiring after their TTL
+"""
+
+import os
+import threading
+import time
+
+import pytest
+
+from services.chunk_cache import ChunkCache
+
+
+def loader(data, calls):
+    def load():
+        calls.append(data)
+        return data
+    return load
+
+
+class TestFetch:
+    """Test read-through fetches."""
+
+    def test_memory_hit(self):
+        """Verify a chunk is downloaded once and then served from memory."""
+        cache, calls = ChunkCache(10, 100), []
+
+        assert cache.fetch("a.mp4", "e1", 0, loader(b"x" * 10, calls)) == b"x" * 10
+        assert cache.fetch("a.mp4", "e1", 0, loader(b"y" * 10, calls)) == b"x" * 10
+
+        assert calls == [b"x" * 10]
+        assert cache.stats()["memory_hits"] == 1 and cache.stats()["misses"] == 1
+
+    def test_new_etag_downloads_again(self):
+        """Verify an overwritten blob (new ETag) never gets the old chunk."""
+        cache, calls = ChunkCache(10, 100), []
+        cache.fetch("a.mp4", "e1", 0, loader(b"old", calls))
+
+        assert cache.fetch("a.mp4", "e2", 0, loader(b"new", calls)) == b"new"
+
+    def test_disk_hit_is_an_open_file(self, tmp_path):
+        """Verify a chunk evicted from memory is served from disk as an open file."""
+        cache, calls = ChunkCache(10, 10, disk_dir=str(tmp_path), disk_bytes=1000), []
+        cache.fetch("a.mp4", "e1", 0, loader(b"a" * 10, calls))
+        cache.fetch("a.mp4", "e1", 1, loader(b"b" * 10, calls))
+
+        chunk = cache.fetch("a.mp4", "e1", 0, loader(b"z" * 10, calls))
+
+        with chunk:
+            assert chunk.read() == b"a" * 10
+        assert len(calls) == 2 and cache.stats()["disk_hits"] == 1
+
+    def test_disk_is_shared(self, tmp_path):
+        """Verify another cache (worker) on the same directory reads chunks the first one stored."""
+        ChunkCache(10, 100, disk_dir=str(tmp_path), disk_bytes=1000).fetch("a.mp4", "e1", 0, lambda: b"a" * 10)
+        other, calls = ChunkCache(10, 100, disk_dir=str(tmp_path), disk_bytes=1000), []
+
+        with other.fetch("a.mp4", "e1", 0, loader(b"z" * 10, calls)) as chunk:
+            assert chunk.read() == b"a" * 10
+        assert calls == []
+
+    def test_failed_download_is_retried(self):
+        """Verify a load that raises caches nothing and lets the next caller download."""
+        cache = ChunkCache(10, 100)
+
+        def fail():
+            raise OSError("storage unavailable")
+
+        with pytest.raises(OSError):
+            cache.fetch("a.mp4", "e1", 0, fail)
+
+        assert cache.fetch("a.mp4", "e1", 0, lambda: b"ok") == b"ok"
+
+    def test_chunk_range(self):
+        """Verify the last chunk of a blob is cut to the blob's size."""
+        cache = ChunkCache(10, 100)
+        assert cache.chunk_range(0, 25) == (0, 10)
+        assert cache.chunk_range(2, 25) == (20, 5)
+
+
+class TestInFlight:
+    """Test concurrent misses for the same chunk."""
+
+    def test_one_download_per_chunk(self):
+        """Verify threads missing the same chunk at once wait for a single download."""
+        cache, calls = ChunkCache(10, 100), []
+        started = threading.Event()
+
+        def slow_load():
+            calls.append(1)
+            started.set()
+            time.sleep(0.1)
+            return b"x" * 10
+
+        results = []
+        first = threading.Thread(target=lambda: results.append(cache.fetch("a.mp4", "e1", 0, slow_load)))
+        first.start()
+        started.wait()
+        others = [
+            threading.Thread(target=lambda: results.append(cache.fetch("a.mp4", "e1", 0, slow_load)))
+            for _ in range(4)
+        ]
+        for thread in others:
+            thread.start()
+        for thread in [first, *others]:
+            thread.join()
+
+        assert calls == [1]
+        assert results == [b"x" * 10] * 5
+
+
+class TestEviction:
+    """Test the memory and disk budgets."""
+
+    def test_memory_lru(self):
+        """Verify the least recently used chunk is dropped from memory first."""
+        cache, calls = ChunkCache(10, 20), []
+        cache.fetch("a.mp4", "e1", 0, loader(b"0" * 10, calls))
+        cache.fetch("a.mp4", "e1", 1, loader(b"1" * 10, calls))
+        cache.fetch("a.mp4", "e1", 0, loader(b"0" * 10, calls))
+        cache.fetch("a.mp4", "e1", 2, loader(b"2" * 10, calls))
+
+        cache.fetch("a.mp4", "e1", 0, loader(b"0" * 10, calls))
+        cache.fetch("a.mp4", "e1", 1, loader(b"1" * 10, calls))
+
+        assert calls == [b"0" * 10, b"1" * 10, b"2" * 10, b"1" * 10]
+        assert cache.stats()["memory_bytes"] == 20
+
+    def test_disk_lru(self, tmp_path):
+        """Verify the disk tier drops the least recently used chunks to 90% of its budget."""
+        cache = ChunkCache(10, 0, disk_dir=str(tmp_path), disk_bytes=30)
+        for index in range(3):
+            cache.fetch("a.mp4", "e1", index, lambda: b"x" * 10)
+            path = cache._path(("a.mp4", "e1", index))
+            os.utime(path, (1000 + index, 1000 + index))
+
+        cache.fetch("a.mp4", "e1", 3, lambda: b"x" * 10)
+
+        remaining = {index for index in range(4) if os.path.exists(cache._path(("a.mp4", "e1", index)))}
+        assert remaining == {2, 3}
+        assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+class TestBlobInfo:
+    """Test cached blob properties."""
+
+    def test_expires(self):
+        """Verify properties are returned until their TTL passes, and can be forgotten early."""
+        cache = ChunkCache(10, 100, info_ttl=60)
+        cache.put_info("a.mp4", 25, "e1", "video/mp4")
+        assert cache.get_info("a.mp4").etag == "e1"
+
+        cache.forget_info("a.mp4")
+        assert cache.get_info("a.mp4") is None
+
+        cache.info_ttl = -1
+        cache.put_info("a.mp4", 25, "e1", "video/mp4")
+        assert cache.get_info("a.mp4") is None
@@ -0,0 +1,100 @@
+"""
+Unit tests for video content sniffing.
+
+Tests format detection from the first bytes of a file:
+1. MP4 and QuickTime boxes
+2. Matroska and WebM EBML headers
+3. AVI RIFF headers
+4. Extension checks and unrecognised content
+"""
+
+import pytest
+
+from services.content_sniffer import detect_video_type, matches_extension, read_vint
+
+
+def ebml_header(doctype):
+    """EBML header element with a DocType of one-byte size"""
+    body = b"\x42\x86\x81\x01" + b"\x42\x82" + bytes([0x80 | len(doctype)]) + doctype
+    return b"\x1a\x45\xdf\xa3" + bytes([0x80 | len(body)]) + body
+
+
+class TestDetectVideoType:
+    """Test container format detection."""
+
+    @pytest.mark.parametrize("head, expected", [
+        (b"\x00\x00\x00\x18ftypmp42\x00\x00\x00\x00", "video/mp4"),
+        (b"\x00\x00\x00\x20ftypisom\x00\x00\x02\x00", "video/mp4"),
+        (b"\x00\x00\x00\x14ftypqt  \x00\x00\x00\x00", "video/quicktime"),
+        (b"\x00\x00\x00\x08wide\x00\x00\x00\x00", "video/quicktime"),
+        (b"\x00\x01\x00\x00moov", "video/quicktime"),
+    ])
+    def test_iso_media(self, head, expected):
+        """Verify ftyp brands and bare QuickTime atoms are recognised."""
+        assert detect_video_type(head) == expected
+
+    def test_webm(self):
+        """Verify an EBML header with the webm DocType is WebM."""
+        assert detect_video_type(ebml_header(b"webm")) == "video/webm"
+
+    def test_matroska(self):
+        """Verify an EBML header with the matroska DocType is Matroska."""
+        assert detect_video_type(ebml_header(b"matroska")) == "video/x-matroska"
+
+    def test_ebml_with_other_doctype(self):
+        """Verify EBML files that are not video (or whose header is cut short) are rejected."""
+        assert detect_video_type(ebml_header(b"other")) is None
+        assert detect_video_type(ebml_header(b"matroska")[:-3]) is None
+
+    def test_avi(self):
+        """Verify a RIFF header with the AVI form type is AVI, and other RIFF files are not."""
+        assert detect_video_type(b"RIFF\x10\x00\x00\x00AVI LIST") == "video/x-msvideo"
+        assert detect_video_type(b"RIFF\x10\x00\x00\x00WAVEfmt ") is None
+
+    @pytest.mark.parametrize("head", [
+        b"",
+        b"\x00\x00\x00",
+        b"<!DOCTYPE html><html>",
+        b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR",
+        b"0123456789abcdefghijklmnop",
+    ])
+    def test_unrecognised(self, head):
+        """Verify short, empty and non-video content is rejected."""
+        assert detect_video_type(head) is None
+
+
+class TestMatchesExtension:
+    """Test extension plausibility checks."""
+
+    def test_shared_container_formats(self):
+        """Verify MP4/MOV and MKV/WebM accept each other's extensions, in any case."""
+        assert matches_extension("video/mp4", "MOV")
+        assert matches_extension("video/quicktime", "mp4")
+        assert matches_extension("video/webm", "mkv")
+        assert matches_extension("video/x-matroska", "webm")
+
+    def test_mismatch(self):
+        """Verify an extension from another format, or an unknown type, is refused."""
+        assert not matches_extension("video/x-msvideo", "mp4")
+        assert not matches_extension("video/mp4", "avi")
+        assert not matches_extension(None, "mp4")
+
+
+class TestReadVint:
+    """Test EBML variable-length integers."""
+
+    @pytest.mark.parametrize("data, expected", [
+        (b"\x81", (1, 1)),
+        (b"\x40\x02", (2, 2)),
+        (b"\x20\x00\x03", (3, 3)),
+        (b"\x10\x00\x00\x04", (4, 4)),
+    ])
+    def test_lengths(self, data, expected):
+        """Verify the length marker selects how many bytes make up the value."""
+        assert read_vint(data, 0) == expected
+
+    def test_invalid(self):
+        """Verify a zero first byte or a truncated integer is not read."""
+        assert read_vint(b"\x00\x81", 0) == (None, 0)
+        assert read_vint(b"\x40", 0) == (None, 0)
+        assert read_vint(b"\x81", 1) == (None, 1)
@@ -0,0 +1,121 @@
+"""
+Unit tests for content-hash deduplication.
+
+Drives the app with a temporary metadata index and the in-process
+storage stand-in:
+1. Duplicate lookup, skipping index entries whose blob was deleted
+2. Recording an upload by hash alone (/api/upload/dedup)
+3. A second upload of the same content reusing the stored blob
+"""
+
+import hashlib
+
+import pytest
+
+from services.video_index import VideoIndex
+
+MP4 = b"\x00\x00\x00\x18ftypisom\x00\x00\x02\x00isomiso2" + b"v" * 200
+CHECKSUM = hashlib.sha256(MP4).hexdigest()
+
+
+@pytest.fixture
+def index(video_app, storage, tmp_path, monkeypatch):
+    index = VideoIndex(str(tmp_path / "index.db"))
+    monkeypatch.setattr(video_app, "video_index", index)
+    monkeypatch.setattr(video_app, "dedup_enabled", True)
+    return index
+
+
+def stored(video_app, storage, name, checksum=CHECKSUM, size=len(MP4)):
+    """Put a blob in storage and index it with its checksum"""
+    with storage.lock:
+        storage.put(name, size)
+    video_app.storage_shards.remember(name, video_app.storage_shards.primary)
+    video_app.record_upload({
+        "blob_name": name, "filename": f"orig-{name}", "size": size, "content_type": "video/mp4",
+        "uploaded_at": "2024-01-01T00:00:00"
+    }, checksum)
+
+
+def upload(client, content, filename="clip.mp4"):
+    body = (
+        b"--B\r\nContent-Disposition: form-data; name=\"files[]\"; filename=\"" + filename.encode() + b"\"\r\n\r\n"
+        + content + b"\r\n--B--\r\n"
+    )
+    return client.post("/api/upload", data=body, content_type="multipart/form-data; boundary=B")
+
+
+class TestFindDuplicate:
+    """Test looking up stored content by hash."""
+
+    def test_finds_stored_content(self, video_app, storage, index):
+        """Verify a stored blob with the same checksum and size is found."""
+        stored(video_app, storage, "a.mp4")
+        assert video_app.find_duplicate(CHECKSUM, len(MP4))["blob_name"] == "a.mp4"
+        assert video_app.find_duplicate(CHECKSUM, len(MP4) + 1) is None
+
+    def test_skips_deleted_blobs(self, video_app, storage, index):
+        """Verify an index entry whose blob is gone (not yet reconciled) is not used."""
+        stored(video_app, storage, "a.mp4")
+        with storage.lock:
+            del storage.blobs["a.mp4"]
+
+        assert video_app.find_duplicate(CHECKSUM, len(MP4)) is None
+
+    def test_disabled(self, video_app, storage, index, monkeypatch):
+        """Verify nothing is looked up with deduplication off."""
+        stored(video_app, storage, "a.mp4")
+        monkeypatch.setattr(video_app, "dedup_enabled", False)
+        assert video_app.find_duplicate(CHECKSUM, len(MP4)) is None
+
+
+class TestUploadByHash:
+    """Test /api/upload/dedup."""
+
+    def request(self, client, checksum=CHECKSUM, size=len(MP4)):
+        return client.post("/api/upload/dedup", json={"filename": "copy.mp4", "size": size, "sha256": checksum})
+
+    def test_records_a_new_entry(self, video_app, client, storage, index):
+        """Verify known content is recorded as a new video pointing at the stored blob."""
+        stored(video_app, storage, "a.mp4")
+
+        response = self.request(client)
+
+        entry = response.json["files"][0]
+        assert response.status_code == 200
+        assert entry["deduplicated"] and entry["blob_name"] == "a.mp4" and entry["filename"] == "copy.mp4"
+        assert index.get(entry["id"])["blob_name"] == "a.mp4"
+        assert response.json["bytes_saved"] == len(MP4)
+
+    def test_unknown_content(self, client, index):
+        """Verify content that is not stored answers 404 so the client uploads the file."""
+        assert self.request(client).status_code == 404
+
+    def test_invalid_request(self, client, index):
+        """Verify a malformed checksum or size is refused."""
+        assert self.request(client, checksum="xyz").status_code == 400
+        assert self.request(client, size="10").status_code == 400
+
+    def test_disabled(self, client, monkeypatch, video_app):
+        """Verify the endpoint answers 503 with deduplication off."""
+        monkeypatch.setattr(video_app, "dedup_enabled", False)
+        assert self.request(client).status_code == 503
+
+
+class TestUploadDeduplication:
+    """Test uploads of content that is already stored."""
+
+    def test_second_upload_reuses_the_blob(self, client, storage, index):
+        """Verify uploading the same bytes again stores nothing new."""
+        first = upload(client, MP4).json["files"][0]
+        second = upload(client, MP4, filename="again.mp4").json
+
+        assert list(storage.blobs) == [first["blob_name"]]
+        assert second["files"][0]["blob_name"] == first["blob_name"]
+        assert second["duplicates"] == 1 and second["bytes_saved"] == len(MP4)
+
+    def test_different_content_is_stored(self, client, storage, index):
+        """Verify different bytes of the same size are uploaded as a new blob."""
+        upload(client, MP4)
+        upload(client, MP4[:-1] + b"w")
+        assert len(storage.blobs) == 2
@@ -0,0 +1,137 @@
+"""
+Unit tests for the video listing cache.
+
+Tests in-process and shared-directory caching of listing pages:
+1. TTL expiry and LRU eviction
+2. Invalidation, also across workers sharing a directory
+3. Pruning of stale page files in the shared directory
+"""
+
+import os
+import time
+
+import pytest
+
+from services.listing_cache import ListingCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.time() for the cache module"""
+    now = [1000000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    return now
+
+
+def page_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(".json"))
+
+
+class TestInProcess:
+    """Test the per-worker cache."""
+
+    def test_hit_until_ttl(self, clock):
+        """Verify a page is served until its TTL passes."""
+        cache = ListingCache(ttl=5, max_entries=10)
+        entry = cache.put("page", '{"videos": []}')
+
+        assert cache.get("page") == entry
+        clock[0] += 5
+        assert cache.get("page") is None
+        assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    def test_lru_eviction(self):
+        """Verify the least recently used page is evicted beyond max_entries."""
+        cache = ListingCache(ttl=60, max_entries=2)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        cache.get("a")
+        cache.put("c", "3")
+
+        assert cache.get("b") is None
+        assert cache.get("a") and cache.get("c")
+
+    def test_invalidate(self):
+        """Verify invalidation drops every page."""
+        cache = ListingCache(ttl=60, max_entries=10)
+        cache.put("a", "1")
+        cache.invalidate()
+
+        assert cache.get("a") is None
+        assert cache.stats()["invalidations"] == 1
+
+    def test_etag_follows_the_body(self):
+        """Verify identical bodies share an ETag and different ones do not."""
+        cache = ListingCache(ttl=60, max_entries=10)
+        assert cache.put("a", "1").etag == cache.put("b", "1").etag
+        assert cache.put("a", "1").etag != cache.put("a", "2").etag
+
+
+class TestShared:
+    """Test pages and invalidations shared through a directory."""
+
+    def test_pages_shared_between_workers(self, tmp_path):
+        """Verify a page cached by one worker is served by another."""
+        first = ListingCache(ttl=60, max_entries=10, shared_dir=str(tmp_path))
+        second = ListingCache(ttl=60, max_entries=10, shared_dir=str(tmp_path))
+
+        entry = first.put("page", "body")
+
+        assert second.get("page").etag == entry.etag
+
+    def test_invalidation_seen_by_every_worker(self, tmp_path):
+        """Verify invalidating in one worker drops the page in the others, in memory as well."""
+        first = ListingCache(ttl=60, max_entries=10, shared_dir=str(tmp_path))
+        second = ListingCache(ttl=60, max_entries=10, shared_dir=str(tmp_path))
+        first.put("page", "body")
+        assert second.get("page")
+
+        first.invalidate()
+
+        assert second.get("page") is None
+
+
+class TestSharedPruning:
+    """Test that the shared directory does not grow without bound."""
+
+    def test_invalidate_removes_old_generation(self, tmp_path):
+        """Verify pages written before an invalidation are deleted by it."""
+        cache = ListingCache(ttl=60, max_entries=10, shared_dir=str(tmp_path))
+        for key in range(3):
+            cache.put(key, "body")
+        assert len(page_files(tmp_path)) == 3
+
+        cache.invalidate()
+
+        assert page_files(tmp_path) == []
+        assert os.path.exists(tmp_path / "generation")
+
+    def test_expired_pages_removed_on_put(self, tmp_path):
+        """Verify a put after the TTL deletes pages that have expired."""
+        cache = ListingCache(ttl=60, max_entries=10, shared_dir=str(tmp_path))
+        cache.put("old", "body")
+        old_path = tmp_path / page_files(tmp_path)[0]
+        stale = time.time() - 120
+        os.utime(old_path, (stale, stale))
+        cache._pruned = 0.0
+
+        cache.put("new", "body")
+
+        assert not old_path.exists()
+        assert len(page_files(tmp_path)) == 1
+
+    def test_capped_at_max_entries(self, tmp_path):
+        """Verify only the max_entries most recent pages are kept."""
+        cache = ListingCache(ttl=60, max_entries=3, shared_dir=str(tmp_path))
+        now = time.time()
+        os.utime(tmp_path / "generation", (now - 30, now - 30))
+        for key in range(6):
+            cache.put(key, "body")
+            os.utime(cache._shared_path(key), (now - 10 + key, now - 10 + key))
+        cache._pruned = 0.0
+
+        cache.put("last", "body")
+
+        assert len(page_files(tmp_path)) == 3
+        assert os.path.exists(cache._shared_path("last"))
+        assert os.path.exists(cache._shared_path(5))
@@ -0,0 +1,194 @@
+"""
+Unit tests for video metadata probing.
+
+Builds small MP4 and Matroska files in memory and checks:
+1. MP4 with the moov atom before and after the media data
+2. Matroska with Info/Tracks ahead of the clusters or found through the SeekHead
+3. Which byte ranges are read (never the media data itself)
+4. Malformed and unsupported files
+"""
+
+import struct
+
+from services.media_probe import PROBE_HEAD_SIZE, media_from_metadata, media_metadata, probe_media
+
+MEDIA_DATA_SIZE = 4 * PROBE_HEAD_SIZE
+
+
+class RangeReader:
+    """read(offset, length) over an in-memory file, recording every range requested"""
+
+    def __init__(self, data):
+        self.data = data
+        self.reads = []
+
+    def __call__(self, offset, length):
+        self.reads.append((offset, length))
+        return self.data[offset:offset + length]
+
+    @property
+    def bytes_read(self):
+        return sum(length for _, length in self.reads)
+
+
+# ===== MP4 =====
+
+def box(box_type, payload=b"", large=False):
+    if large:
+        return struct.pack(">I4sQ", 1, box_type, 16 + len(payload)) + payload
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def mp4_track(handler, codec, width=0, height=0):
+    tkhd = bytes(76) + struct.pack(">II", width << 16, height << 16)
+    hdlr = bytes(8) + handler + bytes(12)
+    stsd = bytes(8) + struct.pack(">I4s", 16, codec) + bytes(8)
+    return box(b"trak", box(b"tkhd", tkhd) + box(b"mdia", box(b"hdlr", hdlr) + box(
+        b"minf", box(b"stbl", box(b"stsd", stsd))
+    )))
+
+
+def mp4_moov(timescale=1000, duration=9500):
+    mvhd = bytes(12) + struct.pack(">II", timescale, duration) + bytes(80)
+    return box(b"moov", box(b"mvhd", mvhd) + mp4_track(b"vide", b"avc1", 640, 360) + mp4_track(b"soun", b"mp4a"))
+
+
+def mp4_file(moov_at_end=False, large_mdat=False):
+    ftyp = box(b"ftyp", b"isom\x00\x00\x02\x00isomiso2")
+    mdat = box(b"mdat", bytes(MEDIA_DATA_SIZE), large=large_mdat)
+    return ftyp + mdat + mp4_moov() if moov_at_end else ftyp + mp4_moov() + mdat
+
+
+# ===== Matroska =====
+
+def element(element_id, payload):
+    # Eight-byte sizes keep element lengths independent of their contents
+    return element_id + b"\x01" + len(payload).to_bytes(7, "big") + payload
+
+
+def seek_entry(element_id, position):
+    return element(b"\x4d\xbb", element(b"\x53\xab", element_id) + element(b"\x53\xac", position.to_bytes(8, "big")))
+
+
+INFO_ID = b"\x15\x49\xa9\x66"
+TRACKS_ID = b"\x16\x54\xae\x6b"
+
+
+def matroska_parts():
+    info = element(INFO_ID, element(b"\x2a\xd7\xb1", (1000000).to_bytes(3, "big")) + element(
+        b"\x44\x89", struct.pack(">d", 9500.0)
+    ))
+    video = element(b"\xe0", element(b"\xb0", (640).to_bytes(2, "big")) + element(b"\xba", (360).to_bytes(2, "big")))
+    tracks = element(TRACKS_ID, element(
+        b"\xae", element(b"\x83", b"\x01") + element(b"\x86", b"V_VP9") + video
+    ) + element(b"\xae", element(b"\x83", b"\x02") + element(b"\x86", b"A_OPUS")))
+    cluster = element(b"\x1f\x43\xb6\x75", bytes(MEDIA_DATA_SIZE))
+    return info, tracks, cluster
+
+
+def matroska_file(headers_at_end=False, seek_head=True):
+    header = element(b"\x1a\x45\xdf\xa3", element(b"\x42\x82", b"webm"))
+    info, tracks, cluster = matroska_parts()
+    if not headers_at_end:
+        return header + element(b"\x18\x53\x80\x67", info + tracks + cluster)
+
+    # SeekHead positions are relative to the start of the Segment's data
+    seek_head_size = len(element(b"\x11\x4d\x9b\x74", seek_entry(INFO_ID, 0) + seek_entry(TRACKS_ID, 0)))
+    info_position = seek_head_size + len(cluster)
+    seek = element(b"\x11\x4d\x9b\x74", seek_entry(INFO_ID, info_position) + seek_entry(
+        TRACKS_ID, info_position + len(info)
+    ))
+    return header + element(b"\x18\x53\x80\x67", (seek if seek_head else b"") + cluster + info + tracks)
+
+
+class TestProbeMp4:
+    """Test MP4/MOV probing."""
+
+    def assert_media(self, media, size):
+        assert media == {
+            "duration": 9.5,
+            "width": 640,
+            "height": 360,
+            "video_codec": "h264",
+            "audio_codec": "aac",
+            "bitrate": int(size * 8 / 9.5)
+        }
+
+    def test_moov_at_start(self):
+        """Verify a fast-start file is probed from the first read alone."""
+        data = mp4_file()
+        reader = RangeReader(data)
+
+        self.assert_media(probe_media(reader, len(data), "video/mp4"), len(data))
+        assert reader.reads == [(0, PROBE_HEAD_SIZE)]
+
+    def test_moov_at_end(self):
+        """Verify a moov after the media data is found by skipping mdat, not reading it."""
+        data = mp4_file(moov_at_end=True)
+        reader = RangeReader(data)
+
+        self.assert_media(probe_media(reader, len(data), "video/quicktime"), len(data))
+        assert len(reader.reads) == 2
+        assert reader.bytes_read < 2 * PROBE_HEAD_SIZE
+
+    def test_large_mdat_header(self):
+        """Verify a 64-bit mdat size is followed to the moov behind it."""
+        data = mp4_file(moov_at_end=True, large_mdat=True)
+        self.assert_media(probe_media(RangeReader(data), len(data), "video/mp4"), len(data))
+
+    def test_missing_moov(self):
+        """Verify a file without a moov (e.g. cut off during upload) has no media details."""
+        data = mp4_file(moov_at_end=True)[:-len(mp4_moov())]
+        assert probe_media(RangeReader(data), len(data), "video/mp4") is None
+
+
+class TestProbeMatroska:
+    """Test Matroska/WebM probing."""
+
+    expected = {"width": 640, "height": 360, "video_codec": "vp9", "audio_codec": "opus", "duration": 9.5}
+
+    def test_headers_before_clusters(self):
+        """Verify Info and Tracks ahead of the first Cluster come with the first read."""
+        data = matroska_file()
+        reader = RangeReader(data)
+
+        media = probe_media(reader, len(data), "video/webm")
+
+        assert {key: media[key] for key in self.expected} == self.expected
+        assert reader.reads == [(0, PROBE_HEAD_SIZE)]
+
+    def test_seek_head(self):
+        """Verify Info and Tracks after the clusters are fetched at their SeekHead positions."""
+        data = matroska_file(headers_at_end=True)
+        reader = RangeReader(data)
+
+        media = probe_media(reader, len(data), "video/x-matroska")
+
+        assert {key: media[key] for key in self.expected} == self.expected
+        assert reader.bytes_read < 2 * PROBE_HEAD_SIZE
+
+    def test_headers_at_end_without_seek_head(self):
+        """Verify headers behind the clusters are not searched for without a SeekHead."""
+        data = matroska_file(headers_at_end=True, seek_head=False)
+        reader = RangeReader(data)
+
+        assert probe_media(reader, len(data), "video/webm") is None
+        assert reader.reads == [(0, PROBE_HEAD_SIZE)]
+
+
+class TestProbeMedia:
+    """Test the format-independent parts of probing."""
+
+    def test_unsupported_or_empty(self):
+        """Verify AVI, empty and truncated files return None instead of raising."""
+        data = mp4_file()
+        assert probe_media(RangeReader(data), len(data), "video/x-msvideo") is None
+        assert probe_media(RangeReader(b""), 0, "video/mp4") is None
+        assert probe_media(RangeReader(data[:40]), 40, "video/mp4") is None
+        assert probe_media(RangeReader(b"\x1a\x45\xdf\xa3\x81"), 5, "video/webm") is None
+
+    def test_metadata_round_trip(self):
+        """Verify probe results survive being stored as blob metadata strings."""
+        media = {"duration": 9.5, "width": 640, "height": 360, "video_codec": "h264", "bitrate": 1000}
+        assert media_from_metadata(media_metadata(media)) == media
+        assert media_from_metadata({"original_filename": "a.mp4"}) is None
@@ -0,0 +1,104 @@
+"""
+Unit tests for request profiling.
+
+Tests the sampling profiler enabled by PROFILING_ENABLED:
+1. Profiled requests written as folded stacks and a JSON record
+2. Requests sampled once they run past the slow threshold, fast ones skipped
+3. Samples of helper threads added under their pool's root frame
+4. Pruning to the newest max_files captures
+"""
+
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from services.profiling import RequestProfiler, frame_label
+
+
+@pytest.fixture
+def directory(tmp_path):
+    return str(tmp_path / "profiles")
+
+
+def busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+class TestCapture:
+    """Test writing captures."""
+
+    def test_profiled_request(self, directory):
+        """Verify a request profiled on demand is written with its samples and details."""
+        profiler = RequestProfiler(directory, interval=0.002)
+
+        capture = profiler.begin("requested")
+        busy(0.1)
+        capture_id = profiler.end(capture, {"path": "/api/videos", "status": 200})
+
+        with open(os.path.join(directory, f"{capture_id}.json")) as record_file:
+            record = json.load(record_file)
+        assert record["reason"] == "requested" and record["path"] == "/api/videos" and record["samples"] > 0
+        with open(os.path.join(directory, record["profile"])) as folded_file:
+            lines = folded_file.read().splitlines()
+        assert any("busy (tests/unit/test_profiling.py" in line for line in lines)
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+    def test_fast_request_not_written(self, directory):
+        """Verify a request that was neither profiled nor slow leaves no files."""
+        profiler = RequestProfiler(directory, slow_seconds=5)
+
+        assert profiler.end(profiler.begin(), {}) is None
+        assert os.listdir(directory) == []
+
+    def test_slow_request(self, directory):
+        """Verify an unprofiled request is sampled once it passes the threshold and written as slow."""
+        profiler = RequestProfiler(directory, interval=0.002, slow_seconds=0.05)
+
+        capture = profiler.begin()
+        busy(0.3)
+        capture_id = profiler.end(capture, {})
+
+        with open(os.path.join(directory, f"{capture_id}.json")) as record_file:
+            record = json.load(record_file)
+        assert record["reason"] == "slow" and record["samples"] > 0
+        assert record["duration_seconds"] >= 0.3
+
+    def test_helper_threads(self, directory):
+        """Verify busy pool threads are sampled into the request under a [pool] root frame."""
+        profiler = RequestProfiler(directory, interval=0.002, thread_prefixes=("transfer",))
+        helper = threading.Thread(target=busy, args=(0.2,), name="transfer_0")
+        helper.start()
+
+        capture = profiler.begin("requested")
+        helper.join()
+        capture_id = profiler.end(capture, {})
+
+        with open(os.path.join(directory, f"{capture_id}.folded")) as folded_file:
+            assert any(line.startswith("[transfer];") for line in folded_file)
+
+    def test_frame_label(self):
+        """Verify app frames are labelled with their path relative to the app."""
+        assert frame_label(busy.__code__) == f"busy (tests/unit/test_profiling.py:{busy.__code__.co_firstlineno})"
+
+
+class TestPrune:
+    """Test the capture limit."""
+
+    def test_keeps_the_newest(self, directory):
+        """Verify only the newest max_files captures are kept, with their folded stacks."""
+        profiler = RequestProfiler(directory, max_files=2)
+        for old in ("20000101-000000000-1-aaaaaaaa", "20000101-000000001-1-bbbbbbbb"):
+            for extension in (".json", ".folded"):
+                with open(os.path.join(directory, old + extension), "w") as old_file:
+                    old_file.write("{}")
+
+        newest = profiler.end(profiler.begin("requested"), {})
+
+        assert sorted(os.listdir(directory)) == [
+            "20000101-000000001-1-bbbbbbbb.folded", "20000101-000000001-1-bbbbbbbb.json", f"{newest}.json"
+        ]
@@ -0,0 +1,102 @@
+"""
+Unit tests for direct-to-storage upload helpers.
+
+Tests the pieces behind /api/upload/sas and /api/upload/complete:
+1. Upload tickets: round trip, forgery, expiry and purpose
+2. The signing key shared by the workers of an instance
+3. The cached user delegation key
+"""
+
+import base64
+import json
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from services.sas import UploadTicketSigner, UserDelegationKeyCache, load_signing_key
+
+
+@pytest.fixture
+def signer():
+    return UploadTicketSigner(b"secret")
+
+
+class TestUploadTickets:
+    """Test signed upload tickets."""
+
+    def test_round_trip(self, signer):
+        """Verify a ticket returns the blob and filename it was issued for."""
+        claims = signer.verify(signer.issue("a.mp4", "holiday.mp4", time.time() + 60))
+        assert (claims["blob_name"], claims["filename"]) == ("a.mp4", "holiday.mp4")
+
+    def test_expired(self, signer):
+        """Verify a ticket is refused once its expiry has passed."""
+        assert signer.verify(signer.issue("a.mp4", "holiday.mp4", time.time() - 1)) is None
+
+    def test_tampered_claims(self, signer):
+        """Verify changing the claims without re-signing them invalidates the ticket."""
+        ticket = signer.issue("a.mp4", "holiday.mp4", time.time() + 60)
+        _, signature = ticket.split(".")
+        forged = base64.urlsafe_b64encode(json.dumps({
+            "blob_name": "b.mp4", "filename": "holiday.mp4", "expires_at": int(time.time()) + 60, "purpose": "direct"
+        }).encode()).decode()
+
+        assert signer.verify(f"{forged}.{signature}") is None
+
+    def test_other_key(self, signer):
+        """Verify tickets signed with another key are refused."""
+        ticket = UploadTicketSigner(b"other").issue("a.mp4", "holiday.mp4", time.time() + 60)
+        assert signer.verify(ticket) is None
+
+    @pytest.mark.parametrize("ticket", [None, "", "no-signature", "!!!.abc", 42])
+    def test_malformed(self, signer, ticket):
+        """Verify malformed tickets are refused without raising."""
+        assert signer.verify(ticket) is None
+
+    def test_purpose(self, signer):
+        """Verify a ticket is only accepted for the purpose it was issued for."""
+        ticket = signer.issue("a.mp4", "holiday.mp4", time.time() + 60, purpose="session")
+        assert signer.verify(ticket) is None
+        assert signer.verify(ticket, purpose="session")["blob_name"] == "a.mp4"
+
+
+class TestSigningKey:
+    """Test the key tickets are signed with."""
+
+    def test_configured_value(self, tmp_path):
+        """Verify a configured key is used as is and nothing is written."""
+        assert load_signing_key("configured", str(tmp_path / "key")) == b"configured"
+        assert not (tmp_path / "key").exists()
+
+    def test_shared_through_the_file(self, tmp_path):
+        """Verify every worker reads the random key the first one wrote, readable by the owner only."""
+        path = tmp_path / "key"
+        first = load_signing_key(None, str(path))
+
+        assert load_signing_key(None, str(path)) == first
+        assert len(first) == 64
+        assert path.stat().st_mode & 0o777 == 0o600
+
+
+class TestUserDelegationKeyCache:
+    """Test caching of the user delegation key."""
+
+    def service_client(self, calls):
+        def get_user_delegation_key(start, expiry):
+            calls.append(expiry)
+            return f"key-{len(calls)}"
+        return SimpleNamespace(account_name="account", get_user_delegation_key=get_user_delegation_key)
+
+    def test_reused_until_near_expiry(self):
+        """Verify one key is reused, and a new one fetched within the refresh margin."""
+        calls = []
+        client = self.service_client(calls)
+        cache = UserDelegationKeyCache(timedelta(hours=1))
+
+        assert cache.get(client)[0] == cache.get(client)[0] == "key-1"
+
+        cache.refresh_margin = timedelta(hours=2)
+        assert cache.get(client)[0] == "key-2"
+        assert len(calls) == 2
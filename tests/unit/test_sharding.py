@@ -0,0 +1,183 @@
+"""
+Unit tests for storage sharding.
+
+Runs against the in-process storage stand-in from the benchmarks:
+1. Merged listings across shards and their continuations
+2. Hash ring stability when a shard is added
+3. Where locate looks for an existing blob, and in which order
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from benchmarks.fake_storage import FakeBlobServiceClient
+from services.sharding import HashRing, ShardSet, merged_page
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        yield pool
+
+
+def fake_shards(*accounts, container="videos"):
+    """ShardSet over one fake storage account per name"""
+    shards = ShardSet([(account, container) for account in accounts])
+    for clients in shards.accounts:
+        clients.use(FakeBlobServiceClient(account_name=clients.account_name))
+    return shards
+
+
+def add_blobs(shard, names):
+    container = shard.container_client
+    with container.lock:
+        for name in names:
+            container.put(name, 1)
+
+
+def list_all(fetch, shard_ids, limit, executor):
+    """Every page of a merged listing; returns (names, pages)"""
+    names, pages, continuation = [], 0, None
+    while True:
+        items, continuation = merged_page(fetch, shard_ids, limit, continuation, executor, key=lambda blob: blob.name)
+        assert len(items) <= limit
+        names.extend(blob.name for blob in items)
+        pages += 1
+        if continuation is None:
+            return names, pages
+
+
+def shard_fetch(shards):
+    def fetch(shard_id, token, page_size):
+        pages = shards.get(shard_id).container_client.list_blobs(results_per_page=page_size).by_page(
+            continuation_token=token
+        )
+        return list(next(pages, [])), pages.continuation_token
+    return fetch
+
+
+class TestMergedPage:
+    """Test listings merged across shards."""
+
+    def test_pages_cover_every_shard_in_key_order(self, executor):
+        """Verify continuations resume every shard where it stopped, across shard page boundaries."""
+        shards = fake_shards("one", "two", "three")
+        expected = []
+        for index, shard in enumerate(shards.shards):
+            names = [f"video-{number:03d}.mp4" for number in range(index, 60 + index * 7, 3)]
+            add_blobs(shard, names)
+            expected.extend(names)
+
+        names, pages = list_all(shard_fetch(shards), [shard.id for shard in shards.shards], 7, executor)
+
+        assert names == sorted(expected)
+        assert pages == -(-len(expected) // 7)
+
+    def test_continuation_keeps_the_first_page_size(self, executor):
+        """Verify later pages are fetched with the page size recorded in the continuation."""
+        shards = fake_shards("one", "two")
+        add_blobs(shards.shards[0], [f"a-{number:02d}.mp4" for number in range(10)])
+        add_blobs(shards.shards[1], [f"b-{number:02d}.mp4" for number in range(10)])
+        sizes = []
+        fetch = shard_fetch(shards)
+
+        def recording_fetch(shard_id, token, page_size):
+            sizes.append(page_size)
+            return fetch(shard_id, token, page_size)
+
+        shard_ids = [shard.id for shard in shards.shards]
+        _, continuation = merged_page(recording_fetch, shard_ids, 4, None, executor, key=lambda blob: blob.name)
+        merged_page(recording_fetch, shard_ids, 50, continuation, executor, key=lambda blob: blob.name)
+
+        assert set(sizes) == {4}
+
+    def test_shard_added_mid_listing_starts_from_the_beginning(self, executor):
+        """Verify a shard missing from the continuation is listed in full."""
+        shards = fake_shards("one", "two", "three")
+        old_ids = [shard.id for shard in shards.shards[:2]]
+        add_blobs(shards.shards[0], ["a-1.mp4", "c-1.mp4", "e-1.mp4"])
+        add_blobs(shards.shards[1], ["b-1.mp4", "d-1.mp4", "f-1.mp4"])
+        add_blobs(shards.shards[2], ["a-2.mp4", "z-2.mp4"])
+        fetch = shard_fetch(shards)
+
+        first, continuation = merged_page(fetch, old_ids, 3, None, executor, key=lambda blob: blob.name)
+        rest = []
+        while continuation:
+            items, continuation = merged_page(
+                fetch, [shard.id for shard in shards.shards], 3, continuation, executor, key=lambda blob: blob.name
+            )
+            rest.extend(blob.name for blob in items)
+
+        assert [blob.name for blob in first] == ["a-1.mp4", "b-1.mp4", "c-1.mp4"]
+        assert sorted(rest) == ["a-2.mp4", "d-1.mp4", "e-1.mp4", "f-1.mp4", "z-2.mp4"]
+
+    def test_invalid_continuation_is_rejected(self, executor):
+        """Verify a malformed continuation raises ValueError (the routes answer 400)."""
+        with pytest.raises(ValueError):
+            merged_page(lambda *args: ([], None), ["one/videos"], 5, "not-a-token", executor, key=str)
+
+
+class TestHashRing:
+    """Test consistent-hash placement."""
+
+    def test_placement_ignores_shard_order(self):
+        """Verify the ring depends on the shard ids only, not their configured order."""
+        ring = HashRing(["a/videos", "b/videos", "c/videos"])
+        reordered = HashRing(["c/videos", "a/videos", "b/videos"])
+        keys = [f"{number:05d}.mp4" for number in range(500)]
+        assert [ring.get(key) for key in keys] == [reordered.get(key) for key in keys]
+
+    def test_added_shard_only_takes_keys(self):
+        """Verify adding a shard moves about 1/N of the keys, all of them to the new shard."""
+        before = HashRing(["a/videos", "b/videos", "c/videos"])
+        after = HashRing(["a/videos", "b/videos", "c/videos", "d/videos"])
+        keys = [f"{number:05d}.mp4" for number in range(4000)]
+
+        moved = [key for key in keys if before.get(key) != after.get(key)]
+
+        assert all(after.get(key) == "d/videos" for key in moved)
+        assert 0.15 < len(moved) / len(keys) < 0.35
+
+
+class TestLocate:
+    """Test finding the shard that holds an existing blob."""
+
+    def test_single_shard_is_always_the_primary(self):
+        """Verify an unsharded set never probes storage."""
+        shards = fake_shards("one")
+        assert shards.locate("missing.mp4") is shards.primary
+
+    def test_remembered_shard_comes_before_the_hint(self):
+        """Verify a remembered location wins over the index hint, which wins over probing."""
+        shards = fake_shards("one", "two")
+        first, second = shards.shards
+
+        assert shards.locate("video.mp4", hint=second.id) is second
+        shards.remember("video.mp4", first)
+        assert shards.locate("video.mp4", hint=second.id) is first
+
+    def test_probes_ring_placement_first(self):
+        """Verify a blob present on several shards is found on its ring placement."""
+        shards = fake_shards("one", "two", "three")
+        for shard in shards.shards:
+            add_blobs(shard, ["video.mp4"])
+
+        assert shards.locate("video.mp4") is shards.placement("video.mp4")
+        assert shards.candidates("video.mp4")[0] is shards.placement("video.mp4")
+
+    def test_falls_back_to_other_shards(self):
+        """Verify a blob written before its placement shard was added is still found, and remembered."""
+        shards = fake_shards("one", "two", "three")
+        name = next(f"{number}.mp4" for number in range(100) if shards.placement(f"{number}.mp4") is not shards.primary)
+        add_blobs(shards.primary, [name])
+
+        assert shards.locate(name) is shards.primary
+        assert shards.locate(name, probe=False) is shards.primary
+
+    def test_missing_blob_maps_to_its_placement(self):
+        """Verify a blob found nowhere (or located without probing) gets its ring placement."""
+        shards = fake_shards("one", "two")
+
+        assert shards.locate("missing.mp4") is shards.placement("missing.mp4")
+        assert shards.locate("other.mp4", probe=False) is shards.placement("other.mp4")
@@ -0,0 +1,197 @@
+"""
+Unit tests for streaming uploads.
+
+Tests the incremental multipart parsing and block staging behind /api/upload:
+1. Multipart events from a body read in small pieces (sync and ASGI)
+2. BlockBlobWriter block staging, commit, checksum and abort
+3. A body that breaks off mid-request after earlier files were submitted
+"""
+
+import asyncio
+import hashlib
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from werkzeug.sansio.multipart import Data, Field, File
+
+from benchmarks.fake_storage import FakeBlobServiceClient
+from services.streaming_upload import READ_SIZE, BlockBlobWriter, aiter_multipart_events, iter_multipart_events
+
+MP4_HEAD = b"\x00\x00\x00\x18ftypisom\x00\x00\x02\x00isomiso2"
+BOUNDARY = b"----WebKitFormBoundary7MA4YWxkTrZu0gW"
+
+
+def multipart(*parts, boundary=BOUNDARY, closed=True):
+    """Multipart body from (name, filename, content) parts; filename None makes a plain field"""
+    body = b""
+    for name, filename, content in parts:
+        disposition = f'form-data; name="{name}"' + (f'; filename="{filename}"' if filename is not None else "")
+        body += b"--" + boundary + b"\r\nContent-Disposition: " + disposition.encode() + b"\r\n\r\n" + content + b"\r\n"
+    return body + (b"--" + boundary + b"--\r\n" if closed else b"")
+
+
+def collect(events):
+    """[(kind, name, data)] with the data of each part joined"""
+    parts = []
+    for event in events:
+        if isinstance(event, (File, Field)):
+            parts.append([type(event).__name__, event.name, b""])
+        elif isinstance(event, Data):
+            parts[-1][2] += event.data
+    return [tuple(part) for part in parts]
+
+
+class RecordingBlobClient:
+    """Blob client that records staged blocks and the commit"""
+
+    def __init__(self):
+        self.staged = {}
+        self.committed = None
+
+    def stage_block(self, block_id, data, length=None):
+        self.staged[block_id] = bytes(data)
+
+    def commit_block_list(self, blocks, content_settings=None, metadata=None):
+        self.committed = ([block.id for block in blocks], metadata)
+
+
+class TestMultipartEvents:
+    """Test incremental multipart parsing."""
+
+    BODY = multipart(("title", None, b"holiday"), ("files[]", "a.mp4", b"a" * 100), ("files[]", "b.mp4", b"b" * 30))
+    EXPECTED = [("Field", "title", b"holiday"), ("File", "files[]", b"a" * 100), ("File", "files[]", b"b" * 30)]
+
+    @pytest.mark.parametrize("read_size", [1, 7, 64, READ_SIZE])
+    def test_parts_across_reads(self, read_size):
+        """Verify fields and files come out whole however the body is split into reads."""
+        events = iter_multipart_events(io.BytesIO(self.BODY), BOUNDARY, read_size=read_size)
+        assert collect(events) == self.EXPECTED
+
+    def test_read_ending_inside_a_boundary(self):
+        """Verify no line break leaks into a part when a read stops between a boundary and its suffix."""
+        body = multipart(("files[]", "a.mp4", b"a" * 10), ("files[]", "b.mp4", b"b" * 10))
+        for end in (b"\r\n--" + BOUNDARY, b"\r\n--" + BOUNDARY + b"-"):
+            read_size = body.index(end, body.index(b"b" * 10)) + len(end)
+            events = iter_multipart_events(io.BytesIO(body), BOUNDARY, read_size=read_size)
+            assert collect(events)[1] == ("File", "files[]", b"b" * 10)
+
+    def test_last_data_event_ends_the_part(self):
+        """Verify each part ends with a Data event whose more_data is False."""
+        events = list(iter_multipart_events(io.BytesIO(self.BODY), BOUNDARY, read_size=7))
+        ends = [event for event in events if isinstance(event, Data) and not event.more_data]
+        assert len(ends) == 3
+
+    def test_truncated_body(self):
+        """Verify a body that ends inside a part raises after the complete parts were yielded."""
+        body = multipart(("files[]", "a.mp4", b"a" * 10), ("files[]", "b.mp4", b"b" * 10), closed=False)
+        events = []
+        with pytest.raises(ValueError):
+            for event in iter_multipart_events(io.BytesIO(body[:-8]), BOUNDARY):
+                events.append(event)
+        assert collect(events)[0] == ("File", "files[]", b"a" * 10)
+
+    def test_asgi_messages(self):
+        """Verify the async parser reads the body from http.request messages."""
+        messages = [
+            {"type": "http.request", "body": self.BODY[start:start + 11], "more_body": start + 11 < len(self.BODY)}
+            for start in range(0, len(self.BODY), 11)
+        ]
+
+        async def receive():
+            return messages.pop(0)
+
+        async def parse():
+            return [event async for event in aiter_multipart_events(receive, BOUNDARY)]
+
+        assert collect(asyncio.run(parse())) == self.EXPECTED
+
+    def test_asgi_disconnect(self):
+        """Verify a client disconnect mid-body raises ConnectionError."""
+        messages = [{"type": "http.request", "body": self.BODY[:20], "more_body": True}, {"type": "http.disconnect"}]
+
+        async def receive():
+            return messages.pop(0)
+
+        async def parse():
+            return [event async for event in aiter_multipart_events(receive, BOUNDARY)]
+
+        with pytest.raises(ConnectionError):
+            asyncio.run(parse())
+
+
+class TestBlockBlobWriter:
+    """Test staging fixed-size blocks and committing them."""
+
+    def test_stages_fixed_size_blocks(self):
+        """Verify writes of any size are staged as block_size blocks plus a final remainder."""
+        blob_client = RecordingBlobClient()
+        writer = BlockBlobWriter(blob_client, 10, metadata={"original_filename": "a.mp4"})
+        for piece in (b"a" * 7, b"b" * 9, b"c" * 9):
+            writer.write(piece)
+
+        writer.close()
+
+        block_ids, metadata = blob_client.committed
+        assert [len(blob_client.staged[block_id]) for block_id in block_ids] == [10, 10, 5]
+        assert b"".join(blob_client.staged[block_id] for block_id in block_ids) == b"a" * 7 + b"b" * 9 + b"c" * 9
+        assert metadata == {
+            "original_filename": "a.mp4",
+            "sha256": hashlib.sha256(b"a" * 7 + b"b" * 9 + b"c" * 9).hexdigest()
+        }
+
+    def test_parallel_staging_keeps_block_order(self):
+        """Verify blocks staged on an executor are committed in write order."""
+        blob_client = RecordingBlobClient()
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            writer = BlockBlobWriter(blob_client, 4, executor=executor, max_concurrency=4)
+            data = bytes(range(256)) * 4
+            writer.write(data)
+            writer.close()
+
+        block_ids, _ = blob_client.committed
+        assert b"".join(blob_client.staged[block_id] for block_id in block_ids) == data
+        assert writer.size == len(data)
+
+    def test_progress_and_block_hooks(self):
+        """Verify the hooks see every staged block."""
+        progress, blocks = [], []
+        writer = BlockBlobWriter(
+            RecordingBlobClient(), 10, progress_hook=lambda current, total: progress.append((current, total)),
+            block_hook=lambda size, seconds: blocks.append(size)
+        )
+        writer.write(b"x" * 25)
+        writer.flush()
+
+        assert progress == [(10, None), (20, None), (25, None)]
+        assert blocks == [10, 10, 5]
+
+    def test_abort_never_commits(self):
+        """Verify an aborted writer drops its buffer and leaves the blob uncommitted."""
+        container = FakeBlobServiceClient().get_container_client("videos")
+        writer = BlockBlobWriter(container.get_blob_client("a.mp4"), 10)
+        writer.write(b"x" * 15)
+
+        writer.abort()
+
+        assert writer._buffer == bytearray() and writer._blocks == []
+        assert "a.mp4" not in container.blobs
+
+
+class TestStreamedRoute:
+    """Test /api/upload when the body breaks off partway."""
+
+    @pytest.fixture
+    def storage_latency(self):
+        # Slow enough that a commit submitted before the failure is still running when the body breaks off
+        return 0.05
+
+    def test_waits_for_submitted_commits(self, client, storage):
+        """Verify files submitted before a parse error are settled before the 500 response."""
+        body = multipart(("files[]", "a.mp4", MP4_HEAD + b"a" * 100), ("files[]", "b.mp4", MP4_HEAD), closed=False)
+
+        response = client.post("/api/upload", data=body[:-8], content_type=f"multipart/form-data; boundary={BOUNDARY.decode()}")
+
+        assert response.status_code == 500
+        assert len(storage.blobs) == 1
+        assert storage.staged == {}
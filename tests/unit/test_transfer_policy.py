@@ -0,0 +1,161 @@
+"""
+Unit tests for the adaptive transfer policy.
+
+Tests how each worker tunes its uploads:
+1. Block size from the measured connection speed, clamped to the limits
+2. Single put versus staged blocks
+3. Additive concurrency increase and halving on throttled (429/503) responses
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from services import metrics
+from services.transfer_policy import MB, TransferPolicy, round_block_size
+
+
+@pytest.fixture
+def policy():
+    return TransferPolicy(4 * MB, 2, min_block_size=MB, max_block_size=32 * MB, max_concurrency=8)
+
+
+def full_upload(policy, size=64 * MB, seconds=1.0):
+    """Plan and record an upload that used every connection"""
+    plan = policy.plan(size)
+    assert not plan.single_put and plan.max_concurrency == policy.concurrency
+    policy.record(plan, size, seconds)
+    return plan
+
+
+def storage_response(status):
+    return SimpleNamespace(
+        http_response=SimpleNamespace(status_code=status),
+        http_request=SimpleNamespace(method="PUT")
+    )
+
+
+class TestBlockSize:
+    """Test block sizes chosen from connection speed."""
+
+    @pytest.mark.parametrize("size, expected", [
+        (100, MB),
+        (MB, MB),
+        (3 * MB, 2 * MB),
+        (12 * MB, 8 * MB),
+        (1024 * MB, 32 * MB),
+    ])
+    def test_round_block_size(self, size, expected):
+        """Verify sizes round down to a power-of-two number of MB within the limits."""
+        assert round_block_size(size, MB, 32 * MB) == expected
+
+    def test_starts_at_configured_size(self, policy):
+        """Verify the configured block size is used until a block has been measured."""
+        assert policy.plan().block_size == 4 * MB
+
+    def test_follows_connection_speed(self, policy):
+        """Verify blocks are sized to take about target_block_seconds on one connection."""
+        policy.observe_block(4 * MB, 0.5)
+        assert policy.plan().block_size == 16 * MB
+
+    def test_clamped_to_limits(self, policy):
+        """Verify very fast and very slow connections stay within the block size limits."""
+        policy.observe_block(1024 * MB, 0.1)
+        assert policy.plan().block_size == 32 * MB
+
+        slow = TransferPolicy(4 * MB, 2, min_block_size=MB, max_block_size=32 * MB)
+        slow.observe_block(64 * 1024, 1.0)
+        assert slow.plan().block_size == MB
+
+    def test_fixed_when_not_adaptive(self):
+        """Verify measurements are ignored with adaptive transfers off."""
+        policy = TransferPolicy(4 * MB, 2, adaptive=False)
+        policy.observe_block(4 * MB, 0.5)
+        plan = policy.plan(64 * MB)
+        assert (plan.block_size, plan.max_concurrency) == (4 * MB, 2)
+
+
+class TestPlan:
+    """Test the choice between a single put and staged blocks."""
+
+    def test_single_put_when_file_fits_one_block(self, policy):
+        """Verify a file no larger than a block goes up in one request."""
+        plan = policy.plan(4 * MB)
+        assert plan.single_put and plan.max_concurrency == 1
+
+    def test_unknown_size_uses_blocks(self, policy):
+        """Verify streamed uploads (size unknown) are always staged."""
+        assert not policy.plan(None).single_put
+
+    def test_spreads_small_files_over_connections(self, policy):
+        """Verify a file just over one block is split so both connections carry a block."""
+        plan = policy.plan(5 * MB)
+        assert not plan.single_put
+        assert plan.block_size == 2 * MB
+        assert plan.max_concurrency == 2
+
+
+class TestConcurrency:
+    """Test AIMD tuning of the per-blob concurrency."""
+
+    def test_additive_increase(self, policy):
+        """Verify each upload that used every connection and kept up adds one, up to max_concurrency."""
+        for expected in range(3, 9):
+            full_upload(policy)
+            assert policy.concurrency == expected
+        full_upload(policy)
+        assert policy.concurrency == 8
+
+    def test_no_increase_when_slower(self, policy):
+        """Verify an upload well below the recent throughput does not add a connection."""
+        full_upload(policy)
+        full_upload(policy, seconds=2.0)
+        assert policy.concurrency == 3
+
+    def test_single_put_says_nothing_about_concurrency(self, policy):
+        """Verify single puts neither raise the concurrency nor count as idle connections."""
+        plan = policy.plan(MB)
+        policy.record(plan, MB, 0.1)
+        assert policy.concurrency == 2
+
+    @pytest.mark.parametrize("status", [429, 503])
+    def test_halved_on_throttling(self, policy, monkeypatch, status):
+        """Verify a 429 or 503 seen by the storage clients during an upload halves the concurrency."""
+        monkeypatch.setattr(metrics, "_throttle_listeners", [])
+        metrics.add_throttle_listener(policy.note_throttled)
+        for _ in range(6):
+            full_upload(policy)
+        assert policy.concurrency == 8
+
+        plan = policy.plan(64 * MB)
+        metrics.on_storage_response(storage_response(status))
+        policy.record(plan, 64 * MB, 1.0)
+
+        assert policy.concurrency == 4
+        assert policy.stats()["throttled_responses"] == 1
+
+    def test_other_errors_do_not_throttle(self, policy, monkeypatch):
+        """Verify server errors other than 503 leave the concurrency alone."""
+        monkeypatch.setattr(metrics, "_throttle_listeners", [])
+        metrics.add_throttle_listener(policy.note_throttled)
+
+        plan = policy.plan(64 * MB)
+        metrics.on_storage_response(storage_response(500))
+        policy.record(plan, 64 * MB, 1.0)
+
+        assert policy.concurrency == 3
+        assert policy.throttles == 0
+
+    def test_never_below_one(self, policy):
+        """Verify repeated throttling bottoms out at one connection."""
+        for _ in range(3):
+            plan = policy.plan(64 * MB)
+            policy.note_throttled()
+            policy.record(plan, 64 * MB, 1.0)
+        assert policy.concurrency == 1
+
+    def test_throttling_before_the_plan_is_not_counted(self, policy):
+        """Verify only throttles seen after an upload was planned halve its concurrency."""
+        policy.note_throttled()
+        full_upload(policy)
+        assert policy.concurrency == 3
@@ -0,0 +1,132 @@
+"""
+Unit tests for upload progress tracking.
+
+Tests the registry behind /api/upload/progress:
+1. Progress written by one worker and read back by another
+2. Finished entries and idle channels expiring
+3. Invalid ids refused before they become file names
+4. The Server-Sent Events feed sending only changed entries
+"""
+
+import json
+import os
+import time
+
+import pytest
+
+from services.upload_progress import FINISHED_TTL, ProgressFeed, ProgressRegistry
+
+CHANNEL = "tab-0123456789"
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return ProgressRegistry(str(tmp_path / "progress"), interval=0)
+
+
+class TestRead:
+    """Test reading a channel's progress."""
+
+    def test_shared_between_workers(self, registry):
+        """Verify a second registry on the same directory reads what the first one wrote."""
+        progress = registry.start(CHANNEL, "upload-0001", 100)
+        progress.hook("a.mp4")(40)
+        progress.hook("b.mp4")(20)
+
+        entries = ProgressRegistry(registry.directory).read(CHANNEL)
+
+        assert [(entry["upload_id"], entry["stored_bytes"], entry["total_bytes"]) for entry in entries] == [
+            ("upload-0001", 60, 100)
+        ]
+        assert entries[0]["status"] == "uploading"
+
+    def test_oldest_first(self, registry):
+        """Verify entries are ordered by when their upload started."""
+        registry.start(CHANNEL, "upload-0002", 10)
+        time.sleep(0.01)
+        registry.start(CHANNEL, "upload-0001", 10)
+
+        assert [entry["upload_id"] for entry in registry.read(CHANNEL)] == ["upload-0002", "upload-0001"]
+
+    def test_finish(self, registry):
+        """Verify a finished upload reports done or failed and no ETA."""
+        progress = registry.start(CHANNEL, "upload-0001", 100)
+        progress.update("a.mp4", 100)
+        progress.finish(True)
+        registry.start(CHANNEL, "upload-0002", 100).finish(False)
+
+        entries = registry.read(CHANNEL)
+        assert [entry["status"] for entry in entries] == ["done", "failed"]
+        assert entries[0]["eta_seconds"] is None
+
+    def test_unknown_channel(self, registry):
+        """Verify a channel with no uploads reads as empty."""
+        assert registry.read("tab-unknown00") == []
+
+    @pytest.mark.parametrize("channel, upload_id", [
+        (None, "upload-0001"), ("../../etc", "upload-0001"), (CHANNEL, "short"), (CHANNEL, "a/b/c/d/e/f")
+    ])
+    def test_invalid_ids(self, registry, channel, upload_id):
+        """Verify ids that are missing or could escape the directory are refused."""
+        assert registry.start(channel, upload_id, 10) is None
+
+
+class TestExpiry:
+    """Test dropping old progress."""
+
+    def write_entry(self, registry, upload_id, status, age):
+        directory = os.path.join(registry.directory, CHANNEL)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{upload_id}.json")
+        with open(path, "w") as progress_file:
+            json.dump({
+                "upload_id": upload_id, "status": status, "started_at": time.time() - age,
+                "updated_at": time.time() - age
+            }, progress_file)
+        return path
+
+    def test_finished_entries_expire(self, registry):
+        """Verify finished entries are removed FINISHED_TTL after their last update, running ones are kept."""
+        old = self.write_entry(registry, "upload-0001", "done", FINISHED_TTL + 1)
+        self.write_entry(registry, "upload-0002", "done", 1)
+        self.write_entry(registry, "upload-0003", "uploading", FINISHED_TTL + 1)
+
+        assert [entry["upload_id"] for entry in registry.read(CHANNEL)] == ["upload-0003", "upload-0002"]
+        assert not os.path.exists(old)
+
+    def test_idle_channels_removed(self, registry):
+        """Verify channels not written to within the TTL are removed when a new upload starts."""
+        self.write_entry(registry, "upload-0001", "done", 1)
+        idle = os.path.join(registry.directory, CHANNEL)
+        os.utime(idle, (time.time() - registry.ttl - 1, time.time() - registry.ttl - 1))
+
+        registry.start("tab-other00000", "upload-0002", 10)
+
+        assert not os.path.exists(idle)
+
+    def test_unreadable_entry_skipped(self, registry):
+        """Verify a corrupt file does not break the channel."""
+        path = self.write_entry(registry, "upload-0001", "uploading", 0)
+        with open(path, "w") as progress_file:
+            progress_file.write("{")
+        registry.start(CHANNEL, "upload-0002", 10)
+
+        assert [entry["upload_id"] for entry in registry.read(CHANNEL)] == ["upload-0002"]
+
+
+class TestFeed:
+    """Test the Server-Sent Events feed."""
+
+    def test_sends_only_changes(self, registry):
+        """Verify each poll sends the entries updated since the previous one."""
+        progress = registry.start(CHANNEL, "upload-0001", 100)
+        feed = ProgressFeed(registry, CHANNEL)
+
+        events, active = feed.poll()
+        assert events.startswith("event: progress\ndata: ") and events.endswith("\n\n") and active
+        assert feed.poll() == ("", True)
+
+        progress.finish(True)
+        events, active = feed.poll()
+        assert json.loads(events.split("data: ", 1)[1])["status"] == "done"
+        assert not active
@@ -0,0 +1,128 @@
+"""
+Unit tests for resumable upload sessions.
+
+Drives the session routes through Flask's test client against the
+in-process storage stand-in from the benchmarks:
+1. Signed session tickets and the requests refused without them
+2. Chunk staging and the status of a session
+3. Finalize, a retried finalize and finalizing onto an existing blob
+"""
+
+import pytest
+
+MP4_HEAD = b"\x00\x00\x00\x18ftypisom\x00\x00\x02\x00isomiso2"
+
+
+@pytest.fixture
+def session(client):
+    response = client.post("/api/upload/sessions", json={"filename": "big.mp4", "size": 64})
+    assert response.status_code == 201
+    return response.json
+
+
+def put_chunk(client, session, index, data, ticket=None):
+    return client.put(
+        f"/api/upload/sessions/{session['session_id']}/chunks/{index}", data=data,
+        headers={"X-Upload-Ticket": ticket or session["ticket"]}
+    )
+
+
+def finalize(client, session, total_chunks):
+    return client.post(
+        f"/api/upload/sessions/{session['session_id']}/finalize", json={"total_chunks": total_chunks},
+        headers={"X-Upload-Ticket": session["ticket"]}
+    )
+
+
+class TestTickets:
+    """Test that sessions are bound to the ticket they were created with."""
+
+    def test_chunk_without_ticket(self, client, session):
+        """Verify chunks without a ticket are refused as an unknown session."""
+        response = client.put(f"/api/upload/sessions/{session['session_id']}/chunks/0", data=MP4_HEAD)
+        assert response.status_code == 404
+
+    def test_ticket_of_another_session(self, client, session):
+        """Verify a ticket only opens the session it was issued for."""
+        other = client.post("/api/upload/sessions", json={"filename": "other.mp4"}).json
+        assert put_chunk(client, session, 0, MP4_HEAD, ticket=other["ticket"]).status_code == 404
+
+    def test_direct_upload_ticket(self, video_app, client, session):
+        """Verify a direct upload ticket for the same blob is not a session ticket."""
+        ticket = video_app.upload_tickets.issue(session["session_id"], "big.mp4", 2 ** 40)
+        assert put_chunk(client, session, 0, MP4_HEAD, ticket=ticket).status_code == 404
+
+    def test_filename_comes_from_the_ticket(self, client, session):
+        """Verify finalize records the name the session was created with, not one from the request."""
+        put_chunk(client, session, 0, MP4_HEAD)
+        response = client.post(
+            f"/api/upload/sessions/{session['session_id']}/finalize",
+            json={"total_chunks": 1, "filename": "other.mp4"}, headers={"X-Upload-Ticket": session["ticket"]}
+        )
+        assert response.json["files"][0]["filename"] == "big.mp4"
+
+
+class TestChunks:
+    """Test staging chunks and reporting them."""
+
+    def test_staged_chunks_are_reported(self, client, session):
+        """Verify the status lists staged chunks and their bytes before finalize."""
+        put_chunk(client, session, 0, MP4_HEAD)
+        put_chunk(client, session, 2, b"c" * 10)
+
+        status = client.get(
+            f"/api/upload/sessions/{session['session_id']}", headers={"X-Upload-Ticket": session["ticket"]}
+        ).json
+
+        assert status["chunks"] == [0, 2]
+        assert status["received_bytes"] == len(MP4_HEAD) + 10
+        assert not status["finalized"]
+
+    def test_first_chunk_is_sniffed(self, client, session):
+        """Verify a first chunk that is not video is refused before it is staged."""
+        response = put_chunk(client, session, 0, b"<!DOCTYPE html><html></html>")
+        assert response.status_code == 400
+
+
+class TestFinalize:
+    """Test committing the chunks of a session."""
+
+    def test_missing_chunks(self, client, session):
+        """Verify finalize lists the chunks that have not arrived."""
+        put_chunk(client, session, 0, MP4_HEAD)
+        response = finalize(client, session, 3)
+        assert response.status_code == 409
+        assert response.json["missing"] == [1, 2]
+
+    def test_commits_in_order(self, client, session, storage):
+        """Verify chunks sent out of order are committed by index."""
+        put_chunk(client, session, 1, b"b" * 10)
+        put_chunk(client, session, 0, MP4_HEAD)
+
+        response = finalize(client, session, 2)
+
+        assert response.status_code == 200
+        assert response.json["files"][0]["size"] == len(MP4_HEAD) + 10
+        assert list(storage.blobs[session["session_id"]]["blocks"]) == ["000000", "000001"]
+
+    def test_retried_finalize(self, client, session):
+        """Verify finalizing again with the same chunk count returns the committed result."""
+        put_chunk(client, session, 0, MP4_HEAD)
+        first = finalize(client, session, 1)
+        again = finalize(client, session, 1)
+
+        assert again.status_code == 200
+        for key in ("blob_name", "filename", "size", "content_type"):
+            assert again.json["files"][0][key] == first.json["files"][0][key]
+        assert finalize(client, session, 2).status_code == 409
+
+    def test_never_replaces_an_existing_blob(self, client, session, storage):
+        """Verify finalize refuses to commit over a blob that was not written by the session."""
+        put_chunk(client, session, 0, MP4_HEAD)
+        with storage.lock:
+            storage.put(session["session_id"], 500)
+
+        response = finalize(client, session, 1)
+
+        assert response.status_code == 409
+        assert storage.blobs[session["session_id"]]["size"] == 500
@@ -0,0 +1,163 @@
+"""
+Unit tests for the local video metadata index.
+
+Runs against a temporary SQLite file and the in-process storage stand-in:
+1. Keyset pagination in every sort order, with filters
+2. Duplicates sharing a blob and checksum lookups
+3. Reconcile passes across shards and the sweep of deleted blobs
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from benchmarks.fake_storage import FakeBlobServiceClient
+from services.video_index import VideoIndex, decode_cursor, encode_cursor
+
+OLD = "2020-01-01T00:00:00"
+
+
+@pytest.fixture
+def index(tmp_path):
+    return VideoIndex(str(tmp_path / "index.db"))
+
+
+def fill(index, count=25):
+    """count entries with distinct upload times and sizes; filenames repeat to tie the sort value"""
+    for number in range(count):
+        index.record(
+            f"{number:03d}.mp4", f"{number:03d}.mp4", f"clip-{number % 5}.mp4", 1000 + (number * 7) % count,
+            "video/webm" if number % 3 == 0 else "video/mp4", f"2024-01-01T00:00:{number:02d}"
+        )
+
+
+def all_pages(index, limit, **filters):
+    ids, continuation = [], None
+    while True:
+        entries, continuation = index.query(limit=limit, continuation=continuation, **filters)
+        assert len(entries) <= limit
+        ids.extend(entry["id"] for entry in entries)
+        if continuation is None:
+            return ids
+
+
+def container_with(names, account="one"):
+    container = FakeBlobServiceClient(account_name=account).get_container_client("videos")
+    with container.lock:
+        for name in names:
+            container.put(name, 10, SimpleNamespace(content_type="video/mp4"), {"original_filename": f"orig-{name}"})
+    return container
+
+
+def reconcile(index, containers, page_size=2):
+    """Run reconcile_page until a pass completes; returns the number of calls"""
+    for calls in range(1, 100):
+        _, finished = index.reconcile_page(containers, page_size=page_size)
+        if finished:
+            return calls
+    raise AssertionError("reconcile pass never finished")
+
+
+class TestQuery:
+    """Test sorted, filtered and paginated listings."""
+
+    @pytest.mark.parametrize("sort", ["uploaded_at", "size", "filename"])
+    @pytest.mark.parametrize("descending", [True, False])
+    def test_pages_match_a_single_query(self, index, sort, descending):
+        """Verify keyset pages, including ties on the sort value, add up to the full ordered listing."""
+        fill(index)
+        expected = [entry["id"] for entry in index.query(sort=sort, descending=descending, limit=1000)[0]]
+
+        assert all_pages(index, 4, sort=sort, descending=descending) == expected
+        assert sorted(expected) == [f"{number:03d}.mp4" for number in range(25)]
+
+    def test_filters(self, index):
+        """Verify content type, size range, prefix and filename search narrow every page."""
+        fill(index)
+
+        webm = all_pages(index, 3, content_type="video/webm")
+        assert webm == [f"{number:03d}.mp4" for number in range(24, -1, -3)]
+
+        sized = index.query(limit=100, min_size=1010, max_size=1012)[0]
+        assert sorted(entry["size"] for entry in sized) == [1010, 1011, 1012]
+
+        assert all_pages(index, 2, prefix="01") == [f"{number:03d}.mp4" for number in range(19, 9, -1)]
+        assert {entry["original_filename"] for entry in index.query(limit=100, search="clip-3")[0]} == {"clip-3.mp4"}
+
+    def test_search_is_literal(self, index):
+        """Verify LIKE wildcards in a search term match only themselves."""
+        index.record("a.mp4", "a.mp4", "100%_done.mp4", 1, "video/mp4", OLD)
+        index.record("b.mp4", "b.mp4", "1000 done.mp4", 1, "video/mp4", OLD)
+        assert [entry["id"] for entry in index.query(search="0%_")[0]] == ["a.mp4"]
+
+    def test_cursor_round_trip(self):
+        """Verify continuation tokens decode to the values they were made from, and bad ones raise ValueError."""
+        assert decode_cursor(encode_cursor(["2024-01-01", "a.mp4"])) == ["2024-01-01", "a.mp4"]
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor")
+
+
+class TestDuplicates:
+    """Test entries that share a blob."""
+
+    def test_find_by_checksum_returns_originals(self, index):
+        """Verify checksum lookups return the blob's own entry, never the duplicates pointing at it."""
+        index.record("a.mp4", "a.mp4", "a.mp4", 10, "video/mp4", OLD, checksum="c" * 64)
+        index.record("dup", "a.mp4", "copy.mp4", 10, "video/mp4", OLD, checksum="c" * 64)
+
+        assert [entry["id"] for entry in index.find_by_checksum("c" * 64, 10)] == ["a.mp4"]
+        assert index.find_by_checksum("c" * 64, 11) == []
+        assert index.dedup_stats() == {"videos": 2, "duplicates": 1, "duplicate_rate": 0.5, "bytes_saved": 10}
+
+    def test_duplicates_inherit_media(self, index):
+        """Verify an entry recorded after its blob was probed gets the media details."""
+        index.record("a.mp4", "a.mp4", "a.mp4", 10, "video/mp4", OLD)
+        index.set_media("a.mp4", {"duration": 9.5})
+        index.record("dup", "a.mp4", "copy.mp4", 10, "video/mp4", OLD)
+
+        assert index.get("dup")["media"] == '{"duration": 9.5}'
+        assert index.referenced_elsewhere(["a.mp4"], ["a.mp4"]) == {"a.mp4"}
+        assert index.referenced_elsewhere(["a.mp4"], ["a.mp4", "dup"]) == set()
+
+
+class TestReconcile:
+    """Test syncing the index with the containers."""
+
+    def test_adds_blobs_missing_from_the_index(self, index):
+        """Verify blobs uploaded elsewhere are indexed with their metadata and shard."""
+        container = container_with(["a.mp4", "b.mp4", "c.mp4"])
+
+        assert reconcile(index, [("one/videos", container)]) == 2
+
+        entry = index.get("b.mp4")
+        assert entry["original_filename"] == "orig-b.mp4"
+        assert entry["shard"] == "one/videos"
+        assert index.shard_of("c.mp4") == "one/videos"
+
+    def test_sweep_removes_deleted_blobs(self, index):
+        """Verify entries whose blob is gone are removed at the end of a pass, but new uploads are kept."""
+        container = container_with(["a.mp4"])
+        index.record("a.mp4", "a.mp4", "a.mp4", 10, "video/mp4", OLD)
+        index.record("gone.mp4", "gone.mp4", "gone.mp4", 10, "video/mp4", OLD)
+        index.record("new.mp4", "new.mp4", "new.mp4", 10, "video/mp4", "2999-01-01T00:00:00")
+
+        reconcile(index, [("one/videos", container)])
+
+        assert index.get("gone.mp4") is None
+        assert index.get("a.mp4") and index.get("new.mp4")
+
+    def test_pass_covers_every_shard(self, index):
+        """Verify one pass lists the shards in turn before sweeping."""
+        first = container_with(["a.mp4", "b.mp4", "c.mp4"], account="one")
+        second = container_with(["d.mp4"], account="two")
+        index.record("gone.mp4", "gone.mp4", "gone.mp4", 10, "video/mp4", OLD)
+        containers = [("one/videos", first), ("two/videos", second)]
+
+        _, finished = index.reconcile_page(containers, page_size=2)
+        assert not finished and index.get("gone.mp4")
+
+        reconcile(index, containers)
+
+        assert index.get("gone.mp4") is None
+        assert index.shard_of("d.mp4") == "two/videos"
+        assert len(index.query(limit=100)[0]) == 4